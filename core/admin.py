@@ -1,9 +1,55 @@
 # core/admin.py
 
 from django.contrib import admin
-from .models import Escola, Ocorrencia, Relatorio, Visita
+from django.http import FileResponse, Http404
+from django.template.response import TemplateResponse
+
+from .models import Escola, Ocorrencia, Relatorio, Tarefa, Visita
+from .perfilamento import caminho_perfil, ler_perfil, listar_perfis
 
 admin.site.register(Escola)
 admin.site.register(Ocorrencia)
 admin.site.register(Relatorio)
-admin.site.register(Visita)
\ No newline at end of file
+admin.site.register(Visita)
+
+
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'status', 'progresso', 'tentativas', 'criada_por', 'criada_em', 'concluida_em')
+    list_filter = ('status', 'tipo')
+    readonly_fields = ('worker', 'iniciada_em', 'concluida_em', 'criada_em')
+
+
+# --- Perfis de requisições (core/perfilamento.py) ---
+# Páginas avulsas do admin, sem modelo: os perfis ficam em arquivos.
+
+ORDENS_PERFIL = {'cumulative': 'tempo acumulado', 'tottime': 'tempo próprio', 'ncalls': 'chamadas'}
+
+
+def perfis_view(request):
+    contexto = {**admin.site.each_context(request), 'title': 'Perfis de requisições', 'perfis': listar_perfis()}
+    return TemplateResponse(request, 'admin/perfis.html', contexto)
+
+
+def perfil_view(request, identificador):
+    ordem = request.GET.get('ordem', 'cumulative')
+    if ordem not in ORDENS_PERFIL:
+        ordem = 'cumulative'
+    perfil = ler_perfil(identificador, ordem)
+    if perfil is None:
+        raise Http404('Perfil não encontrado (pode ter saído do anel).')
+    contexto = {
+        **admin.site.each_context(request),
+        'title': f"Perfil {perfil['id']}",
+        'perfil': perfil,
+        'ordem': ordem,
+        'ordens': ORDENS_PERFIL,
+    }
+    return TemplateResponse(request, 'admin/perfil.html', contexto)
+
+
+def baixar_perfil_view(request, identificador):
+    caminho = caminho_perfil(identificador, '.prof')
+    if caminho is None:
+        raise Http404('Perfil não encontrado (pode ter saído do anel).')
+    return FileResponse(open(caminho, 'rb'), as_attachment=True, filename=caminho.name)
@@ -1,6 +1,25 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def _garantir_indice_busca(using, **kwargs):
+    # Migrações que recriam core_visitatecnica no SQLite apagam os triggers da busca
+    # (só se o índice já foi instalado pela migração 0009)
+    from django.db import connections
+    from .busca import TABELA_BUSCA, busca_disponivel, garantir_indice_busca
+    conexao = connections[using]
+    if busca_disponivel(conexao) and TABELA_BUSCA in conexao.introspection.table_names():
+        garantir_indice_busca(conexao)
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .metricas import ao_criar_conexao
+
+        post_migrate.connect(_garantir_indice_busca, sender=self)
+        # Observadores de SQL das métricas e do perfilamento (core/metricas.py)
+        connection_created.connect(ao_criar_conexao)
@@ -0,0 +1,45 @@
+# core/assincrono.py
+
+# Consultas em paralelo para os dashboards async de core/views.py.
+#
+# O ORM async do Django (acount, aaggregate, async for) passa toda consulta
+# pela mesma thread compartilhada (sync_to_async com thread_sensitive=True):
+# um asyncio.gather delas libera o event loop, mas as consultas de uma página
+# ainda rodam uma depois da outra. consultas_paralelas() manda cada função
+# síncrona do ORM para um pool próprio e limitado de threads, cada uma com a
+# sua conexão, e assim elas rodam ao mesmo tempo de verdade.
+#
+# As conexões dessas threads seguem as mesmas regras das requisições: antes e
+# depois de cada consulta passa por close_old_connections(), que fecha as
+# vencidas (CONN_MAX_AGE) ou quebradas e mantém as demais para a próxima.
+# As consultas continuam visíveis para core/metricas.py e core/perfilamento.py:
+# sync_to_async copia o contexto (observar_sql) para a thread do pool.
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+# Cada thread do pool pode manter uma conexão aberta: o limite é o número de
+# conexões extras que os dashboards async podem abrir no banco.
+_pool = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'CONSULTAS_PARALELAS_THREADS', 4),
+    thread_name_prefix='saepe-consultas',
+)
+
+
+def _rodar(consulta):
+    close_old_connections()
+    try:
+        return consulta()
+    finally:
+        close_old_connections()
+
+
+async def consultas_paralelas(*consultas):
+    """Roda as funções síncronas `consultas` (ORM) ao mesmo tempo; devolve os resultados na ordem."""
+    return await asyncio.gather(*(
+        sync_to_async(_rodar, thread_sensitive=False, executor=_pool)(consulta) for consulta in consultas
+    ))
@@ -0,0 +1,218 @@
+# core/busca.py
+
+# Busca de texto nas visitas técnicas (demanda, encaminhamento e observação).
+#
+# No SQLite usa uma tabela virtual FTS5 de "conteúdo externo": ela guarda só o
+# índice e lê o texto da própria core_visitatecnica. Triggers no banco mantêm o
+# índice em dia em qualquer escrita (formulário, bulk_create/bulk_update das
+# importações, exclusões), sem depender de código Python em cada lugar.
+#
+# Migrações do Django no SQLite às vezes recriam a tabela inteira, o que apaga
+# os triggers; por isso garantir_indice_busca() roda também no post_migrate e
+# reconstrói o índice quando precisou recriar alguma coisa.
+#
+# Em outros bancos a busca cai num icontains simples (sem ranking).
+
+import html
+import re
+from dataclasses import dataclass, field
+
+from django.db import connection
+
+TABELA_VISITAS = 'core_visitatecnica'
+TABELA_ESCOLAS = 'core_escola'
+TABELA_BUSCA = 'core_visitatecnica_fts'
+CAMPOS_BUSCA = ['demanda', 'encaminhamento', 'observacao']
+
+RESULTADOS_POR_PAGINA = 20
+
+# Marcadores do snippet(): caracteres de uso privado, trocados por <mark> depois
+# de escapar o HTML do texto
+_INICIO_DESTAQUE = '\ue000'
+_FIM_DESTAQUE = '\ue001'
+
+# A migração 0009 tem uma cópia fixa deste SQL: mudanças aqui chegam aos
+# bancos já migrados pelo post_migrate (garantir_indice_busca)
+_campos = ', '.join(CAMPOS_BUSCA)
+_novos = ', '.join(f'new.{c}' for c in CAMPOS_BUSCA)
+_antigos = ', '.join(f'old.{c}' for c in CAMPOS_BUSCA)
+
+SQL_TABELA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_BUSCA} USING fts5("
+    f"{_campos}, content='{TABELA_VISITAS}', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2')"
+)
+
+SQL_TRIGGERS = {
+    f'{TABELA_BUSCA}_ai': (
+        f"CREATE TRIGGER IF NOT EXISTS {TABELA_BUSCA}_ai AFTER INSERT ON {TABELA_VISITAS} BEGIN "
+        f"INSERT INTO {TABELA_BUSCA}(rowid, {_campos}) VALUES (new.id, {_novos}); END"
+    ),
+    f'{TABELA_BUSCA}_ad': (
+        f"CREATE TRIGGER IF NOT EXISTS {TABELA_BUSCA}_ad AFTER DELETE ON {TABELA_VISITAS} BEGIN "
+        f"INSERT INTO {TABELA_BUSCA}({TABELA_BUSCA}, rowid, {_campos}) VALUES ('delete', old.id, {_antigos}); END"
+    ),
+    f'{TABELA_BUSCA}_au': (
+        f"CREATE TRIGGER IF NOT EXISTS {TABELA_BUSCA}_au AFTER UPDATE OF {_campos} ON {TABELA_VISITAS} BEGIN "
+        f"INSERT INTO {TABELA_BUSCA}({TABELA_BUSCA}, rowid, {_campos}) VALUES ('delete', old.id, {_antigos}); "
+        f"INSERT INTO {TABELA_BUSCA}(rowid, {_campos}) VALUES (new.id, {_novos}); END"
+    ),
+}
+
+
+def busca_disponivel(conexao=connection):
+    return conexao.vendor == 'sqlite'
+
+
+def garantir_indice_busca(conexao=connection, reconstruir=False):
+    """
+    Cria a tabela FTS5 e os triggers que faltarem.
+
+    Se algo precisou ser criado (ou `reconstruir=True`) o índice é refeito a
+    partir da tabela de visitas. Devolve True quando reconstruiu.
+    """
+    if not busca_disponivel(conexao):
+        return False
+
+    with conexao.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s)" % ', '.join(['%s'] * (len(SQL_TRIGGERS) + 1)),
+            [TABELA_BUSCA, *SQL_TRIGGERS],
+        )
+        existentes = {linha[0] for linha in cursor.fetchall()}
+        faltando = existentes != {TABELA_BUSCA, *SQL_TRIGGERS}
+
+        cursor.execute(SQL_TABELA)
+        for sql in SQL_TRIGGERS.values():
+            cursor.execute(sql)
+
+        if faltando or reconstruir:
+            cursor.execute(f"INSERT INTO {TABELA_BUSCA}({TABELA_BUSCA}) VALUES ('rebuild')")
+            return True
+    return False
+
+
+def remover_indice_busca(conexao=connection):
+    if not busca_disponivel(conexao):
+        return
+    with conexao.cursor() as cursor:
+        for nome in SQL_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {nome}')
+        cursor.execute(f'DROP TABLE IF EXISTS {TABELA_BUSCA}')
+
+
+def montar_consulta_fts(texto):
+    """
+    Transforma o que o utilizador digitou numa consulta FTS5 segura.
+
+    Cada palavra vira um termo entre aspas e todas precisam aparecer. Só a
+    última ganha prefixo (merend -> "merend"*), para a busca acompanhar a
+    digitação sem pagar o custo de expandir prefixos em todos os termos.
+    Operadores e aspas digitados são ignorados, então nenhuma entrada provoca
+    erro de sintaxe no MATCH.
+    """
+    palavras = [f'"{p}"' for p in re.findall(r'\w+', texto or '')]
+    if palavras and len(palavras[-1]) >= 5:  # 3 letras + aspas
+        palavras[-1] += '*'
+    return ' '.join(palavras)
+
+
+def _destacar(trecho):
+    if not trecho:
+        return ''
+    return (html.escape(trecho)
+            .replace(_INICIO_DESTAQUE, '<mark>')
+            .replace(_FIM_DESTAQUE, '</mark>'))
+
+
+@dataclass
+class ResultadoBusca:
+    termo: str
+    pagina: int
+    total: int
+    resultados: list = field(default_factory=list)
+    por_pagina: int = RESULTADOS_POR_PAGINA
+
+    @property
+    def paginas(self):
+        return max(1, -(-self.total // self.por_pagina))
+
+    def como_dict(self):
+        return {
+            'termo': self.termo,
+            'pagina': self.pagina,
+            'paginas': self.paginas,
+            'total': self.total,
+            'resultados': self.resultados,
+        }
+
+
+def buscar_visitas(texto, pagina=1, por_pagina=RESULTADOS_POR_PAGINA):
+    """Visitas cujo texto combina com `texto`, das mais relevantes para as menos."""
+    consulta = montar_consulta_fts(texto)
+    pagina = max(1, pagina)
+    if not consulta:
+        return ResultadoBusca(termo=texto, pagina=pagina, total=0, por_pagina=por_pagina)
+
+    if not busca_disponivel():
+        return _buscar_visitas_sem_fts(texto, pagina, por_pagina)
+
+    deslocamento = (pagina - 1) * por_pagina
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM {TABELA_BUSCA} WHERE {TABELA_BUSCA} MATCH %s', [consulta])
+        total = cursor.fetchone()[0]
+
+        # rank = bm25(); -1 em snippet() escolhe a coluna com o melhor trecho
+        cursor.execute(
+            f"""
+            SELECT v.id, v.escola_id, e.nome, v.data_visita, v.tecnico_gre,
+                   snippet({TABELA_BUSCA}, -1, %s, %s, '…', 16)
+              FROM {TABELA_BUSCA} f
+              JOIN {TABELA_VISITAS} v ON v.id = f.rowid
+              JOIN {TABELA_ESCOLAS} e ON e.id = v.escola_id
+             WHERE {TABELA_BUSCA} MATCH %s
+             ORDER BY f.rank
+             LIMIT %s OFFSET %s
+            """,
+            [_INICIO_DESTAQUE, _FIM_DESTAQUE, consulta, por_pagina, deslocamento],
+        )
+        linhas = cursor.fetchall()
+
+    resultados = [
+        {
+            'id': visita_id,
+            'escola_id': escola_id,
+            'escola_nome': escola_nome,
+            'data_visita': str(data_visita) if data_visita else None,
+            'tecnico_gre': tecnico,
+            'trecho': _destacar(trecho),
+        }
+        for visita_id, escola_id, escola_nome, data_visita, tecnico, trecho in linhas
+    ]
+    return ResultadoBusca(termo=texto, pagina=pagina, total=total, resultados=resultados, por_pagina=por_pagina)
+
+
+def _buscar_visitas_sem_fts(texto, pagina, por_pagina):
+    from django.db.models import Q
+
+    from .models import VisitaTecnica
+
+    filtro = Q()
+    for palavra in re.findall(r'\w+', texto):
+        filtro &= Q(demanda__icontains=palavra) | Q(encaminhamento__icontains=palavra) | Q(observacao__icontains=palavra)
+
+    visitas = VisitaTecnica.objects.filter(filtro).select_related('escola').order_by('-data_visita', '-id')
+    total = visitas.count()
+    inicio = (pagina - 1) * por_pagina
+    resultados = [
+        {
+            'id': v.id,
+            'escola_id': v.escola_id,
+            'escola_nome': v.escola.nome,
+            'data_visita': str(v.data_visita) if v.data_visita else None,
+            'tecnico_gre': v.tecnico_gre,
+            'trecho': html.escape(next((t for t in (v.demanda, v.encaminhamento, v.observacao) if t), '')[:200]),
+        }
+        for v in visitas[inicio:inicio + por_pagina]
+    ]
+    return ResultadoBusca(termo=texto, pagina=pagina, total=total, resultados=resultados, por_pagina=por_pagina)
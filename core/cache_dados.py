@@ -0,0 +1,159 @@
+# core/cache_dados.py
+
+# Cache dos dados calculados pelas views, amarrado a uma "versão dos dados".
+#
+# A versão é um token guardado no próprio cache. Toda escrita em
+# VisitaTecnica ou DadosFicticiosEscola (formulário de visitas, comandos de
+# importação) chama invalidar_dados(), que troca o token; as entradas antigas
+# deixam de ser encontradas e expiram sozinhas. Assim não é preciso saber
+# quais chaves apagar, e funciona igual com LocMemCache e FileBasedCache.
+#
+# Com LocMemCache cada processo tem o seu cache, então uma importação feita
+# por outro processo só aparece depois do timeout (CACHE_DADOS_TIMEOUT).
+# O FileBasedCache (configurado em settings.py) é compartilhado entre processos.
+#
+# Com a réplica de leitura (core/roteador.py) a chave também leva o banco de
+# onde o valor foi lido: logo depois de uma importação a réplica pode ainda
+# não ter os dados novos, e o que foi calculado dela não pode ser servido a
+# quem lê do primário. Valores da réplica ficam guardados no máximo
+# REPLICA_ATRASO_MAXIMO segundos, o atraso que se admite para ela.
+#
+# Dentro de uma requisição o token é lido do cache uma vez só (o
+# FileBasedCache vai ao disco em cada get): VersaoDadosMiddleware abre um memo
+# que vale até o fim dela. Fora de requisições (comandos, fila de tarefas)
+# cada chamada lê o cache.
+
+import contextvars
+import time
+import uuid
+from datetime import datetime, timezone
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+
+from .roteador import ALIAS_REPLICA, alias_leitura
+
+
+CHAVE_VERSAO = 'saepe:versao_dados'
+
+_versao_pedido = contextvars.ContextVar('saepe_versao_pedido', default=None)
+
+
+def _timeout():
+    timeout = getattr(settings, 'CACHE_DADOS_TIMEOUT', 600)
+    if alias_leitura() == ALIAS_REPLICA:
+        return min(timeout, getattr(settings, 'REPLICA_ATRASO_MAXIMO', 30))
+    return timeout
+
+
+def _novo_token():
+    # Começa pelo instante da alteração (ns, em hexa) para servir de Last-Modified
+    return f'{time.time_ns():x}-{uuid.uuid4().hex[:12]}'
+
+
+def versao_dados():
+    """Token da versão atual dos dados (criado na primeira chamada)."""
+    memo = _versao_pedido.get()
+    if memo:
+        return memo['versao']
+    versao = cache.get(CHAVE_VERSAO)
+    if versao is None:
+        versao = _novo_token()
+        # add() não sobrescreve se outro processo criou o token ao mesmo tempo
+        if not cache.add(CHAVE_VERSAO, versao, timeout=None):
+            versao = cache.get(CHAVE_VERSAO, versao)
+    if memo is not None:
+        memo['versao'] = versao
+    return versao
+
+
+async def aversao_dados():
+    """versao_dados() para views async (usa a API async do cache)."""
+    memo = _versao_pedido.get()
+    if memo:
+        return memo['versao']
+    versao = await cache.aget(CHAVE_VERSAO)
+    if versao is None:
+        versao = _novo_token()
+        if not await cache.aadd(CHAVE_VERSAO, versao, timeout=None):
+            versao = await cache.aget(CHAVE_VERSAO, versao)
+    if memo is not None:
+        memo['versao'] = versao
+    return versao
+
+
+def invalidar_dados():
+    """Chamar depois de qualquer escrita em VisitaTecnica ou DadosFicticiosEscola."""
+    versao = _novo_token()
+    cache.set(CHAVE_VERSAO, versao, timeout=None)
+    memo = _versao_pedido.get()
+    if memo is not None:
+        memo['versao'] = versao
+
+
+def momento_versao():
+    """Quando a versão atual dos dados foi criada (datetime UTC)."""
+    # Tokens antigos (só o uuid, sem o instante) também caem no "agora"
+    instante, separador, _ = versao_dados().partition('-')
+    try:
+        return datetime.fromtimestamp(int(instante, 16) / 1e9, timezone.utc) if separador else datetime.now(timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        return datetime.now(timezone.utc)
+
+
+def chave_cache(*partes, versao=None):
+    partes = [str(p) for p in partes]
+    return ':'.join(['saepe', versao or versao_dados(), alias_leitura()] + partes)
+
+
+def obter_ou_calcular(partes, calcular):
+    """
+    Devolve o valor em cache para (versão atual, *partes) ou calcula e guarda.
+
+    Se `calcular` levantar uma exceção nada é guardado e a exceção segue.
+    """
+    chave = chave_cache(*partes)
+    valor = cache.get(chave)
+    if valor is None:
+        valor = calcular()
+        cache.set(chave, valor, timeout=_timeout())
+    return valor
+
+
+async def aobter_ou_calcular(partes, acalcular):
+    """obter_ou_calcular() para views async: `acalcular` é uma função async."""
+    chave = chave_cache(*partes, versao=await aversao_dados())
+    valor = await cache.aget(chave)
+    if valor is None:
+        valor = await acalcular()
+        await cache.aset(chave, valor, timeout=_timeout())
+    return valor
+
+
+class VersaoDadosMiddleware:
+    """Guarda a versão dos dados da primeira leitura até o fim da requisição."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _versao_pedido.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            _versao_pedido.reset(token)
+
+    async def __acall__(self, request):
+        token = _versao_pedido.set({})
+        try:
+            return await self.get_response(request)
+        finally:
+            _versao_pedido.reset(token)
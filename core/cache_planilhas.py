@@ -0,0 +1,193 @@
+# core/cache_planilhas.py
+
+# Cache das planilhas já lidas, para não pagar o openpyxl de novo quando a
+# mesma planilha é importada outra vez.
+#
+# A chave é o SHA-256 do conteúdo do arquivo + a aba: se a planilha mudar
+# (mesmo mantendo o nome), o hash muda e ela é lida de novo; o nome e a data
+# do arquivo não importam. Cada aba lida vira um .npz (NumPy, uma entrada
+# por coluna) na pasta settings.CACHE_PLANILHAS_DIR.
+#
+# A pasta guarda no máximo MAXIMO_ARQUIVOS planilhas: a cada gravação as
+# menos usadas (data de modificação, renovada a cada leitura do cache) são
+# apagadas, junto com temporários de gravações interrompidas.
+#
+# Colunas numéricas e de data vão como arrays nativos. Colunas "object" (texto
+# misturado com números ou datas, como costuma vir do Excel) são guardadas
+# separadas por tipo, com uma coluna de marcação, para voltarem exatamente
+# iguais sem usar pickle.
+
+import datetime
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+VERSAO_FORMATO = 1
+
+MAXIMO_ARQUIVOS = 32
+# Um .npz.tmp mais velho que isto é de uma gravação que não terminou
+IDADE_TEMPORARIO_ORFAO = 3600
+
+# Marcação de cada célula das colunas "object"
+_NULO, _TEXTO, _INTEIRO, _DECIMAL, _DATA, _BOOLEANO = range(6)
+
+
+def hash_arquivo(caminho):
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def caminho_cache(pasta, caminho, aba):
+    aba_segura = re.sub(r'[^\w.-]', '_', str(aba))
+    return Path(pasta) / f'{hash_arquivo(caminho)}_{aba_segura}.npz'
+
+
+def _marcar(valor):
+    if valor is None or valor is pd.NaT or (isinstance(valor, float) and np.isnan(valor)):
+        return _NULO
+    if isinstance(valor, str):
+        return _TEXTO
+    if isinstance(valor, (bool, np.bool_)):
+        return _BOOLEANO
+    if isinstance(valor, (int, np.integer)):
+        return _INTEIRO
+    if isinstance(valor, (float, np.floating)):
+        return _DECIMAL
+    if isinstance(valor, datetime.datetime):
+        return _DATA
+    # Hora sozinha, data sem hora etc.: não sabemos guardar sem mudar o tipo
+    raise TypeError(f'Tipo de célula sem suporte no cache: {type(valor).__name__}')
+
+
+def _separar_objetos(valores, prefixo, arrays):
+    marcas = np.fromiter((_marcar(v) for v in valores), dtype=np.int8, count=len(valores))
+    arrays[f'{prefixo}marca'] = marcas
+    arrays[f'{prefixo}texto'] = np.array([str(v) for v in valores[marcas == _TEXTO]], dtype=str)
+    arrays[f'{prefixo}inteiro'] = valores[marcas == _INTEIRO].astype(np.int64)
+    arrays[f'{prefixo}decimal'] = valores[marcas == _DECIMAL].astype(np.float64)
+    arrays[f'{prefixo}booleano'] = valores[marcas == _BOOLEANO].astype(bool)
+    arrays[f'{prefixo}data'] = pd.to_datetime(pd.Series(valores[marcas == _DATA], dtype=object)).to_numpy('datetime64[ns]')
+
+
+def _juntar_objetos(prefixo, arrays):
+    marcas = arrays[f'{prefixo}marca']
+    valores = np.full(len(marcas), None, dtype=object)
+    valores[marcas == _TEXTO] = arrays[f'{prefixo}texto'].astype(object)
+    valores[marcas == _INTEIRO] = arrays[f'{prefixo}inteiro'].astype(object)
+    valores[marcas == _DECIMAL] = arrays[f'{prefixo}decimal'].astype(object)
+    valores[marcas == _BOOLEANO] = arrays[f'{prefixo}booleano'].astype(object)
+    valores[marcas == _DATA] = list(pd.to_datetime(arrays[f'{prefixo}data']))
+    # O read_excel devolve NaN (não None) nas células vazias de colunas "object"
+    valores[marcas == _NULO] = np.nan
+    return valores
+
+
+def salvar_npz(df, destino):
+    """Grava o DataFrame num .npz (escrita atômica: outro processo nunca lê um arquivo pela metade)."""
+    arrays, colunas = {}, []
+    for i, nome in enumerate(df.columns):
+        serie = df[nome]
+        prefixo = f'c{i}_'
+        if serie.dtype == object:
+            _separar_objetos(serie.to_numpy(), prefixo, arrays)
+            tipo = 'object'
+        else:
+            arrays[f'{prefixo}valores'] = serie.to_numpy()
+            tipo = str(serie.dtype)
+        colunas.append({'nome': str(nome), 'tipo': tipo})
+
+    arrays['_meta'] = np.array(json.dumps({'versao': VERSAO_FORMATO, 'colunas': colunas, 'linhas': len(df)}))
+
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=destino.parent, suffix='.npz.tmp')
+    try:
+        with os.fdopen(descritor, 'wb') as arquivo:
+            np.savez(arquivo, **arrays)
+        os.replace(temporario, destino)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+
+
+def carregar_npz(origem):
+    with np.load(origem, allow_pickle=False) as arrays:
+        meta = json.loads(str(arrays['_meta']))
+        if meta.get('versao') != VERSAO_FORMATO:
+            raise ValueError('Formato de cache antigo')
+        dados = {}
+        for i, coluna in enumerate(meta['colunas']):
+            prefixo = f'c{i}_'
+            if coluna['tipo'] == 'object':
+                dados[coluna['nome']] = _juntar_objetos(prefixo, arrays)
+            else:
+                dados[coluna['nome']] = arrays[f'{prefixo}valores']
+    return pd.DataFrame(dados, index=pd.RangeIndex(meta['linhas']))
+
+
+def podar_cache(pasta, manter=MAXIMO_ARQUIVOS):
+    """Apaga os .npz menos usados além dos `manter` mais recentes e os temporários órfãos."""
+    arquivos = []
+    limite_temporario = time.time() - IDADE_TEMPORARIO_ORFAO
+    for entrada in os.scandir(pasta):
+        try:
+            if entrada.name.endswith('.npz'):
+                arquivos.append((entrada.stat().st_mtime, entrada.path))
+            elif entrada.name.endswith('.npz.tmp') and entrada.stat().st_mtime < limite_temporario:
+                os.unlink(entrada.path)
+        except FileNotFoundError:
+            pass  # outro processo apagou antes
+
+    arquivos.sort(reverse=True)
+    for _, arquivo in arquivos[manter:]:
+        try:
+            os.unlink(arquivo)
+        except FileNotFoundError:
+            pass
+
+
+def ler_excel_com_cache(caminho, aba=0, pasta=None):
+    """
+    pd.read_excel(caminho, sheet_name=aba), usando o cache em `pasta` quando a
+    mesma planilha (mesmo conteúdo) já foi lida. Sem `pasta`, lê direto.
+
+    Devolve (DataFrame, True se veio do cache).
+    """
+    if not pasta:
+        return pd.read_excel(caminho, sheet_name=aba, engine='openpyxl'), False
+
+    destino = caminho_cache(pasta, caminho, aba)
+    if destino.exists():
+        try:
+            df = carregar_npz(destino)
+        except Exception as e:
+            # Arquivo corrompido ou de outra versão: lê de novo e sobrescreve
+            logger.warning('Cache de planilha ilegível (%s), lendo de novo: %s', destino, e)
+        else:
+            try:
+                os.utime(destino)  # usado agora: é dos últimos a sair na poda
+            except OSError:
+                pass
+            return df, True
+
+    df = pd.read_excel(caminho, sheet_name=aba, engine='openpyxl')
+    try:
+        salvar_npz(df, destino)
+        podar_cache(pasta)
+    except (OSError, TypeError, ValueError) as e:
+        # Sem permissão na pasta ou célula de tipo sem suporte: só não guarda
+        logger.warning('Planilha %s não foi guardada no cache (%s): %s', caminho, destino, e)
+    return df, False
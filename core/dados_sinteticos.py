@@ -0,0 +1,390 @@
+# core/dados_sinteticos.py
+
+# Dados sintéticos para medir a aplicação no tamanho da rede estadual inteira
+# (manage.py gerar_dados_sinteticos e manage.py medir_desempenho).
+#
+# Gera escolas, dados SAEPE (DadosFicticiosEscola), visitas técnicas, visitas
+# agendadas (Visita) e relatórios, com valores nas mesmas faixas das
+# planilhas fictícias da GRE. Tudo sai de um gerador NumPy com semente: a
+# mesma escala e a mesma semente dão sempre os mesmos dados.
+#
+# As visitas são geradas GRE a GRE, em lotes, sem montar a lista inteira em
+# memória. Cada lote passa pelo mesmo conversor dos comandos de importação
+# (core/importacao.py), então as linhas gravadas no banco têm o mesmo
+# hash_linha de uma importação e as planilhas .xlsx escritas junto (uma por
+# GRE, com os cabeçalhos das planilhas reais) batem linha a linha com o banco:
+# reimportá-las com --incremental não muda nada.
+
+import datetime
+import re
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .importacao import calcular_hashes, converter_dataframe, instanciar_objetos
+from .models import (DadosFicticiosEscola, Escola, Ocorrencia, Relatorio, Visita, VisitaTecnica)
+
+# Limite de linhas de uma aba do Excel (menos o cabeçalho)
+LINHAS_POR_PLANILHA = 1_048_575
+
+GRES = [
+    'Recife Norte', 'Recife Sul', 'Metropolitana Norte', 'Metropolitana Sul', 'Mata Norte',
+    'Mata Centro', 'Mata Sul', 'Vale do Capibaribe', 'Agreste Centro Norte', 'Agreste Meridional',
+    'Sertão do Moxotó-Ipanema', 'Sertão do Alto Pajeú', 'Sertão do Submédio São Francisco',
+    'Sertão do Médio São Francisco', 'Sertão Central', 'Sertão do Araripe',
+]
+
+TIPOS_ESCOLA = [
+    'Escola Estadual', 'Escola de Referência em Ensino Médio',
+    'Escola de Referência em Ensino Fundamental e Médio', 'Escola Técnica Estadual',
+]
+
+PATRONOS = [
+    'Caio Pereira', 'Dona Maria Teresa', 'Gilberto Freyre', 'Gov Barbosa Lima', 'Jarbas Pernambuco',
+    'Manoel Marques', 'Miguel de Noronha', 'Bartolomeu de Gusmão', 'Moisés Araújo', 'Joaquim Nabuco',
+    'Clarice Lispector', 'Ariano Suassuna', 'Paulo Freire', 'Manuel Bandeira', 'João Cabral de Melo Neto',
+    'Frei Caneca', 'Nelson Rodrigues', 'Luiz Gonzaga', 'Chico Science', 'Ascenso Ferreira',
+    'Dom Helder Câmara', 'Josué de Castro', 'Nise da Silveira', 'Celso Furtado', 'Anita Garibaldi',
+]
+
+NOMES = ['Ana', 'Bruno', 'Mariana', 'Carlos', 'Rita', 'Pedro', 'Lúcia', 'Sônia', 'Marcos', 'Tânia',
+         'José', 'Vera', 'Paulo', 'Fernanda', 'Ricardo', 'Juliana', 'André', 'Patrícia', 'Rafael', 'Cláudia']
+SOBRENOMES = ['Lima', 'Costa', 'Dias', 'Silva', 'Pereira', 'Souza', 'Almeida', 'Ferreira', 'Braga',
+              'Andrade', 'Guedes', 'Lins', 'Cavalcanti', 'Barros', 'Monteiro', 'Albuquerque']
+
+MODALIDADES = ['EFAF/ENME', 'EFAF', 'ENME', 'EFAI']
+
+# Colunas da planilha de visitas, na ordem de lotes_visitas()
+CABECALHO_VISITAS = ['Escola', 'Data da Visita', 'Técnico/Analista - GRE', 'Servidor da Escola',
+                     'Demanda', 'Encaminhamento', 'Observação']
+
+# (demanda, encaminhamento, observação): combinações plausíveis
+ASSUNTOS = [
+    ('Problema no laboratório de informática', 'Verificar computadores', 'Computadores não ligam.'),
+    ('Formação SAEPE para professores', 'Agendar formação', 'Professores com dúvidas sobre a plataforma.'),
+    ('Acompanhamento pedagógico 9º ano', 'Reunião com coordenação', 'Alunos com baixa frequência.'),
+    ('Internet lenta na biblioteca', 'Abrir chamado técnico', 'Sinal de Wi-Fi fraco.'),
+    ('Solicitação de mais livros didáticos', 'Enviar para a secretaria', 'Faltam livros de Matemática.'),
+    ('Verificação estrutural - telhado', 'Relatório para engenharia', 'Infiltração numa das salas.'),
+    ('Problema no quadro elétrico', 'Chamar eletricista', 'Quedas de energia constantes.'),
+    ('Formação sobre novo currículo', 'Disponibilizar material', 'Equipe pedagógica alinhada.'),
+    ('Planejamento de aulas de reforço', 'Recebido pela coordenação', 'Visita de rotina.'),
+    ('Auditoria da merenda escolar', 'Relatório enviado', 'Tudo em conformidade.'),
+    ('Entrega de materiais esportivos', 'Manutenção agendada', 'Faltaram bolas de vôlei.'),
+    ('Problema no ar condicionado da diretoria', 'Abrir chamado técnico', 'Filtro precisa ser trocado.'),
+]
+
+OCORRENCIAS = [
+    'Infraestrutura', 'Falta de professores', 'Merenda escolar', 'Transporte escolar',
+    'Equipamentos de informática', 'Frequência dos alunos', 'Material didático', 'Segurança',
+]
+
+
+@dataclass
+class Escala:
+    escolas: int = 1000
+    visitas: int = 10_000
+    visitas_agendadas: int = 1000
+    relatorios: int = 1000
+    tecnicos_por_gre: int = 4
+    anos: int = 3           # período das visitas, até hoje
+    semente: int = 42
+
+
+def _slug(texto):
+    texto = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '_', texto.lower()).strip('_')
+
+
+class GeradorSintetico:
+    """
+    Gera as linhas de cada tabela já com os cabeçalhos das planilhas de
+    importação. Não toca no banco (ver gravar_no_banco e escrever_planilhas).
+    """
+
+    def __init__(self, escala):
+        self.escala = escala
+        self.rng = np.random.default_rng(escala.semente)
+        self.hoje = datetime.date.today()
+        self.inicio = self.hoje - datetime.timedelta(days=365 * escala.anos)
+
+        n = escala.escolas
+        tipos = self.rng.integers(0, len(TIPOS_ESCOLA), n)
+        patronos = self.rng.integers(0, len(PATRONOS), n)
+        self.nomes_escolas = np.array([
+            f'{TIPOS_ESCOLA[t]} {PATRONOS[p]} nº {i + 1}' for i, (t, p) in enumerate(zip(tipos, patronos))
+        ], dtype=object)
+        self.gre_escola = self.rng.integers(0, len(GRES), n)
+
+        self.tecnicos = np.array([
+            f'{NOMES[self.rng.integers(len(NOMES))]} {SOBRENOMES[self.rng.integers(len(SOBRENOMES))]} (GRE {gre})'
+            for gre in GRES for _ in range(escala.tecnicos_por_gre)
+        ], dtype=object)
+        self.servidores = np.array([f'{nome} {sobrenome}' for nome in NOMES for sobrenome in SOBRENOMES],
+                                   dtype=object)
+        self.assuntos = np.array(ASSUNTOS, dtype=object)
+
+    # ------------------------------------------------------------------
+    # DadosFicticiosEscola (uma ou duas modalidades por escola)
+    # ------------------------------------------------------------------
+
+    def dados_escolas(self):
+        rng = self.rng
+        duas = rng.random(self.escala.escolas) < 0.25
+        escola = np.repeat(np.arange(self.escala.escolas), np.where(duas, 2, 1))
+        n = len(escola)
+        # A segunda modalidade de uma escola nunca repete a primeira (chave da importação)
+        primeira = rng.integers(0, len(MODALIDADES), self.escala.escolas)
+        segunda = (primeira + rng.integers(1, len(MODALIDADES), self.escala.escolas)) % len(MODALIDADES)
+        e_segunda = np.r_[False, escola[1:] == escola[:-1]]
+        modalidade = np.where(e_segunda, segunda[escola], primeira[escola])
+
+        saepe_2022 = np.round(np.clip(rng.normal(4.6, 0.35, n), 3.0, 6.5), 1)
+        alunos = rng.integers(40, 400, n)
+
+        def com_falhas(valores, proporcao=0.02):
+            valores = valores.astype(object)
+            valores[rng.random(n) < proporcao] = None
+            return valores
+
+        return pd.DataFrame({
+            'ESCOLA': self.nomes_escolas[escola],
+            'MODALIDADE': np.array(MODALIDADES, dtype=object)[modalidade],
+            'ALUNOS PREVISTOS SAEPE 2023': com_falhas(alunos),
+            '% PESO': com_falhas(np.round(alunos / 40, 1)),
+            'SAEPE 2022': com_falhas(saepe_2022),
+            'SAEPE 2023': com_falhas(np.round(np.clip(saepe_2022 + rng.normal(0, 0.3, n), 3.0, 6.5), 1)),
+            'PROFICIÊNCIA LP SAEPE 2023': com_falhas(np.clip(rng.normal(240, 15, n), 180, 320).round().astype(int)),
+            'PROFICIÊNCIA MT SAEPE 2023': com_falhas(np.clip(rng.normal(245, 18, n), 180, 330).round().astype(int)),
+            'MATRÍCULA EFAF 2024': com_falhas((alunos * rng.uniform(2.5, 4.5, n)).round().astype(int)),
+        })
+
+    # ------------------------------------------------------------------
+    # VisitaTecnica
+    # ------------------------------------------------------------------
+
+    def visitas_por_gre(self):
+        """Quantas visitas cada GRE recebe (proporcional ao número de escolas dela)."""
+        escolas_por_gre = np.bincount(self.gre_escola, minlength=len(GRES))
+        return self.rng.multinomial(self.escala.visitas, escolas_por_gre / escolas_por_gre.sum())
+
+    def lotes_visitas(self, gre, quantidade, tamanho_lote):
+        """DataFrames (cabeçalhos da planilha de visitas) com `quantidade` visitas da GRE."""
+        rng = self.rng
+        escolas_da_gre = np.flatnonzero(self.gre_escola == gre)
+        # Algumas escolas recebem bem mais visitas que outras
+        peso = rng.pareto(1.5, len(escolas_da_gre)) + 1
+        peso /= peso.sum()
+        dias_periodo = (self.hoje - self.inicio).days
+        tpg = self.escala.tecnicos_por_gre
+
+        for inicio in range(0, quantidade, tamanho_lote):
+            n = min(tamanho_lote, quantidade - inicio)
+            escola = rng.choice(escolas_da_gre, n, p=peso)
+            datas = np.datetime64(self.inicio) + rng.integers(0, dias_periodo, n).astype('timedelta64[D]')
+            # Sábado/domingo passam para segunda-feira (1970-01-01 foi uma quinta)
+            dia_semana = (datas.astype('int64') + 3) % 7
+            datas = datas + np.where(dia_semana >= 5, 7 - dia_semana, 0).astype('timedelta64[D]')
+            datas = np.array([f'{d.day:02d}/{d.month:02d}/{d.year}' for d in datas.astype(object)], dtype=object)
+            datas[rng.random(n) < 0.01] = None  # algumas visitas sem data, como nas planilhas reais
+
+            assunto = self.assuntos[rng.integers(0, len(self.assuntos), n)]
+            encaminhamento = assunto[:, 1].copy()
+            encaminhamento[rng.random(n) < 0.2] = None  # relatório pendente
+
+            yield pd.DataFrame({
+                'Escola': self.nomes_escolas[escola],
+                'Data da Visita': datas,
+                'Técnico/Analista - GRE': self.tecnicos[gre * tpg + rng.integers(0, tpg, n)],
+                'Servidor da Escola': self.servidores[rng.integers(0, len(self.servidores), n)],
+                'Demanda': assunto[:, 0],
+                'Encaminhamento': encaminhamento,
+                'Observação': assunto[:, 2],
+            })
+
+    def todos_lotes_visitas(self, tamanho_lote):
+        """(gre, DataFrame) de todas as visitas, GRE a GRE (a ordem das planilhas)."""
+        for gre, quantidade in enumerate(self.visitas_por_gre()):
+            for lote in self.lotes_visitas(gre, int(quantidade), tamanho_lote):
+                yield gre, lote
+
+
+# ----------------------------------------------------------------------
+# Gravação no banco
+# ----------------------------------------------------------------------
+
+def _gravar_como_importacao(modelo, df, colunas, batch_size):
+    """Converte como a importação (mesmo hash_linha) e grava com bulk_create."""
+    dados, motivos = converter_dataframe(modelo, df, colunas)
+    dados = dados.loc[motivos.isna()].copy()
+    dados['hash_linha'] = calcular_hashes(dados)
+    modelo.objects.bulk_create(instanciar_objetos(modelo, dados), batch_size=batch_size)
+    return len(dados)
+
+
+def _usuarios_sinteticos(quantidade):
+    """Visitantes das visitas agendadas e relatórios (sem senha utilizável)."""
+    nomes = [f'sintetico_{i:02d}' for i in range(1, quantidade + 1)]
+    existentes = set(User.objects.filter(username__in=nomes).values_list('username', flat=True))
+    novos = [User(username=nome, first_name='Visitante', last_name=f'Sintético {nome[-2:]}')
+             for nome in nomes if nome not in existentes]
+    for usuario in novos:
+        usuario.set_unusable_password()
+    User.objects.bulk_create(novos)
+    return list(User.objects.filter(username__in=nomes).values_list('id', flat=True))
+
+
+def gravar_no_banco(gerador, colunas_visitas, colunas_dados, tamanho_lote=10_000, progresso=None):
+    """
+    Grava escolas, dados SAEPE, visitas técnicas, visitas agendadas e
+    relatórios. Devolve {tabela: linhas gravadas}.
+    """
+    progresso = progresso or (lambda mensagem: None)
+    escala = gerador.escala
+    contagem = {}
+
+    ids_escolas = Escola.resolver_ids(gerador.nomes_escolas)
+    contagem['escolas'] = len(ids_escolas)
+    progresso(f'{len(ids_escolas)} escolas')
+
+    with transaction.atomic():
+        contagem['dados_escolas'] = _gravar_como_importacao(
+            DadosFicticiosEscola, gerador.dados_escolas(), colunas_dados, tamanho_lote)
+    progresso(f"{contagem['dados_escolas']} linhas de dados SAEPE")
+
+    contagem['visitas_tecnicas'] = 0
+    for _, lote in gerador.todos_lotes_visitas(tamanho_lote):
+        with transaction.atomic():
+            contagem['visitas_tecnicas'] += _gravar_como_importacao(VisitaTecnica, lote, colunas_visitas, tamanho_lote)
+        progresso(f"{contagem['visitas_tecnicas']}/{escala.visitas} visitas técnicas")
+
+    rng = gerador.rng
+    visitantes = _usuarios_sinteticos(max(1, min(20, len(GRES) * escala.tecnicos_por_gre)))
+    lista_escolas = np.array([ids_escolas[nome] for nome in gerador.nomes_escolas])
+    dias_periodo = (gerador.hoje - gerador.inicio).days
+
+    contagem['visitas_agendadas'] = 0
+    for inicio in range(0, escala.visitas_agendadas, tamanho_lote):
+        n = min(tamanho_lote, escala.visitas_agendadas - inicio)
+        # Agendadas ficam no futuro (próximos 90 dias); realizadas, no período das visitas
+        agendada = rng.random(n) < 0.3
+        deslocamento = np.where(agendada, rng.integers(1, 90, n), -rng.integers(0, dias_periodo, n))
+        Visita.objects.bulk_create([
+            Visita(
+                escola_id=int(escola), visitante_id=int(visitante),
+                recebido_por=gerador.servidores[servidor], objetivo=ASSUNTOS[assunto][0],
+                data_visita=gerador.hoje + datetime.timedelta(days=int(dias)),
+                hora_visita=datetime.time(int(hora), 0),
+                status='agendada' if e_agendada else 'realizada',
+            )
+            for escola, visitante, servidor, assunto, dias, hora, e_agendada in zip(
+                rng.choice(lista_escolas, n), rng.choice(visitantes, n),
+                rng.integers(0, len(gerador.servidores), n), rng.integers(0, len(ASSUNTOS), n),
+                deslocamento, rng.integers(7, 18, n), agendada,
+            )
+        ], batch_size=tamanho_lote)
+        contagem['visitas_agendadas'] += n
+
+    ocorrencias = [Ocorrencia.objects.get_or_create(descricao=descricao)[0].pk for descricao in OCORRENCIAS]
+    Ligacao = Relatorio.ocorrencias.through
+    contagem['relatorios'] = 0
+    for inicio in range(0, escala.relatorios, tamanho_lote):
+        n = min(tamanho_lote, escala.relatorios - inicio)
+        with transaction.atomic():
+            relatorios = Relatorio.objects.bulk_create([
+                Relatorio(escola_id=int(escola), visitante_id=int(visitante), detalhes=ASSUNTOS[assunto][2])
+                for escola, visitante, assunto in zip(
+                    rng.choice(lista_escolas, n), rng.choice(visitantes, n), rng.integers(0, len(ASSUNTOS), n))
+            ], batch_size=tamanho_lote)
+            if relatorios[0].pk is None:  # bancos sem RETURNING: busca os ids gravados agora
+                relatorios = list(Relatorio.objects.order_by('-id')[:n])
+            Ligacao.objects.bulk_create([
+                Ligacao(relatorio_id=relatorio.pk, ocorrencia_id=int(ocorrencia))
+                for relatorio in relatorios
+                for ocorrencia in rng.choice(ocorrencias, rng.integers(1, 4), replace=False)
+            ], batch_size=tamanho_lote)
+        contagem['relatorios'] += n
+
+    return contagem
+
+
+# ----------------------------------------------------------------------
+# Planilhas .xlsx
+# ----------------------------------------------------------------------
+
+def _escrever_planilha(caminho, linhas_df, cabecalho=None):
+    """
+    Escreve DataFrames (mesmos cabeçalhos) numa planilha, linha a linha (write_only).
+
+    Com `cabecalho`, a planilha sai com ele mesmo sem nenhuma linha (GRE sem visitas).
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    aba = workbook.create_sheet('Sheet1')
+    if cabecalho is not None:
+        aba.append(cabecalho)
+    for df in linhas_df:
+        if cabecalho is None:
+            cabecalho = list(df.columns)
+            aba.append(cabecalho)
+        # None em vez de NaN: célula vazia
+        for linha in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+            aba.append(linha)
+    workbook.save(caminho)
+
+
+def escrever_planilhas(gerador, pasta, tamanho_lote=10_000, progresso=None):
+    """
+    Planilhas iguais às gravadas no banco:
+      <pasta>/acompanhamento/acompanhamento_escolas.xlsx  (importar_ficticio)
+      <pasta>/visitas/visitas_gre_NN_<gre>.xlsx           (importar_visitas, uma por GRE)
+
+    Usa um GeradorSintetico novo com a mesma escala: as linhas saem na mesma
+    ordem de gravar_no_banco. Devolve a lista de arquivos escritos.
+    """
+    progresso = progresso or (lambda mensagem: None)
+    pasta = Path(pasta)
+    (pasta / 'acompanhamento').mkdir(parents=True, exist_ok=True)
+    (pasta / 'visitas').mkdir(parents=True, exist_ok=True)
+
+    escritos = [pasta / 'acompanhamento' / 'acompanhamento_escolas.xlsx']
+    _escrever_planilha(escritos[0], [gerador.dados_escolas()])
+    progresso(str(escritos[0]))
+
+    for gre, quantidade in enumerate(gerador.visitas_por_gre()):
+        lotes = _Fatiador(gerador.lotes_visitas(gre, int(quantidade), tamanho_lote))
+        # Uma GRE com mais linhas do que cabem numa aba vira várias planilhas
+        partes = max(1, -(-int(quantidade) // LINHAS_POR_PLANILHA))
+        for parte in range(partes):
+            sufixo = f'_parte{parte + 1}' if partes > 1 else ''
+            caminho = pasta / 'visitas' / f'visitas_gre_{gre + 1:02d}_{_slug(GRES[gre])}{sufixo}.xlsx'
+            _escrever_planilha(caminho, lotes.ate(LINHAS_POR_PLANILHA), CABECALHO_VISITAS)
+            escritos.append(caminho)
+            progresso(str(caminho))
+    return escritos
+
+
+class _Fatiador:
+    """Reparte um iterador de DataFrames em blocos de no máximo N linhas, sem pular nenhuma."""
+
+    def __init__(self, lotes):
+        self.lotes = lotes
+        self.sobra = None
+
+    def ate(self, limite):
+        while limite > 0:
+            lote, self.sobra = self.sobra, None
+            if lote is None:
+                lote = next(self.lotes, None)
+                if lote is None:
+                    return
+            if len(lote) > limite:
+                lote, self.sobra = lote.iloc[:limite], lote.iloc[limite:]
+            limite -= len(lote)
+            yield lote
@@ -0,0 +1,69 @@
+# core/escolhas.py
+
+# Listas de opções dos dropdowns (escolas e técnicos).
+#
+# Cada lista só é consultada no banco na primeira vez que um formulário
+# precisa dela e fica guardada no processo. Ela é refeita quando:
+#   - alguém chama invalidar_escolhas() (importações e formulário de visita), ou
+#   - a versão dos dados (core.cache_dados) mudou, o que cobre escritas
+#     feitas por outro processo, como um comando de importação.
+# Com o banco vazio ou ainda sem migrações a lista sai vazia e não é guardada.
+# A versão dos dados é lida uma vez por requisição (ver core/cache_dados.py).
+
+import threading
+
+from django.db import DatabaseError
+
+from .cache_dados import versao_dados
+from .models import DadosFicticiosEscola, VisitaTecnica
+
+
+class ProvedorEscolhas:
+    def __init__(self, consulta):
+        self.consulta = consulta
+        self._lista = None
+        self._versao = None
+        self._trava = threading.Lock()
+
+    def lista(self):
+        versao = versao_dados()
+        with self._trava:
+            # Cópia local: outra thread pode chamar invalidar() logo depois de sair da trava
+            lista = self._lista
+            if lista is None or self._versao != versao:
+                try:
+                    lista = list(self.consulta())
+                except DatabaseError:
+                    # Tabela ainda não existe (migrate não rodou): tenta de novo na próxima
+                    return []
+                self._lista, self._versao = lista, versao
+        return lista
+
+    def com_opcao_vazia(self, texto):
+        """Callable para o `choices=` do ChoiceField (avaliado só quando o formulário é usado)."""
+        return lambda: [('', texto)] + self.lista()
+
+    def invalidar(self):
+        with self._trava:
+            self._lista = None
+
+
+# Escolas que têm dados no dashboard (valor = id da escola, texto = nome)
+ESCOLAS = ProvedorEscolhas(
+    lambda: DadosFicticiosEscola.objects.values_list('escola_id', 'escola__nome')
+                                       .distinct()
+                                       .order_by('escola__nome')
+)
+
+# Técnicos que já aparecem nas visitas importadas
+TECNICOS = ProvedorEscolhas(
+    lambda: VisitaTecnica.objects.values_list('tecnico_gre', 'tecnico_gre')
+                                 .exclude(tecnico_gre=None)
+                                 .distinct()
+                                 .order_by('tecnico_gre')
+)
+
+
+def invalidar_escolhas():
+    ESCOLAS.invalidar()
+    TECNICOS.invalidar()
@@ -0,0 +1,191 @@
+# core/exportacao.py
+
+# Exportação de VisitaTecnica e DadosFicticiosEscola em CSV ou XLSX.
+#
+# As linhas saem do banco com .iterator(chunk_size=...), sem montar a lista
+# inteira em memória:
+#   - CSV: StreamingHttpResponse; o cabeçalho e os primeiros lotes vão para o
+#     navegador enquanto o resto ainda está sendo lido.
+#   - XLSX: o formato é um zip que só fica completo no fim, então não dá para
+#     mandar antes de terminar. O workbook "write_only" do openpyxl grava as
+#     linhas num arquivo temporário à medida que chegam e a resposta envia esse
+#     arquivo aos pedaços (FileResponse). A memória continua constante.
+#
+# Os cabeçalhos são os mesmos das planilhas aceitas pelos comandos de
+# importação, então um arquivo exportado pode ser importado de volta.
+#
+# Textos livres (demanda, encaminhamento, observação...) não podem virar
+# fórmula na planilha de quem abre o arquivo:
+#   - CSV: o Excel/LibreOffice trata como fórmula a célula que começa com
+#     =, +, -, @, tab ou CR; esses textos saem com um apóstrofo na frente.
+#   - XLSX: o openpyxl gravaria como fórmula o texto que começa com =; a
+#     célula é gravada como texto, com o valor intacto.
+
+import csv
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .models import DadosFicticiosEscola, VisitaTecnica
+
+TAMANHO_LOTE_EXPORTACAO = 2000
+
+INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+# (cabeçalho, campo para o values_list)
+COLUNAS_VISITAS = [
+    ('Escola', 'escola__nome'),
+    ('Data da Visita', 'data_visita'),
+    ('Técnico/Analista - GRE', 'tecnico_gre'),
+    ('Servidor da Escola', 'servidor_escola'),
+    ('Demanda', 'demanda'),
+    ('Encaminhamento', 'encaminhamento'),
+    ('Observação', 'observacao'),
+]
+
+COLUNAS_DADOS_ESCOLAS = [
+    ('ESCOLA', 'escola__nome'),
+    ('MODALIDADE', 'modalidade'),
+    ('ALUNOS PREVISTOS SAEPE 2023', 'alunos_previstos_2023'),
+    ('% PESO', 'percentual_peso'),
+    ('SAEPE 2022', 'saepe_2022'),
+    ('SAEPE 2023', 'saepe_2023'),
+    ('PROFICIÊNCIA LP SAEPE 2023', 'proficiencia_lp_2023'),
+    ('PROFICIÊNCIA MT SAEPE 2023', 'proficiencia_mt_2023'),
+    ('MATRÍCULA EFAF 2024', 'matricula_efaf_2024'),
+]
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def visitas_filtradas(escola_id=None, tecnico=None, data_inicio=None, data_fim=None):
+    visitas = VisitaTecnica.objects.all()
+    if escola_id:
+        visitas = visitas.filter(escola_id=escola_id)
+    if tecnico:
+        visitas = visitas.filter(tecnico_gre=tecnico)
+    if data_inicio:
+        visitas = visitas.filter(data_visita__gte=data_inicio)
+    if data_fim:
+        visitas = visitas.filter(data_visita__lte=data_fim)
+    # Ordem do id (a da tabela): o banco começa a devolver linhas na hora, sem
+    # precisar ordenar tudo antes como faria um ORDER BY escola/data
+    return visitas.order_by('id')
+
+
+def dados_escolas_filtrados(escola_id=None):
+    dados = DadosFicticiosEscola.objects.all()
+    if escola_id:
+        dados = dados.filter(escola_id=escola_id)
+    return dados.order_by('id')
+
+
+def _linhas(queryset, colunas):
+    campos = [campo for _, campo in colunas]
+    return queryset.values_list(*campos).iterator(chunk_size=TAMANHO_LOTE_EXPORTACAO)
+
+
+def _linha_csv(linha):
+    return [
+        "'" + valor if isinstance(valor, str) and valor.startswith(INICIO_FORMULA) else valor
+        for valor in linha
+    ]
+
+
+def _linha_xlsx(planilha, linha):
+    from openpyxl.cell import WriteOnlyCell
+
+    celulas = []
+    for valor in linha:
+        if isinstance(valor, str) and valor.startswith('='):
+            valor = WriteOnlyCell(planilha, valor)
+            valor.data_type = 's'
+        celulas.append(valor)
+    return celulas
+
+
+class _Eco:
+    """'Arquivo' do csv.writer que devolve a linha em vez de guardar."""
+    def write(self, valor):
+        return valor
+
+
+def _gerar_csv(queryset, colunas):
+    escritor = csv.writer(_Eco())
+    # BOM para o Excel abrir com acentos corretos (mesmo utf-8-sig dos rejeitados)
+    yield '\ufeff' + escritor.writerow([cabecalho for cabecalho, _ in colunas])
+    for linha in _linhas(queryset, colunas):
+        yield escritor.writerow(_linha_csv(linha))
+
+
+def _arquivo_xlsx(queryset, colunas, titulo):
+    from openpyxl import Workbook  # só quem exporta XLSX paga o import
+
+    workbook = Workbook(write_only=True)
+    planilha = workbook.create_sheet(title=titulo)
+    planilha.append([cabecalho for cabecalho, _ in colunas])
+    for linha in _linhas(queryset, colunas):
+        planilha.append(_linha_xlsx(planilha, linha))
+
+    arquivo = tempfile.TemporaryFile()
+    workbook.save(arquivo)
+    arquivo.seek(0)
+    return arquivo
+
+
+def resposta_exportacao(queryset, colunas, formato, nome_base):
+    """StreamingHttpResponse (CSV) ou FileResponse (XLSX) com as linhas do queryset."""
+    nome_arquivo = f"{nome_base}_{timezone.localdate():%Y%m%d}.{formato}"
+
+    if formato == 'xlsx':
+        return FileResponse(
+            _arquivo_xlsx(queryset, colunas, titulo=nome_base[:31]),
+            as_attachment=True, filename=nome_arquivo, content_type=FORMATOS['xlsx'],
+        )
+
+    resposta = StreamingHttpResponse(_gerar_csv(queryset, colunas), content_type=FORMATOS['csv'])
+    resposta['Content-Disposition'] = f'attachment; filename="{nome_arquivo}"'
+    return resposta
+
+
+def gravar_exportacao(queryset, colunas, formato, caminho, titulo='dados', progresso=None):
+    """
+    Grava a exportação em `caminho` (tarefas em segundo plano, core/tarefas.py).
+
+    `progresso(linhas, total)` é chamado a cada lote lido do banco. Devolve o
+    número de linhas exportadas.
+    """
+    total = queryset.count()
+    linhas_exportadas = 0
+
+    def linhas():
+        nonlocal linhas_exportadas
+        for linha in _linhas(queryset, colunas):
+            yield linha
+            linhas_exportadas += 1
+            if progresso and linhas_exportadas % TAMANHO_LOTE_EXPORTACAO == 0:
+                progresso(linhas_exportadas, total)
+
+    cabecalho = [cabecalho for cabecalho, _ in colunas]
+    if formato == 'xlsx':
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        planilha = workbook.create_sheet(title=titulo[:31])
+        planilha.append(cabecalho)
+        for linha in linhas():
+            planilha.append(_linha_xlsx(planilha, linha))
+        workbook.save(caminho)
+    else:
+        with open(caminho, 'w', newline='', encoding='utf-8-sig') as arquivo:
+            escritor = csv.writer(arquivo)
+            escritor.writerow(cabecalho)
+            escritor.writerows(_linha_csv(linha) for linha in linhas())
+
+    if progresso:
+        progresso(linhas_exportadas, total)
+    return linhas_exportadas
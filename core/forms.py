@@ -2,6 +2,7 @@
 
 from django import forms
 from .models import Visita, Escola, DadosFicticiosEscola, VisitaTecnica
+from .escolhas import ESCOLAS, TECNICOS, invalidar_escolhas
 
 class VisitaForm(forms.ModelForm):
     class Meta:
@@ -47,56 +48,38 @@ class VisitaForm(forms.ModelForm):
 
 
 class EscolaSelectForm(forms.Form):
-    
-    # 1. Busca os nomes das escolas no NOVO banco de dados (DadosFicticiosEscola)
-    lista_de_escolas = list(
-        DadosFicticiosEscola.objects.values_list('escola', 'escola') # (valor, texto_exibido)
-                                   .distinct()                 # Garante que cada escola apareça só 1 vez
-                                   .order_by('escola')         # Ordem alfabética
-    )
-    
-    # 2. Adiciona a opção "Todas as Escolas" no começo
-    ESCOLAS_CHOICES = [
-        ('', 'Todas as Escolas (Visão Geral)') # O valor '' significa "nenhum filtro"
-    ] + lista_de_escolas
 
-    # 3. Cria o campo do formulário
+    # Cria o campo do formulário
+    # (a lista de escolas só é buscada quando o formulário é usado; ver core/escolhas.py)
     escola = forms.ChoiceField(
-        choices=ESCOLAS_CHOICES, # Usa nossa lista dinâmica
+        choices=ESCOLAS.com_opcao_vazia('Todas as Escolas (Visão Geral)'), # O valor '' significa "nenhum filtro"
         required=False,
         label="Filtrar por Escola",
         # Isso adiciona a classe CSS do Bootstrap para ficar bonito
         widget=forms.Select(attrs={'class': 'form-select'}) 
     )
 
+    # Métrica do ranking "Top 5" da Visão Geral
+    metrica = forms.ChoiceField(
+        choices=[(codigo, rotulo) for codigo, (_, _, rotulo) in DadosFicticiosEscola.METRICAS.items()],
+        required=False,
+        label="Classificar por",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    def clean_metrica(self):
+        return self.cleaned_data.get('metrica') or DadosFicticiosEscola.METRICA_PADRAO
+
 # ----------------------------------------------------
 # 3. FORMULÁRIO PARA O POPUP DE VISITA TÉCNICA (NOVO)
 # ----------------------------------------------------
 class VisitaTecnicaForm(forms.ModelForm):
 
-    # 1. Vamos criar uma lista de ESCOLAS para o dropdown
-    # Buscamos do seu banco de dados de escolas (o do dashboard)
-    lista_escolas = list(
-        DadosFicticiosEscola.objects.values_list('escola', 'escola')
-                                   .distinct()
-                                   .order_by('escola')
-    )
-    ESCOLAS_CHOICES = [('', 'Selecione a escola...')] + lista_escolas
-
-    # 2. Vamos criar uma lista de TÉCNICOS para o dropdown
-    # Buscamos da própria tabela de visitas que acabámos de importar
-    lista_tecnicos = list(
-        VisitaTecnica.objects.values_list('tecnico_gre', 'tecnico_gre')
-                             .exclude(tecnico_gre=None) # Remove valores nulos
-                             .distinct()
-                             .order_by('tecnico_gre')
-    )
-    TECNICOS_CHOICES = [('', 'Selecione o técnico...')] + lista_tecnicos
-
-    # 3. Definimos os campos do formulário
+    # Os dropdowns de ESCOLAS (do banco do dashboard) e de TÉCNICOS
+    # (da tabela de visitas) usam as listas guardadas em core/escolhas.py
     escola = forms.ChoiceField(
         label="Escola",
-        choices=ESCOLAS_CHOICES,
+        choices=ESCOLAS.com_opcao_vazia('Selecione a escola...'),
         widget=forms.Select(attrs={'class': 'form-select'})
     )
     data_visita = forms.DateField(
@@ -106,7 +89,7 @@ class VisitaTecnicaForm(forms.ModelForm):
     )
     tecnico_gre = forms.ChoiceField(
         label="Técnico/Analista - GRE",
-        choices=TECNICOS_CHOICES,
+        choices=TECNICOS.com_opcao_vazia('Selecione o técnico...'),
         widget=forms.Select(attrs={'class': 'form-select'})
     )
     servidor_escola = forms.CharField(
@@ -128,8 +111,76 @@ class VisitaTecnicaForm(forms.ModelForm):
         required=False # Este campo é opcional
     )
 
+    def clean_escola(self):
+        # O ChoiceField devolve o id como texto; o modelo espera a Escola
+        try:
+            return Escola.objects.get(pk=self.cleaned_data['escola'])
+        except Escola.DoesNotExist:
+            # A lista de opções pode estar atrasada em relação ao banco
+            raise forms.ValidationError('Escola não encontrada. Atualize a página e escolha de novo.')
+
+    def save(self, commit=True):
+        visita = super().save(commit)
+        if commit:
+            # Visita nova pode trazer escola/técnico que ainda não estava nas listas
+            invalidar_escolhas()
+        return visita
+
     class Meta:
         model = VisitaTecnica  # O nosso "molde"
         # Os campos do modelo que este formulário vai usar
         fields = ['escola', 'data_visita', 'tecnico_gre', 'servidor_escola', 
-                  'demanda', 'encaminhamento', 'observacao']
\ No newline at end of file
+                  'demanda', 'encaminhamento', 'observacao']
+
+
+# ----------------------------------------------------
+# FILTROS DA EXPORTAÇÃO (CSV / XLSX)
+# ----------------------------------------------------
+class FiltroExportacaoForm(forms.Form):
+    formato = forms.ChoiceField(choices=[('csv', 'CSV'), ('xlsx', 'Excel (XLSX)')], required=False)
+    escola = forms.IntegerField(required=False, min_value=1)
+    tecnico = forms.CharField(required=False, max_length=255)
+    data_inicio = forms.DateField(required=False)
+    data_fim = forms.DateField(required=False)
+
+    def clean_formato(self):
+        return self.cleaned_data.get('formato') or 'csv'
+
+    def clean(self):
+        dados = super().clean()
+        if dados.get('data_inicio') and dados.get('data_fim') and dados['data_inicio'] > dados['data_fim']:
+            raise forms.ValidationError('A data inicial é maior que a data final.')
+        return dados
+
+
+class NovaTarefaForm(FiltroExportacaoForm):
+    """Pedido de tarefa em segundo plano (core/tarefas.py); os filtros valem para o tipo 'exportar'."""
+    tipo = forms.ChoiceField(label='Tarefa')
+    tabela = forms.ChoiceField(choices=[('visitas', 'Visitas técnicas'), ('dados_escolas', 'Dados das escolas')],
+                               required=False)
+    incremental = forms.BooleanField(required=False, initial=True,
+                                     label='Importação incremental (só o que mudou)')
+
+    def __init__(self, *args, usuario=None, **kwargs):
+        from .tarefas import TIPOS
+        super().__init__(*args, **kwargs)
+        self.fields['tipo'].choices = [
+            (nome, tipo['rotulo']) for nome, tipo in TIPOS.items()
+            if not tipo['so_staff'] or (usuario is not None and usuario.is_staff)
+        ]
+
+    def parametros(self):
+        """Parâmetros guardados na tarefa (só tipos JSON)."""
+        dados = self.cleaned_data
+        if dados['tipo'] in ('importar_visitas', 'importar_ficticio'):
+            return {'incremental': dados['incremental']}
+        if dados['tipo'] == 'exportar':
+            return {
+                'tabela': dados['tabela'] or 'visitas',
+                'formato': dados['formato'],
+                'escola': dados['escola'],
+                'tecnico': dados['tecnico'] or None,
+                'data_inicio': dados['data_inicio'].isoformat() if dados['data_inicio'] else None,
+                'data_fim': dados['data_fim'].isoformat() if dados['data_fim'] else None,
+            }
+        return {}
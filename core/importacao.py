@@ -0,0 +1,430 @@
+# core/importacao.py
+
+# Motor de importação compartilhado pelos comandos importar_visitas e
+# importar_ficticio. Em vez de percorrer o DataFrame linha a linha com
+# objects.create(), as colunas são convertidas de uma vez (vetorizado),
+# as linhas inválidas são separadas num ficheiro de rejeitados e o resto
+# é gravado com bulk_create em lotes, tudo dentro de uma única transação.
+#
+# Com várias planilhas (uma por GRE), a leitura do Excel, que é a parte
+# pesada e só usa CPU, é feita em paralelo num ProcessPoolExecutor. Os
+# processos só leem e devolvem DataFrames; quem converte e grava no banco
+# é sempre o processo principal, numa transação só.
+
+import hashlib
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+from django.db import models, transaction
+
+from .cache_planilhas import ler_excel_com_cache
+
+
+TAMANHO_LOTE_PADRAO = 1000
+EXTENSOES_PLANILHA = ('.xlsx', '.xlsm', '.xls')
+
+
+class ErroImportacao(Exception):
+    """Erro que impede a importação inteira (ex: coluna ausente na planilha)."""
+
+
+@dataclass
+class ResultadoImportacao:
+    total: int = 0
+    inseridos: int = 0
+    atualizados: int = 0
+    removidos: int = 0
+    inalterados: int = 0
+    rejeitados: int = 0
+    segundos: float = 0.0
+    caminho_rejeitados: str = None
+    incremental: bool = False
+
+    @property
+    def linhas_por_segundo(self):
+        if not self.segundos:
+            return 0.0
+        return self.total / self.segundos
+
+    def resumo(self):
+        if self.incremental:
+            texto = (
+                f'{self.inseridos} inseridas, {self.atualizados} atualizadas, '
+                f'{self.removidos} removidas, {self.inalterados} inalteradas, '
+                f'{self.rejeitados} rejeitadas'
+            )
+        else:
+            texto = f'{self.inseridos} linhas gravadas, {self.rejeitados} rejeitadas'
+        texto += (
+            f' de {self.total} em {self.segundos:.2f}s '
+            f'({self.linhas_por_segundo:.0f} linhas/s)'
+        )
+        if self.caminho_rejeitados:
+            texto += f'. Rejeitadas salvas em {self.caminho_rejeitados}'
+        return texto
+
+
+# ------------------------------------------------------------------
+# Leitura das planilhas (em paralelo quando são várias)
+# ------------------------------------------------------------------
+
+@dataclass
+class AlteracoesImportacao:
+    """
+    O que a importação vai gravar, passado ao `ao_gravar` antes das escritas
+    e dentro da mesma transação (as linhas antigas ainda estão no banco).
+    Os DataFrames têm as colunas já convertidas (attname dos campos).
+    """
+    inseridos: pd.DataFrame
+    alterados: pd.DataFrame = None  # conteúdo novo das linhas em ids_alterados
+    ids_alterados: list = ()
+    ids_removidos: list = ()
+    tabela_limpa: bool = False      # importação completa: todas as linhas antigas saem
+
+
+def expandir_caminhos(entradas):
+    """Lista de ficheiros e/ou pastas -> planilhas a ler (pastas: todas as planilhas dentro, por nome)."""
+    caminhos = []
+    for entrada in entradas:
+        entrada = Path(entrada)
+        if entrada.is_dir():
+            caminhos += sorted(p for p in entrada.iterdir()
+                               if p.suffix.lower() in EXTENSOES_PLANILHA and not p.name.startswith('~$'))
+        elif entrada.is_file():
+            caminhos.append(entrada)
+        else:
+            raise ErroImportacao(f'Ficheiro ou pasta não encontrado: {entrada}')
+    if not caminhos:
+        raise ErroImportacao('Nenhuma planilha encontrada nos caminhos informados.')
+    return caminhos
+
+
+def ler_planilha(caminho, colunas, pasta_cache=None):
+    """
+    Lê uma planilha e devolve só as colunas usadas, mais 'arquivo' e 'linha_excel'
+    para localizar as rejeitadas. Roda dentro dos processos do pool.
+
+    Com `pasta_cache`, uma planilha já lida antes (mesmo conteúdo) vem do
+    cache em .npz em vez de passar pelo openpyxl (ver core/cache_planilhas.py).
+    Devolve (DataFrame, True se veio do cache).
+    """
+    try:
+        df, do_cache = ler_excel_com_cache(caminho, pasta=pasta_cache)
+    except Exception as e:
+        raise ErroImportacao(f'Erro ao ler {caminho}: {e}') from None
+
+    faltando = [coluna for coluna in colunas if coluna not in df.columns]
+    if faltando:
+        raise ErroImportacao(f'Colunas ausentes em {Path(caminho).name}: {", ".join(faltando)}')
+
+    df = df[list(colunas)]
+    df.insert(0, 'linha_excel', df.index + 2)  # +1 cabeçalho, +1 base 1
+    df.insert(0, 'arquivo', Path(caminho).name)
+    return df, do_cache
+
+
+def ler_planilhas(caminhos, colunas, processos=None, pasta_cache=None):
+    """
+    Lê todas as planilhas e junta num DataFrame só, na ordem dos caminhos.
+
+    Cada planilha é lida por um processo do pool (até `processos`, padrão:
+    número de CPUs). Com uma planilha só, ou processos=1, lê aqui mesmo.
+    Quantas vieram do cache fica em df.attrs['planilhas_do_cache'].
+    """
+    processos = min(processos or os.cpu_count() or 1, len(caminhos))
+    argumentos = (caminhos, [colunas] * len(caminhos), [pasta_cache] * len(caminhos))
+    if processos <= 1:
+        lidas = list(map(ler_planilha, *argumentos))
+    else:
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            lidas = list(pool.map(ler_planilha, *argumentos))
+
+    df = pd.concat([parte for parte, _ in lidas], ignore_index=True)
+    df.attrs['planilhas_do_cache'] = sum(do_cache for _, do_cache in lidas)
+    return df
+
+
+# ------------------------------------------------------------------
+# Conversão das colunas (tudo vetorizado, nada de iterrows)
+# ------------------------------------------------------------------
+
+def _converter_texto(serie, campo):
+    convertida = serie.astype('string').str.strip()
+    convertida = convertida.mask(convertida == '')
+    invalida = pd.Series(False, index=serie.index)
+    if campo.max_length:
+        invalida = (convertida.str.len() > campo.max_length).fillna(False)
+    return convertida, invalida
+
+
+def _converter_inteiro(serie, campo):
+    numeros = pd.to_numeric(serie, errors='coerce')
+    # 3.5 num campo inteiro é erro de digitação, não arredondamos
+    invalida = numeros.notna() & (numeros % 1 != 0)
+    return numeros.where(~invalida).astype('Int64'), invalida
+
+
+def _converter_decimal(serie, campo):
+    numeros = pd.to_numeric(serie, errors='coerce')
+    return numeros.astype('Float64'), pd.Series(False, index=serie.index)
+
+
+def _converter_data(serie, campo):
+    # As planilhas da GRE usam dd/mm/aaaa, mas o Excel às vezes já entrega datetime
+    datas = pd.to_datetime(serie, errors='coerce', dayfirst=True, format='mixed')
+    return datas.dt.date.astype(object).where(datas.notna()), pd.Series(False, index=serie.index)
+
+
+def _converter_escola(serie, campo):
+    # O Excel traz o nome; resolvemos todos os nomes para ids de uma vez só
+    nomes, invalida = _converter_texto(serie, campo.related_model._meta.get_field('nome'))
+    ids = campo.related_model.resolver_ids(nomes[nomes.notna() & ~invalida].unique())
+    return nomes.where(~invalida).map(ids).astype('Int64'), invalida
+
+
+CONVERSORES = [
+    (models.ForeignKey, _converter_escola),
+    (models.DateField, _converter_data),
+    (models.IntegerField, _converter_inteiro),
+    (models.FloatField, _converter_decimal),
+    (models.CharField, _converter_texto),
+    (models.TextField, _converter_texto),
+]
+
+
+def _conversor_para(campo):
+    for tipo, conversor in CONVERSORES:
+        if isinstance(campo, tipo):
+            return conversor
+    raise ErroImportacao(f'Tipo de campo não suportado na importação: {campo.name}')
+
+
+def converter_dataframe(modelo, df, colunas):
+    """
+    Converte o DataFrame lido do Excel para os tipos dos campos do modelo.
+
+    `colunas` mapeia 'NOME DA COLUNA NO EXCEL' -> 'campo_do_modelo'. O tipo
+    de cada coluna e a obrigatoriedade vêm da definição do próprio campo.
+    Chaves estrangeiras (a escola) saem como ids, na coluna `campo_id`.
+    Devolve (dados convertidos, motivo da rejeição por linha ou None).
+    """
+    faltando = [coluna for coluna in colunas if coluna not in df.columns]
+    if faltando:
+        raise ErroImportacao(f'Colunas ausentes na planilha: {", ".join(faltando)}')
+
+    convertido = pd.DataFrame(index=df.index)
+    motivos = pd.Series(None, index=df.index, dtype=object)
+
+    for coluna, nome_campo in colunas.items():
+        campo = modelo._meta.get_field(nome_campo)
+        original = df[coluna]
+        valores, invalida = _conversor_para(campo)(original, campo)
+
+        # Tinha algo na célula, mas a conversão não conseguiu aproveitar
+        invalida = invalida | (valores.isna() & original.notna() & (original.astype(str).str.strip() != ''))
+        motivos = motivos.mask(motivos.isna() & invalida, f"valor inválido em '{coluna}'")
+
+        if not campo.null:
+            vazia = valores.isna() & ~invalida
+            motivos = motivos.mask(motivos.isna() & vazia, f"'{coluna}' é obrigatório")
+
+        convertido[campo.attname] = valores
+
+    return convertido, motivos
+
+
+# ------------------------------------------------------------------
+# Impressão digital das linhas (para a importação incremental)
+# ------------------------------------------------------------------
+
+SEPARADOR = '\x1f'
+
+
+def _como_texto(serie):
+    return serie.astype(object).where(serie.notna(), '').astype(str)
+
+
+def calcular_hashes(dados):
+    """SHA-1 do conteúdo já convertido de cada linha (o formato da célula no Excel não importa)."""
+    partes = [_como_texto(dados[c]) for c in dados.columns]
+    texto = partes[0].str.cat(partes[1:], sep=SEPARADOR)
+    return texto.map(lambda t: hashlib.sha1(t.encode('utf-8')).hexdigest())
+
+
+def calcular_chaves(dados, chave):
+    """
+    Chave natural de cada linha + número da ocorrência.
+
+    A mesma escola pode receber duas visitas do mesmo técnico no mesmo dia, então
+    as repetições são numeradas (0, 1, 2...) pela ordem em que aparecem.
+    """
+    partes = [_como_texto(dados[c]) for c in chave]
+    ocorrencia = pd.concat(partes, axis=1).groupby(chave, sort=False).cumcount()
+    return list(zip(*partes, ocorrencia))
+
+
+def _chaves_existentes(modelo, chave):
+    """
+    Lê só (id, hash, chave) das linhas importadas e numera as repetições na ordem do id.
+
+    Registros sem hash (criados pelo sistema, ex: visitas do formulário) ficam
+    de fora: não ocupam números de ocorrência nem são confundidos com uma linha
+    da planilha de mesma chave.
+    """
+    existentes = {}
+    contagem = defaultdict(int)
+    linhas = modelo.objects.exclude(hash_linha='').order_by('id').values_list('id', 'hash_linha', *chave)
+    for pk, hash_linha, *valores in linhas.iterator(chunk_size=5000):
+        base = tuple('' if v is None else str(v) for v in valores)
+        existentes[base + (contagem[base],)] = (pk, hash_linha)
+        contagem[base] += 1
+    return existentes
+
+
+# ------------------------------------------------------------------
+# Gravação
+# ------------------------------------------------------------------
+
+def instanciar_objetos(modelo, dados):
+    """Cria as instâncias (sem tocar no banco) a partir das colunas já convertidas."""
+    campos = list(dados.columns)
+    # astype(object) + where troca pd.NA/NaT por None, que é o que o ORM espera
+    colunas = [dados[c].astype(object).where(dados[c].notna(), None).tolist() for c in campos]
+    return [modelo(**dict(zip(campos, valores))) for valores in zip(*colunas)]
+
+
+def salvar_rejeitados(df_original, motivos, caminho):
+    rejeitadas = df_original.loc[motivos.notna()].copy()
+    if 'linha_excel' not in rejeitadas.columns:  # ler_planilha() já traz arquivo e linha
+        rejeitadas.insert(0, 'linha_excel', rejeitadas.index + 2)  # +1 cabeçalho, +1 base 1
+    rejeitadas['motivo'] = motivos[motivos.notna()]
+    rejeitadas.to_csv(caminho, index=False, encoding='utf-8-sig')
+    return caminho
+
+
+def _inserir_em_lotes(modelo, objetos, batch_size, progresso=None, feitas=0, total=None):
+    if progresso is None:
+        modelo.objects.bulk_create(objetos, batch_size=batch_size)
+        return
+    total = len(objetos) if total is None else total
+    for i in range(0, len(objetos), batch_size):
+        modelo.objects.bulk_create(objetos[i:i + batch_size], batch_size=batch_size)
+        progresso(feitas + min(i + batch_size, len(objetos)), total)
+
+
+def importar_dataframe(modelo, df, colunas, batch_size=TAMANHO_LOTE_PADRAO,
+                       caminho_rejeitados=None, limpar_antes=True, ao_gravar=None, progresso=None):
+    """
+    Converte, valida e grava o DataFrame no modelo.
+
+    A limpeza da tabela e todos os lotes do bulk_create acontecem numa única
+    transação: ou entra a planilha inteira, ou nada muda. `ao_gravar`, se
+    dado, recebe um AlteracoesImportacao dentro dessa transação (ex: para
+    manter tabelas agregadas em dia). `progresso(gravadas, total)` é chamado
+    depois de cada lote; uma exceção levantada por ele desfaz a transação.
+    """
+    inicio = time.perf_counter()
+    resultado = ResultadoImportacao(total=len(df))
+
+    dados, motivos = converter_dataframe(modelo, df, colunas)
+    validas = motivos.isna()
+    resultado.rejeitados = int((~validas).sum())
+
+    if resultado.rejeitados and caminho_rejeitados:
+        resultado.caminho_rejeitados = str(salvar_rejeitados(df, motivos, caminho_rejeitados))
+
+    dados = dados.loc[validas].copy()
+    dados['hash_linha'] = calcular_hashes(dados)
+    objetos = instanciar_objetos(modelo, dados)
+
+    with transaction.atomic():
+        if ao_gravar:
+            ao_gravar(AlteracoesImportacao(inseridos=dados, tabela_limpa=limpar_antes))
+        if limpar_antes:
+            modelo.objects.all().delete()
+        _inserir_em_lotes(modelo, objetos, batch_size, progresso)
+
+    resultado.inseridos = len(objetos)
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
+
+
+def importar_incremental(modelo, df, colunas, chave, batch_size=TAMANHO_LOTE_PADRAO,
+                         caminho_rejeitados=None, ao_gravar=None, progresso=None):
+    """
+    Sincroniza a tabela com a planilha mexendo só no que mudou.
+
+    Cada linha é identificada pela chave natural `chave` (lista de campos do
+    modelo) e comparada pelo hash do conteúdo: linhas novas são inseridas,
+    hashes diferentes são atualizados (mantendo o id) e linhas importadas que
+    sumiram da planilha são apagadas. Registos criados pelo sistema (sem hash,
+    ex: visitas do formulário) nunca são alterados nem apagados por aqui; linhas
+    gravadas antes de existir o hash só são reconhecidas depois de uma
+    importação completa. `ao_gravar` e
+    `progresso` como em importar_dataframe, com só as linhas que mudam.
+    """
+    inicio = time.perf_counter()
+    resultado = ResultadoImportacao(total=len(df), incremental=True)
+
+    dados, motivos = converter_dataframe(modelo, df, colunas)
+    validas = motivos.isna()
+    resultado.rejeitados = int((~validas).sum())
+
+    if resultado.rejeitados and caminho_rejeitados:
+        resultado.caminho_rejeitados = str(salvar_rejeitados(df, motivos, caminho_rejeitados))
+
+    dados = dados.loc[validas].copy()
+    hashes = calcular_hashes(dados)
+    chaves = calcular_chaves(dados, [modelo._meta.get_field(c).attname for c in chave])
+    existentes = _chaves_existentes(modelo, chave)
+
+    posicoes_novas, posicoes_alteradas, ids_alterados = [], [], []
+    vistos = set()
+    for posicao, (chave_linha, hash_linha) in enumerate(zip(chaves, hashes)):
+        atual = existentes.get(chave_linha)
+        if atual is None:
+            posicoes_novas.append(posicao)
+            continue
+        vistos.add(chave_linha)
+        if atual[1] != hash_linha:
+            posicoes_alteradas.append(posicao)
+            ids_alterados.append(atual[0])
+
+    ids_removidos = [pk for chave_linha, (pk, _) in existentes.items() if chave_linha not in vistos]
+
+    dados['hash_linha'] = hashes
+    dados_novos, dados_alterados = dados.iloc[posicoes_novas], dados.iloc[posicoes_alteradas]
+    novos = instanciar_objetos(modelo, dados_novos)
+    alterados = instanciar_objetos(modelo, dados_alterados)
+    for objeto, pk in zip(alterados, ids_alterados):
+        objeto.pk = pk
+
+    with transaction.atomic():
+        if ao_gravar:
+            ao_gravar(AlteracoesImportacao(
+                inseridos=dados_novos, alterados=dados_alterados,
+                ids_alterados=ids_alterados, ids_removidos=ids_removidos,
+            ))
+        total = len(ids_removidos) + len(alterados) + len(novos)
+        for i in range(0, len(ids_removidos), batch_size):
+            modelo.objects.filter(pk__in=ids_removidos[i:i + batch_size]).delete()
+            if progresso:
+                progresso(min(i + batch_size, len(ids_removidos)), total)
+        for i in range(0, len(alterados), batch_size):
+            modelo.objects.bulk_update(alterados[i:i + batch_size], list(dados.columns), batch_size=batch_size)
+            if progresso:
+                progresso(len(ids_removidos) + min(i + batch_size, len(alterados)), total)
+        _inserir_em_lotes(modelo, novos, batch_size, progresso, feitas=len(ids_removidos) + len(alterados),
+                          total=total)
+
+    resultado.inseridos = len(novos)
+    resultado.atualizados = len(alterados)
+    resultado.removidos = len(ids_removidos)
+    resultado.inalterados = len(vistos) - len(alterados)
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
@@ -0,0 +1,184 @@
+# core/indicadores.py
+
+# Indicadores da rede calculados com NumPy sobre DadosFicticiosEscola.
+#
+# A tabela é lida uma vez por versão dos dados (core.cache_dados) para arrays
+# contíguos, uma posição por linha; todas as contas são vetorizadas (sem laços
+# por escola). Os resultados também vão para o cache, então o custo só aparece
+# na primeira requisição depois de uma importação.
+#
+# As views importam este módulo só dentro das funções que o usam, para o
+# NumPy não entrar no arranque dos workers (ver medir_inicializacao).
+
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+from .cache_dados import obter_ou_calcular, versao_dados
+from .models import DadosFicticiosEscola
+
+PERCENTIS = [10, 25, 50, 75, 90]
+
+# Colunas numéricas lidas do banco (None vira NaN)
+COLUNAS_NUMERICAS = [
+    'saepe_2022', 'saepe_2023', 'proficiencia_lp_2023', 'proficiencia_mt_2023',
+    'percentual_peso', 'alunos_previstos_2023',
+]
+
+
+@dataclass
+class ArraysEscolas:
+    escola_id: np.ndarray        # int64
+    modalidades: list            # nomes, na ordem dos códigos
+    modalidade: np.ndarray       # int64, índice em `modalidades`
+    saepe_2022: np.ndarray       # float64 (NaN = sem valor)
+    saepe_2023: np.ndarray
+    lp: np.ndarray
+    mt: np.ndarray
+    peso: np.ndarray
+    alunos: np.ndarray
+
+    def __len__(self):
+        return len(self.escola_id)
+
+
+def carregar_arrays():
+    """Lê DadosFicticiosEscola inteira para arrays NumPy (uma consulta)."""
+    linhas = list(DadosFicticiosEscola.objects.order_by('id')
+                                              .values_list('escola_id', 'modalidade', *COLUNAS_NUMERICAS))
+    colunas = list(zip(*linhas)) or [()] * (2 + len(COLUNAS_NUMERICAS))
+
+    modalidades, codigos = np.unique(np.array(colunas[1], dtype=str), return_inverse=True)
+    numericas = [np.array(c, dtype=np.float64) for c in colunas[2:]]
+    return ArraysEscolas(
+        np.array(colunas[0], dtype=np.int64),
+        modalidades.tolist(),
+        codigos.astype(np.int64),
+        *numericas,
+    )
+
+
+_arrays = {'versao': None, 'dados': None}
+_trava = threading.Lock()
+
+
+def arrays_escolas():
+    """Arrays da versão atual dos dados (refeitos só quando a versão muda)."""
+    versao = versao_dados()
+    if _arrays['versao'] != versao:
+        with _trava:
+            if _arrays['versao'] != versao:
+                _arrays['dados'], _arrays['versao'] = carregar_arrays(), versao
+    return _arrays['dados']
+
+
+def _numero(valor):
+    """float do NumPy -> float do Python, NaN -> None (para JSON)."""
+    valor = float(valor)
+    return None if np.isnan(valor) else round(valor, 4)
+
+
+def _resumo(valores):
+    validos = valores[~np.isnan(valores)]
+    if not validos.size:
+        return {'n': 0, 'media': None, 'desvio_padrao': None,
+                'percentis': {str(p): None for p in PERCENTIS}}
+    return {
+        'n': int(validos.size),
+        'media': _numero(validos.mean()),
+        'desvio_padrao': _numero(validos.std()),
+        'percentis': {str(p): _numero(v) for p, v in zip(PERCENTIS, np.percentile(validos, PERCENTIS))},
+    }
+
+
+def z_scores(valores):
+    """(x - média) / desvio padrão; NaN onde não há valor ou o desvio é zero."""
+    media = np.nanmean(valores) if np.any(~np.isnan(valores)) else np.nan
+    desvio = np.nanstd(valores) if np.any(~np.isnan(valores)) else np.nan
+    if not desvio:
+        return np.full_like(valores, np.nan)
+    return (valores - media) / desvio
+
+
+def percentil_de_cada(valores):
+    """Percentil de cada linha (0-100): % das escolas com valor menor ou igual."""
+    resultado = np.full_like(valores, np.nan)
+    validos = ~np.isnan(valores)
+    if validos.any():
+        ordenados = np.sort(valores[validos])
+        resultado[validos] = np.searchsorted(ordenados, valores[validos], side='right') * 100.0 / ordenados.size
+    return resultado
+
+
+def media_ponderada_por_grupo(valores, pesos, grupos, n_grupos):
+    """Média de `valores` ponderada por `pesos` em cada grupo (ignora NaN em qualquer um dos dois)."""
+    usar = ~np.isnan(valores) & ~np.isnan(pesos) & (pesos > 0)
+    soma_pesos = np.bincount(grupos[usar], weights=pesos[usar], minlength=n_grupos)
+    soma = np.bincount(grupos[usar], weights=valores[usar] * pesos[usar], minlength=n_grupos)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(soma_pesos > 0, soma / np.where(soma_pesos > 0, soma_pesos, 1), np.nan)
+
+
+def calcular_indicadores(dados=None):
+    """Indicadores da rede e por modalidade (dicionário pronto para JSON)."""
+    dados = arrays_escolas() if dados is None else dados
+    crescimento = dados.saepe_2023 - dados.saepe_2022
+    com_crescimento = ~np.isnan(crescimento)
+    n_grupos = len(dados.modalidades)
+
+    por_modalidade = []
+    contagem = np.bincount(dados.modalidade, minlength=n_grupos)
+    ponderadas = {
+        (metrica, peso): media_ponderada_por_grupo(valores, pesos, dados.modalidade, n_grupos)
+        for metrica, valores in (('lp', dados.lp), ('mt', dados.mt), ('saepe_2023', dados.saepe_2023))
+        for peso, pesos in (('percentual_peso', dados.peso), ('alunos_previstos_2023', dados.alunos))
+    }
+    for codigo, nome in enumerate(dados.modalidades):
+        por_modalidade.append({
+            'modalidade': nome,
+            'escolas': int(contagem[codigo]),
+            'medias_ponderadas': {
+                metrica: {peso: _numero(medias[codigo]) for (m, peso), medias in ponderadas.items() if m == metrica}
+                for metrica in ('lp', 'mt', 'saepe_2023')
+            },
+        })
+
+    return {
+        'total_escolas': len(dados),
+        'crescimento_saepe': {
+            **_resumo(crescimento),
+            'melhoraram': int(np.count_nonzero(crescimento[com_crescimento] > 0)),
+            'pioraram': int(np.count_nonzero(crescimento[com_crescimento] < 0)),
+        },
+        'proficiencia_lp_2023': _resumo(dados.lp),
+        'proficiencia_mt_2023': _resumo(dados.mt),
+        'por_modalidade': por_modalidade,
+    }
+
+
+def indicadores_rede():
+    return obter_ou_calcular(('indicadores_rede',), calcular_indicadores)
+
+
+def indicadores_escola(escola_id):
+    """Z-score, percentil e crescimento de cada linha (modalidade) da escola."""
+    dados = arrays_escolas()
+    linhas = np.flatnonzero(dados.escola_id == escola_id)
+    if not linhas.size:
+        return []
+
+    z_lp, z_mt = z_scores(dados.lp), z_scores(dados.mt)
+    p_lp, p_mt = percentil_de_cada(dados.lp), percentil_de_cada(dados.mt)
+    crescimento = dados.saepe_2023 - dados.saepe_2022
+    return [
+        {
+            'modalidade': dados.modalidades[dados.modalidade[i]],
+            'crescimento_saepe': _numero(crescimento[i]),
+            'z_lp': _numero(z_lp[i]),
+            'z_mt': _numero(z_mt[i]),
+            'percentil_lp': _numero(p_lp[i]),
+            'percentil_mt': _numero(p_mt[i]),
+        }
+        for i in linhas
+    ]
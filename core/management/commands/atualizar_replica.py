@@ -0,0 +1,52 @@
+# Em core/management/commands/atualizar_replica.py
+
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cache_dados import invalidar_dados
+from core.escolhas import invalidar_escolhas
+from core.roteador import ALIAS_REPLICA
+
+
+class Command(BaseCommand):
+    help = ('Copia o banco SQLite primário para a réplica de leitura (SAEPE_REPLICA=1), '
+            'uma vez ou a cada --intervalo segundos.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float, default=None,
+                            help='Repete a cópia a cada N segundos (simula o atraso de uma replicação).')
+
+    def handle(self, *args, **options):
+        if ALIAS_REPLICA not in settings.DATABASES:
+            raise CommandError('Réplica não configurada: rode com SAEPE_REPLICA=1.')
+        primario, replica = settings.DATABASES['default'], settings.DATABASES[ALIAS_REPLICA]
+        motores = {primario['ENGINE'], replica['ENGINE']}
+        if motores != {'django.db.backends.sqlite3'}:
+            raise CommandError('Só réplicas SQLite são copiadas por este comando; no MySQL use a replicação do servidor.')
+
+        while True:
+            inicio = time.perf_counter()
+            paginas = self._copiar(primario['NAME'], replica['NAME'])
+            # O que foi calculado da réplica antiga sai do cache
+            invalidar_dados()
+            invalidar_escolhas()
+            self.stdout.write(f"Réplica atualizada ({paginas} páginas) em {time.perf_counter() - inicio:.2f}s.")
+            if options['intervalo'] is None:
+                break
+            time.sleep(options['intervalo'])
+
+    def _copiar(self, origem, destino):
+        # API de backup do SQLite, direto no arquivo da réplica: quem está
+        # lendo dela continua vendo a cópia anterior até a próxima transação,
+        # e as conexões persistentes do Django não precisam ser reabertas
+        conexao_origem = sqlite3.connect(origem, timeout=30)
+        conexao_destino = sqlite3.connect(destino, timeout=30)
+        try:
+            conexao_origem.backup(conexao_destino)
+            return conexao_destino.execute('PRAGMA page_count').fetchone()[0]
+        finally:
+            conexao_destino.close()
+            conexao_origem.close()
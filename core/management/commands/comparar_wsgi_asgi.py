@@ -0,0 +1,184 @@
+# Em core/management/commands/comparar_wsgi_asgi.py
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+# Cada modo roda num processo Python novo, com a aplicação WSGI ou ASGI do
+# Django chamada diretamente (sem servidor HTTP no meio): mede o caminho
+# Django + views + banco, que é o que muda entre os dois.
+#   wsgi:      views síncronas, N threads (como gunicorn --threads N)
+#   asgi:      views async, N tarefas no mesmo event loop (como uvicorn)
+#   asgi-sync: views síncronas servidas por ASGI (cada uma numa thread)
+SCRIPT_CARGA = r"""
+import asyncio, io, json, sys, time
+from concurrent.futures import ThreadPoolExecutor
+
+config = json.loads(sys.argv[1])
+if config['modo'] == 'wsgi':
+    from django.core.wsgi import get_wsgi_application as criar_aplicacao
+else:
+    from django.core.asgi import get_asgi_application as criar_aplicacao
+application = criar_aplicacao()
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client
+
+cliente = Client()
+cliente.force_login(get_user_model().objects.get(username=config['usuario']))
+cookie = f"{settings.SESSION_COOKIE_NAME}={cliente.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+
+def pedir_wsgi(url):
+    caminho, _, query = url.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': caminho, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost', 'HTTP_COOKIE': cookie,
+        'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+    }
+    status = []
+    inicio = time.perf_counter()
+    corpo = application(environ, lambda s, cabecalhos, exc_info=None: status.append(int(s.split()[0])))
+    for _ in corpo:
+        pass
+    corpo.close()
+    return time.perf_counter() - inicio, status[0]
+
+
+async def pedir_asgi(url):
+    caminho, _, query = url.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': caminho, 'raw_path': caminho.encode(), 'query_string': query.encode(),
+        'root_path': '', 'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+    }
+    terminou = asyncio.Event()
+    corpo_enviado = False
+
+    async def receive():
+        nonlocal corpo_enviado
+        if not corpo_enviado:
+            corpo_enviado = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await terminou.wait()  # o cliente só "desconecta" depois da resposta
+        return {'type': 'http.disconnect'}
+
+    status = []
+
+    async def send(mensagem):
+        if mensagem['type'] == 'http.response.start':
+            status.append(mensagem['status'])
+
+    inicio = time.perf_counter()
+    await application(scope, receive, send)
+    terminou.set()
+    return time.perf_counter() - inicio, status[0]
+
+
+async def carga_asgi(urls, concorrencia):
+    fila = iter(urls)
+    resultados = []
+
+    async def cliente_virtual():
+        for url in fila:
+            resultados.append(await pedir_asgi(url))
+
+    await asyncio.gather(*(cliente_virtual() for _ in range(concorrencia)))
+    return resultados
+
+
+urls = [config['urls'][i % len(config['urls'])] for i in range(config['requisicoes'])]
+if config['modo'] == 'wsgi':
+    for url in config['urls']:
+        pedir_wsgi(url)  # aquecimento: templates, opções dos formulários, cache
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=config['concorrencia']) as pool:
+        resultados = list(pool.map(pedir_wsgi, urls))
+else:
+    for url in config['urls']:
+        asyncio.run(pedir_asgi(url))
+    inicio = time.perf_counter()
+    resultados = asyncio.run(carga_asgi(urls, config['concorrencia']))
+segundos = time.perf_counter() - inicio
+
+cliente.logout()
+print(json.dumps({
+    'segundos': segundos,
+    'latencias': [latencia for latencia, _ in resultados],
+    'status': [status for _, status in resultados],
+}))
+"""
+
+MODOS = ['wsgi', 'asgi', 'asgi-sync']
+
+
+class Command(BaseCommand):
+    help = 'Compara a latência (p50/p99) dos dashboards sob carga concorrente servidos por WSGI e por ASGI.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modos', nargs='+', choices=MODOS, default=['wsgi', 'asgi'])
+        parser.add_argument('--requisicoes', type=int, default=500)
+        parser.add_argument('--concorrencia', type=int, default=20,
+                            help='Requisições em andamento ao mesmo tempo (threads no WSGI, tarefas no ASGI).')
+        parser.add_argument('--url', dest='urls', action='append',
+                            help="URL a pedir (pode repetir; padrão: '/' e '/dashboard-analise/').")
+        parser.add_argument('--usuario', help='Usuário usado no login (padrão: o primeiro usuário ativo).')
+
+    def handle(self, *args, **options):
+        usuario = self._usuario(options['usuario'])
+        config = {
+            'usuario': usuario,
+            'urls': options['urls'] or ['/', '/dashboard-analise/'],
+            'requisicoes': options['requisicoes'],
+            'concorrencia': options['concorrencia'],
+        }
+        self.stdout.write(
+            f"{config['requisicoes']} requisições, {config['concorrencia']} concorrentes, "
+            f"URLs: {', '.join(config['urls'])}"
+        )
+        self.stdout.write(f"{'modo':<10} {'p50 (ms)':>9} {'p99 (ms)':>9} {'máx (ms)':>9} {'req/s':>8}")
+
+        for modo in options['modos']:
+            medida = self._rodar(modo, config)
+            latencias = [s * 1000 for s in medida['latencias']]
+            percentis = statistics.quantiles(latencias, n=100, method='inclusive')
+            self.stdout.write(
+                f"{modo:<10} {percentis[49]:>9.1f} {percentis[98]:>9.1f} {max(latencias):>9.1f} "
+                f"{len(latencias) / medida['segundos']:>8.0f}"
+            )
+            erros = [status for status in medida['status'] if status != 200]
+            if erros:
+                self.stdout.write(self.style.WARNING(
+                    f'  {len(erros)} respostas sem status 200 (ex.: {erros[0]}); confira o login e as URLs.'
+                ))
+
+    def _usuario(self, nome):
+        usuarios = get_user_model().objects.filter(is_active=True)
+        usuario = usuarios.filter(username=nome).first() if nome else usuarios.order_by('id').first()
+        if usuario is None:
+            raise CommandError('Nenhum usuário para o login: crie um (createsuperuser) ou informe --usuario.')
+        return usuario.get_username()
+
+    def _rodar(self, modo, config):
+        ambiente = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'projeto_escola.settings'),
+            SAEPE_DASHBOARDS_ASSINCRONOS='1' if modo == 'asgi' else '0',
+        )
+        saida = subprocess.run(
+            [sys.executable, '-c', SCRIPT_CARGA, json.dumps({**config, 'modo': modo})],
+            cwd=settings.BASE_DIR, env=ambiente,
+            capture_output=True, text=True,
+        )
+        if saida.returncode:
+            raise CommandError(f'O modo {modo} falhou:\n{saida.stderr[-2000:]}')
+        return json.loads(saida.stdout.strip().splitlines()[-1])
@@ -0,0 +1,84 @@
+# Em core/management/commands/explicar_consultas.py
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from core import views
+from core.models import DadosFicticiosEscola
+
+# Sem cache durante as views: com o cache quente (core/cache_dados.py) elas não
+# fariam consultas e o resultado dependeria de quem pediu a página antes.
+# Um cache falso em vez de cache.clear() não mexe no cache do site em uso.
+SEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class Command(BaseCommand):
+    help = 'Mostra o plano de execução (EXPLAIN QUERY PLAN) de cada consulta feita pelas views.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escola', type=int,
+                            help='Id da escola usada no filtro e no perfil (padrão: a primeira com dados).')
+
+    def views_para_explicar(self, escola_id):
+        # (nome, url, view, kwargs da url)
+        lista = [
+            ('main_dashboard', reverse('main_dashboard'), views.main_dashboard_view, {}),
+            ('visitas', reverse('visitas'), views.visitas_view, {}),
+            ('analise_dashboard', reverse('analise_dashboard'), views.analise_dashboard_view, {}),
+            ('busca_visitas', f"{reverse('busca_visitas')}?q=merenda", views.busca_visitas_view, {}),
+            ('api_visitas_por_mes', f"{reverse('api_visitas_por_mes')}?inicio=2024-01&fim=2025-12",
+             views.api_visitas_por_mes, {}),
+        ]
+        if escola_id:
+            lista += [
+                ('analise_dashboard (uma escola)', f"{reverse('analise_dashboard')}?escola={escola_id}",
+                 views.analise_dashboard_view, {}),
+                ('perfil_escola', reverse('perfil_escola', args=[escola_id]),
+                 views.perfil_escola_view, {'escola_id': escola_id}),
+            ]
+        return lista
+
+    def handle(self, *args, **options):
+        escola_id = options['escola'] or DadosFicticiosEscola.objects.values_list('escola_id', flat=True).first()
+
+        # Um utilizador em memória basta para passar pelo @login_required
+        usuario = User(username='explicar_consultas', is_active=True)
+        fabrica = RequestFactory()
+        prefixo = connection.ops.explain_query_prefix()
+
+        for nome, url, view, kwargs in self.views_para_explicar(escola_id):
+            request = fabrica.get(url)
+            request.user = usuario
+
+            # Executa a view de verdade e guarda as consultas que ela fez
+            with override_settings(CACHES=SEM_CACHE), CaptureQueriesContext(connection) as consultas:
+                view(request, **kwargs)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'\n=== {nome} ({url}): {len(consultas)} consultas ==='
+            ))
+
+            vistas = set()
+            for consulta in consultas.captured_queries:
+                sql = consulta['sql']
+                if sql in vistas:
+                    self.stdout.write(self.style.WARNING(f'(repetida) {sql[:120]}'))
+                    continue
+                vistas.add(sql)
+
+                self.stdout.write(f'\n{sql}')
+                with connection.cursor() as cursor:
+                    cursor.execute(f'{prefixo} {sql}')
+                    plano = cursor.fetchall()
+
+                for linha in plano:
+                    # No SQLite a descrição do passo é a última coluna
+                    detalhe = str(linha[-1]) if connection.vendor == 'sqlite' else ' | '.join(map(str, linha))
+                    if detalhe.startswith('SCAN') and 'INDEX' not in detalhe:
+                        self.stdout.write(self.style.WARNING(f'  -> {detalhe}'))
+                    else:
+                        self.stdout.write(f'  -> {detalhe}')
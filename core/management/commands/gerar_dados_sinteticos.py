@@ -0,0 +1,95 @@
+# Em core/management/commands/gerar_dados_sinteticos.py
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.busca import garantir_indice_busca
+from core.cache_dados import invalidar_dados
+from core.dados_sinteticos import Escala, GeradorSintetico, escrever_planilhas, gravar_no_banco
+from core.escolhas import invalidar_escolhas
+from core.management.commands.importar_ficticio import COLUNAS as COLUNAS_DADOS
+from core.management.commands.importar_visitas import COLUNAS as COLUNAS_VISITAS
+from core.models import (DadosFicticiosEscola, Escola, Relatorio, ResumoDashboard, Visita, VisitaMensal,
+                         VisitaTecnica)
+
+
+class Command(BaseCommand):
+    help = ('Gera dados sintéticos (escolas, dados SAEPE, visitas técnicas, visitas agendadas e relatórios) '
+            'no banco e/ou em planilhas .xlsx iguais às de importação.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escolas', type=int, default=Escala.escolas)
+        parser.add_argument('--visitas', type=int, default=None,
+                            help='Visitas técnicas (padrão: 10 por escola).')
+        parser.add_argument('--visitas-agendadas', type=int, default=None,
+                            help='Visitas do modelo Visita (padrão: 1 por escola).')
+        parser.add_argument('--relatorios', type=int, default=None,
+                            help='Relatórios (padrão: 1 por escola).')
+        parser.add_argument('--tecnicos-por-gre', type=int, default=Escala.tecnicos_por_gre)
+        parser.add_argument('--anos', type=int, default=Escala.anos, help='Período das visitas, até hoje.')
+        parser.add_argument('--semente', type=int, default=Escala.semente)
+        parser.add_argument('--lote', type=int, default=10_000, help='Linhas geradas e gravadas por vez.')
+        parser.add_argument('--planilhas', metavar='PASTA',
+                            help='Escreve também as planilhas .xlsx (acompanhamento/ e visitas/, uma por GRE).')
+        parser.add_argument('--sem-banco', action='store_true', help='Só escreve as planilhas.')
+        parser.add_argument('--limpar', action='store_true',
+                            help='Apaga TODAS as escolas, visitas, dados e relatórios antes de gerar.')
+        parser.add_argument('--forcar', action='store_true', help='Permite rodar com DEBUG desligado.')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['forcar'] and not options['sem_banco']:
+            raise CommandError('DEBUG está desligado (parece produção). Use --forcar se for mesmo este banco.')
+        if options['sem_banco'] and not options['planilhas']:
+            raise CommandError('--sem-banco precisa de --planilhas.')
+
+        escolas = options['escolas']
+        escala = Escala(
+            escolas=escolas,
+            visitas=options['visitas'] if options['visitas'] is not None else escolas * 10,
+            visitas_agendadas=options['visitas_agendadas'] if options['visitas_agendadas'] is not None else escolas,
+            relatorios=options['relatorios'] if options['relatorios'] is not None else escolas,
+            tecnicos_por_gre=options['tecnicos_por_gre'],
+            anos=options['anos'],
+            semente=options['semente'],
+        )
+        self.stdout.write(
+            f'Escala: {escala.escolas} escolas, {escala.visitas} visitas técnicas, '
+            f'{escala.visitas_agendadas} visitas agendadas, {escala.relatorios} relatórios (semente {escala.semente})'
+        )
+
+        if not options['sem_banco']:
+            if options['limpar']:
+                self.stdout.write('Apagando os dados atuais...')
+                with transaction.atomic():
+                    for modelo in (Relatorio, Visita, VisitaTecnica, VisitaMensal, DadosFicticiosEscola, Escola):
+                        modelo.objects.all().delete()
+
+            inicio = time.perf_counter()
+            contagem = gravar_no_banco(GeradorSintetico(escala), COLUNAS_VISITAS, COLUNAS_DADOS,
+                                       tamanho_lote=options['lote'], progresso=self._progresso)
+            self.stdout.write('Atualizando ranking, resumo, agregado mensal e índice de busca...')
+            DadosFicticiosEscola.recalcular_posicoes()
+            ResumoDashboard.recalcular()
+            VisitaMensal.recalcular()
+            garantir_indice_busca()
+            invalidar_dados()
+            invalidar_escolhas()
+            self.stdout.write(
+                f"Banco: {', '.join(f'{n} {tabela}' for tabela, n in contagem.items())} "
+                f'em {time.perf_counter() - inicio:.1f}s.'
+            )
+
+        if options['planilhas']:
+            inicio = time.perf_counter()
+            # Gerador novo com a mesma semente: as planilhas repetem exatamente o que foi gravado
+            arquivos = escrever_planilhas(GeradorSintetico(escala), options['planilhas'],
+                                          tamanho_lote=options['lote'], progresso=self._progresso)
+            self.stdout.write(f'{len(arquivos)} planilhas em {time.perf_counter() - inicio:.1f}s.')
+
+        self.stdout.write(self.style.SUCCESS('Dados sintéticos gerados com sucesso!'))
+
+    def _progresso(self, mensagem):
+        self.stdout.write(f'  {mensagem}')
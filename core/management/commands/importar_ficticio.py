@@ -1,53 +1,102 @@
 # Em core/management/commands/importar_ficticio.py
 
-import pandas as pd
+import time
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from core.models import DadosFicticiosEscola # IMPORTA NOSSO NOVO MODELO
+from core.models import DadosFicticiosEscola, ResumoDashboard # IMPORTA NOSSO NOVO MODELO
+from core.cache_dados import invalidar_dados
+from core.escolhas import invalidar_escolhas
+from core.importacao import (ErroImportacao, TAMANHO_LOTE_PADRAO, expandir_caminhos, importar_dataframe,
+                             importar_incremental, ler_planilhas)
+
+# 'NOME DA COLUNA NO EXCEL' -> campo_do_modelo
+COLUNAS = {
+    'ESCOLA': 'escola',
+    'MODALIDADE': 'modalidade',
+    'ALUNOS PREVISTOS SAEPE 2023': 'alunos_previstos_2023',
+    '% PESO': 'percentual_peso',
+    'SAEPE 2022': 'saepe_2022',
+    'SAEPE 2023': 'saepe_2023',
+    'PROFICIÊNCIA LP SAEPE 2023': 'proficiencia_lp_2023',
+    'PROFICIÊNCIA MT SAEPE 2023': 'proficiencia_mt_2023',
+    'MATRÍCULA EFAF 2024': 'matricula_efaf_2024',
+}
+
+PLANILHA_PADRAO = 'Acompanhamento_Escolas_2025_Ficticio.xlsx'
 
 class Command(BaseCommand):
     help = 'Importa os dados Fictícios de Acompanhamento das Escolas'
 
-    def handle(self, *args, **options):
-        # --- MUDANÇA 1: Corrigimos o nome do arquivo ---
-        caminho_excel = r'C:\Users\Rhydrian\Documents\Projeto-SAEPE\Acompanhamento_Escolas_2025_Ficticio.xlsx'
+    # Só por call_command: progresso(percentual, mensagem), usado pelas tarefas do run_worker (core/tarefas.py)
+    stealth_options = ('progresso',)
 
-        self.stdout.write(f'Lendo o arquivo Excel de {caminho_excel}...')
-        
+    def add_arguments(self, parser):
+        parser.add_argument('caminhos', nargs='*',
+                            help='Arquivos .xlsx ou pastas com planilhas (padrão: Acompanhamento_Escolas_2025_Ficticio.xlsx na raiz do projeto).')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Só insere/atualiza/remove as linhas que mudaram (compara pelo hash).')
+        parser.add_argument('--batch-size', type=int, default=TAMANHO_LOTE_PADRAO,
+                            help='Quantidade de linhas por INSERT em lote.')
+        parser.add_argument('--processos', type=int, default=None,
+                            help='Processos para ler as planilhas em paralelo (padrão: número de CPUs).')
+        parser.add_argument('--sem-cache', action='store_true',
+                            help='Lê todas as planilhas com o openpyxl, ignorando o cache (settings.CACHE_PLANILHAS_DIR).')
+        parser.add_argument('--rejeitados', default='ficticio_rejeitados.csv',
+                            help='Arquivo CSV onde as linhas inválidas são salvas.')
+
+    def handle(self, *args, **options):
+        progresso = options.get('progresso') or (lambda percentual, mensagem: None)
+        # 1. LÊ AS PLANILHAS (uma por GRE; várias são lidas em paralelo)
         try:
-            # --- MUDANÇA 2: Usamos pd.read_excel ---
-            # O read_excel já entende que o cabeçalho está na primeira linha
-            df = pd.read_excel(caminho_excel) 
-            df = df.where(pd.notnull(df), None) # Limpa valores vazios
-        
-        except FileNotFoundError:
-            self.stderr.write(self.style.ERROR('ERRO: Arquivo Excel não encontrado! Verifique o caminho e o nome do arquivo.'))
-            return
-        except Exception as e:
-            self.stderr.write(self.style.ERROR(f'Erro ao ler o Excel (verifique se openpyxl está instalado): {e}'))
+            caminhos = expandir_caminhos(options['caminhos'] or [settings.BASE_DIR / PLANILHA_PADRAO])
+            self.stdout.write(f'Lendo {len(caminhos)} arquivo(s) Excel...')
+            progresso(5, f'Lendo {len(caminhos)} planilha(s)')
+            inicio = time.perf_counter()
+            pasta_cache = None if options['sem_cache'] else getattr(settings, 'CACHE_PLANILHAS_DIR', None)
+            df = ler_planilhas(caminhos, COLUNAS, processos=options['processos'], pasta_cache=pasta_cache)
+            self.stdout.write(
+                f'{len(df)} linhas lidas em {time.perf_counter() - inicio:.2f}s '
+                f'({df.attrs["planilhas_do_cache"]} de {len(caminhos)} planilha(s) vieram do cache).'
+            )
+        except ErroImportacao as e:
+            self.stderr.write(self.style.ERROR(f'ERRO: {e}'))
             return
+        progresso(40, f'{len(df)} linhas lidas')
 
-        # 2. LIMPE O BANCO DE DADOS ANTIGO
-        self.stdout.write('Limpando dados fictícios antigos...')
-        DadosFicticiosEscola.objects.all().delete()
-
+        # 2. CONVERTE, VALIDA E GRAVA EM LOTES (completo: a limpeza dos dados antigos vai na mesma transação;
+        #    incremental: só mexe nas linhas cujo hash mudou)
         self.stdout.write('Iniciando a importação dos dados para o banco...')
-        
-        # 3. PERCORRA O ARQUIVO E SALVE NO BANCO (este código continua igual)
-        for _, row in df.iterrows():
-            try:
-                DadosFicticiosEscola.objects.create(
-                    # model_field = row['NOME DA COLUNA NO CSV']
-                    escola = row['ESCOLA'],
-                    modalidade = row['MODALIDADE'],
-                    alunos_previstos_2023 = row['ALUNOS PREVISTOS SAEPE 2023'],
-                    percentual_peso = row['% PESO'],
-                    saepe_2022 = row['SAEPE 2022'],
-                    saepe_2023 = row['SAEPE 2023'],
-                    proficiencia_lp_2023 = row['PROFICIÊNCIA LP SAEPE 2023'],
-                    proficiencia_mt_2023 = row['PROFICIÊNCIA MT SAEPE 2023'],
-                    matricula_efaf_2024 = row['MATRÍCULA EFAF 2024']
+
+        def gravacao(feitas, total):
+            progresso(40 + 50 * feitas // max(total, 1), f'Gravando: {feitas} de {total} linhas')
+
+        try:
+            if options['incremental']:
+                resultado = importar_incremental(
+                    DadosFicticiosEscola, df, COLUNAS, DadosFicticiosEscola.CHAVE_IMPORTACAO,
+                    batch_size=options['batch_size'],
+                    caminho_rejeitados=options['rejeitados'],
+                    progresso=gravacao,
                 )
-            except Exception as e:
-                self.stderr.write(f'Erro ao importar linha: {e} - Dados: {row}')
+            else:
+                resultado = importar_dataframe(
+                    DadosFicticiosEscola, df, COLUNAS,
+                    batch_size=options['batch_size'],
+                    caminho_rejeitados=options['rejeitados'],
+                    progresso=gravacao,
+                )
+        except ErroImportacao as e:
+            self.stderr.write(self.style.ERROR(f'ERRO: {e}'))
+            return
+
+        self.stdout.write(resultado.resumo())
 
-        self.stdout.write(self.style.SUCCESS('Importação fictícia concluída com sucesso!'))
\ No newline at end of file
+        # 3. ATUALIZA O RANKING, OS NÚMEROS DO DASHBOARD PRINCIPAL E INVALIDA OS CACHES
+        DadosFicticiosEscola.recalcular_posicoes()
+        ResumoDashboard.recalcular()
+        invalidar_dados()
+        invalidar_escolhas()
+        if resultado.rejeitados:
+            self.stdout.write(self.style.WARNING(f'{resultado.rejeitados} linhas rejeitadas.'))
+        self.stdout.write(self.style.SUCCESS('Importação fictícia concluída com sucesso!'))
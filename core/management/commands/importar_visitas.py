@@ -1,56 +1,103 @@
 # Em core/management/commands/importar_visitas.py
 
-import pandas as pd
+import time
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from core.models import VisitaTecnica # Importa o nosso novo modelo
+from core.models import VisitaTecnica, VisitaMensal, ResumoDashboard # Importa o nosso novo modelo
+from core.cache_dados import invalidar_dados
+from core.escolhas import invalidar_escolhas
+from core.importacao import (ErroImportacao, TAMANHO_LOTE_PADRAO, expandir_caminhos, importar_dataframe,
+                             importar_incremental, ler_planilhas)
+
+# NOME_EXATO_DA_COLUNA_NO_EXCEL -> campo_do_modelo
+COLUNAS = {
+    'Escola': 'escola',
+    'Data da Visita': 'data_visita',
+    'Técnico/Analista - GRE': 'tecnico_gre',
+    'Servidor da Escola': 'servidor_escola',
+    'Demanda': 'demanda',
+    'Encaminhamento': 'encaminhamento',
+    'Observação': 'observacao',
+}
+
+PLANILHA_PADRAO = 'visitas_gre_ficticias.xlsx'
 
 class Command(BaseCommand):
     help = 'Importa as Visitas Técnicas do ficheiro Excel corrigido.'
 
+    # Só por call_command: progresso(percentual, mensagem), usado pelas tarefas do run_worker (core/tarefas.py)
+    stealth_options = ('progresso',)
+
+    def add_arguments(self, parser):
+        parser.add_argument('caminhos', nargs='*',
+                            help='Ficheiros .xlsx ou pastas com planilhas (padrão: visitas_gre_ficticias.xlsx na raiz do projeto).')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Só insere/atualiza/remove as linhas que mudaram (compara pelo hash).')
+        parser.add_argument('--batch-size', type=int, default=TAMANHO_LOTE_PADRAO,
+                            help='Quantidade de linhas por INSERT em lote.')
+        parser.add_argument('--processos', type=int, default=None,
+                            help='Processos para ler as planilhas em paralelo (padrão: número de CPUs).')
+        parser.add_argument('--sem-cache', action='store_true',
+                            help='Lê todas as planilhas com o openpyxl, ignorando o cache (settings.CACHE_PLANILHAS_DIR).')
+        parser.add_argument('--rejeitados', default='visitas_rejeitadas.csv',
+                            help='Ficheiro CSV onde as linhas inválidas são guardadas.')
+
     def handle(self, *args, **options):
-        
-        # 1. CAMINHO DO SEU FICHEIRO EXCEL CORRIGIDO
-        caminho_excel = r'C:\Users\Rhydrian\Documents\Projeto-SAEPE\visitas_gre_ficticias.xlsx'
+        progresso = options.get('progresso') or (lambda percentual, mensagem: None)
 
-        self.stdout.write(f'A ler o ficheiro Excel de {caminho_excel}...')
-        
+        # 1. LÊ AS PLANILHAS (uma por GRE; várias são lidas em paralelo)
         try:
-            # Usamos read_excel. O cabeçalho está na primeira linha (header=0), que é o padrão.
-            df = pd.read_excel(caminho_excel, engine='openpyxl')
-            # Limpa valores vazios (como NaN) para None, que o banco de dados aceita
-            df = df.where(pd.notnull(df), None)
-        
-        except FileNotFoundError:
-            self.stderr.write(self.style.ERROR('ERRO: Ficheiro Excel não encontrado! Verifique o caminho.'))
-            return
-        except Exception as e:
-            self.stderr.write(self.style.ERROR(f'Erro ao ler o Excel: {e}'))
+            caminhos = expandir_caminhos(options['caminhos'] or [settings.BASE_DIR / PLANILHA_PADRAO])
+            self.stdout.write(f'A ler {len(caminhos)} ficheiro(s) Excel...')
+            progresso(5, f'Lendo {len(caminhos)} planilha(s)')
+            inicio = time.perf_counter()
+            pasta_cache = None if options['sem_cache'] else getattr(settings, 'CACHE_PLANILHAS_DIR', None)
+            df = ler_planilhas(caminhos, COLUNAS, processos=options['processos'], pasta_cache=pasta_cache)
+            self.stdout.write(
+                f'{len(df)} linhas lidas em {time.perf_counter() - inicio:.2f}s '
+                f'({df.attrs["planilhas_do_cache"]} de {len(caminhos)} planilha(s) vieram do cache).'
+            )
+        except ErroImportacao as e:
+            self.stderr.write(self.style.ERROR(f'ERRO: {e}'))
             return
+        progresso(40, f'{len(df)} linhas lidas')
 
-        # 2. LIMPA O BANCO DE DADOS ANTIGO (para não duplicar dados)
-        self.stdout.write('A limpar visitas técnicas antigas...')
-        VisitaTecnica.objects.all().delete()
-
-        self.stdout.write('A iniciar a importação das visitas para o banco de dados...')
-        
-        # 3. PERCORRE O FICHEIRO E SALVA NO BANCO
-        for _, row in df.iterrows():
-            try:
-                # Converte datas se não estiverem no formato correto (o Excel às vezes guarda como timestamp)
-                data_visita = pd.to_datetime(row['Data da Visita']).date() if row['Data da Visita'] else None
-
-                VisitaTecnica.objects.create(
-                    # campo_do_modelo = row['NOME_EXATO_DA_COLUNA_NO_EXCEL']
-                    escola = row['Escola'],
-                    data_visita = data_visita,
-                    tecnico_gre = row['Técnico/Analista - GRE'],
-                    servidor_escola = row['Servidor da Escola'],
-                    demanda = row['Demanda'],
-                    encaminhamento = row['Encaminhamento'],
-                    observacao = row['Observação']
+        # 2. CONVERTE, VALIDA E GRAVA EM LOTES (completo: limpa as visitas antigas na mesma transação;
+        #    incremental: só mexe nas linhas cujo hash mudou). O agregado mensal recebe só a diferença,
+        #    na mesma transação.
+        self.stdout.write('A importar as visitas para o banco de dados...')
+
+        def gravacao(feitas, total):
+            progresso(40 + 50 * feitas // max(total, 1), f'Gravando: {feitas} de {total} linhas')
+
+        try:
+            if options['incremental']:
+                resultado = importar_incremental(
+                    VisitaTecnica, df, COLUNAS, VisitaTecnica.CHAVE_IMPORTACAO,
+                    batch_size=options['batch_size'],
+                    caminho_rejeitados=options['rejeitados'],
+                    progresso=gravacao,
+                    ao_gravar=VisitaMensal.registrar_importacao,
                 )
-            except Exception as e:
-                # Se der erro, ele vai dizer qual linha falhou
-                self.stderr.write(f'Erro ao importar linha: {e} - Dados: {row}')
+            else:
+                resultado = importar_dataframe(
+                    VisitaTecnica, df, COLUNAS,
+                    batch_size=options['batch_size'],
+                    caminho_rejeitados=options['rejeitados'],
+                    progresso=gravacao,
+                    ao_gravar=VisitaMensal.registrar_importacao,
+                )
+        except ErroImportacao as e:
+            self.stderr.write(self.style.ERROR(f'ERRO: {e}'))
+            return
+
+        self.stdout.write(resultado.resumo())
 
-        self.stdout.write(self.style.SUCCESS('Importação de visitas técnicas concluída com sucesso!'))
\ No newline at end of file
+        # 3. ATUALIZA OS NÚMEROS DO DASHBOARD PRINCIPAL E INVALIDA OS CACHES
+        ResumoDashboard.recalcular()
+        invalidar_dados()
+        invalidar_escolhas()
+        if resultado.rejeitados:
+            self.stdout.write(self.style.WARNING(f'{resultado.rejeitados} linhas rejeitadas.'))
+        self.stdout.write(self.style.SUCCESS('Importação de visitas técnicas concluída com sucesso!'))
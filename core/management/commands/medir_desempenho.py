@@ -0,0 +1,238 @@
+# Em core/management/commands/medir_desempenho.py
+
+import datetime
+import io
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import (DadosFicticiosEscola, Escola, Relatorio, Visita, VisitaMensal, VisitaTecnica)
+
+# (nome, nome da url, usa o id de uma escola?, query string)
+VIEWS = [
+    ('main_dashboard', 'main_dashboard', False, ''),
+    ('visitas', 'visitas', False, ''),
+    ('visitas (por data, página 2)', 'visitas', False, 'ordem=data&page=2'),
+    ('busca_visitas', 'busca_visitas', False, 'q=merenda'),
+    ('analise_dashboard', 'analise_dashboard', False, ''),
+    ('analise_dashboard (uma escola)', 'analise_dashboard', True, 'escola={escola}'),
+    ('perfil_escola', 'perfil_escola', True, ''),
+    ('historico_visitas', 'historico_visitas', True, ''),
+    ('api_grafico_desempenho', 'api_grafico_desempenho', False, 'metrica=mt'),
+    ('api_grafico_visitas', 'api_grafico_visitas', False, ''),
+    ('api_visitas_por_mes', 'api_visitas_por_mes', False, ''),
+    ('api_tabelas', 'api_tabelas', False, ''),
+    ('api_ranking', 'api_ranking', False, 'metrica=lp&n=20'),
+    ('api_indicadores', 'api_indicadores', True, 'escola={escola}'),
+    ('exportar_visitas (uma escola, csv)', 'exportar_visitas', True, 'formato=csv&escola={escola}'),
+    ('exportar_dados_escolas (csv)', 'exportar_dados_escolas', False, 'formato=csv'),
+    ('relatorios', 'relatorios', False, ''),
+]
+
+
+def _resumo_tempos(segundos):
+    ms = [s * 1000 for s in segundos]
+    return {'mediana': round(statistics.median(ms), 2), 'min': round(min(ms), 2), 'max': round(max(ms), 2)}
+
+
+class Command(BaseCommand):
+    help = ('Mede o tempo e o número de consultas de cada view (cache frio e quente) e dos comandos de '
+            'importação; grava o resultado em JSON para comparar execuções.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=5)
+        parser.add_argument('--saida', help='Arquivo JSON do resultado (padrão: benchmark_<data>.json).')
+        parser.add_argument('--comparar', metavar='JSON', help='Resultado anterior para comparar com este.')
+        parser.add_argument('--sem-importadores', action='store_true')
+        parser.add_argument('--planilhas', metavar='PASTA',
+                            help='Planilhas para os importadores (saída de gerar_dados_sinteticos --planilhas). '
+                                 'Padrão: gera um conjunto temporário.')
+        parser.add_argument('--visitas-importacao', type=int, default=10_000,
+                            help='Tamanho do conjunto temporário de planilhas.')
+
+    def handle(self, *args, **options):
+        anterior = self._ler_json(options['comparar']) if options['comparar'] else None
+        resultado = {
+            'data': datetime.datetime.now().isoformat(timespec='seconds'),
+            'commit': self._commit_atual(),
+            'banco': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'tabelas': {
+                modelo.__name__: modelo.objects.count()
+                for modelo in (Escola, DadosFicticiosEscola, VisitaTecnica, VisitaMensal, Visita, Relatorio)
+            },
+            'repeticoes': options['repeticoes'],
+        }
+        self.stdout.write(f"Tabelas: {resultado['tabelas']}")
+
+        # Tudo numa transação desfeita no fim: o usuário de teste, as sessões e
+        # as importações não deixam rastro no banco
+        with transaction.atomic():
+            resultado['views'] = self._medir_views(options['repeticoes'])
+            if not options['sem_importadores']:
+                resultado['importadores'] = self._medir_importadores(options)
+            transaction.set_rollback(True)
+        cache.clear()  # as importações desfeitas trocaram a versão dos dados
+
+        saida = Path(options['saida'] or f"benchmark_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+        saida.write_text(json.dumps(resultado, ensure_ascii=False, indent=2), encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f'Resultado gravado em {saida}'))
+
+        if anterior:
+            self._comparar(anterior, resultado)
+
+    # ------------------------------------------------------------------
+    # Views
+    # ------------------------------------------------------------------
+
+    def _medir_views(self, repeticoes):
+        escola_id = DadosFicticiosEscola.objects.values_list('escola_id', flat=True).order_by('escola_id').first()
+        usuario = User.objects.create_user('medir_desempenho')
+        cliente = Client()
+        cliente.force_login(usuario)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\n{'view':<38} {'status':>6} {'consultas':>10} {'frio (ms)':>10} {'quente (ms)':>12}"
+        ))
+        medidas = []
+        for nome, nome_url, com_escola, query in VIEWS:
+            if com_escola and not escola_id:
+                continue
+            url = reverse(nome_url, args=[escola_id] if nome_url in ('perfil_escola', 'historico_visitas') else [])
+            if query:
+                url += '?' + query.format(escola=escola_id)
+
+            frio, quente = [], []
+            for _ in range(repeticoes):
+                cache.clear()
+                frio.append(self._pedir(cliente, url))
+            for _ in range(repeticoes):
+                quente.append(self._pedir(cliente, url))
+
+            medida = {
+                'nome': nome,
+                'url': url,
+                'status': frio[-1]['status'],
+                'bytes': frio[-1]['bytes'],
+                'consultas_frio': frio[-1]['consultas'],
+                'consultas_quente': quente[-1]['consultas'],
+                'ms_frio': _resumo_tempos([m['segundos'] for m in frio]),
+                'ms_quente': _resumo_tempos([m['segundos'] for m in quente]),
+            }
+            medidas.append(medida)
+            linha = (f"{nome:<38} {medida['status']:>6} "
+                     f"{medida['consultas_frio']:>4} / {medida['consultas_quente']:<3} "
+                     f"{medida['ms_frio']['mediana']:>10.1f} {medida['ms_quente']['mediana']:>12.1f}")
+            self.stdout.write(linha if medida['status'] == 200 else self.style.WARNING(linha))
+        return medidas
+
+    def _pedir(self, cliente, url):
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            resposta = cliente.get(url)
+            # Respostas em streaming (exportações) só terminam quando o corpo é lido
+            corpo = b''.join(resposta.streaming_content) if resposta.streaming else resposta.content
+            segundos = time.perf_counter() - inicio
+        return {'status': resposta.status_code, 'segundos': segundos,
+                'consultas': len(consultas), 'bytes': len(corpo)}
+
+    # ------------------------------------------------------------------
+    # Importadores
+    # ------------------------------------------------------------------
+
+    def _medir_importadores(self, options):
+        with tempfile.TemporaryDirectory() as temporaria:
+            pasta = Path(options['planilhas']) if options['planilhas'] else self._gerar_planilhas(
+                temporaria, options['visitas_importacao'])
+            rejeitados = str(Path(temporaria) / 'rejeitados.csv')
+            execucoes = [
+                ('importar_ficticio', 'importar_ficticio', pasta / 'acompanhamento', {}),
+                ('importar_ficticio --incremental', 'importar_ficticio', pasta / 'acompanhamento',
+                 {'incremental': True}),
+                ('importar_visitas', 'importar_visitas', pasta / 'visitas', {}),
+                ('importar_visitas --incremental', 'importar_visitas', pasta / 'visitas', {'incremental': True}),
+            ]
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{'importador':<38} {'segundos':>9} {'consultas':>10}"))
+            medidas = []
+            for nome, comando, caminho, extras in execucoes:
+                if not caminho.is_dir():
+                    raise CommandError(f'Pasta de planilhas não encontrada: {caminho}')
+                saida = io.StringIO()
+                with CaptureQueriesContext(connection) as consultas:
+                    inicio = time.perf_counter()
+                    # Sem o cache de planilhas: mede a leitura do Excel de verdade
+                    call_command(comando, str(caminho), sem_cache=True, rejeitados=rejeitados,
+                                 stdout=saida, stderr=saida, **extras)
+                    segundos = time.perf_counter() - inicio
+                medida = {'nome': nome, 'segundos': round(segundos, 3), 'consultas': len(consultas),
+                          'saida': saida.getvalue().strip().splitlines()}
+                medidas.append(medida)
+                self.stdout.write(f"{nome:<38} {medida['segundos']:>9.2f} {medida['consultas']:>10}")
+            return medidas
+
+    def _gerar_planilhas(self, pasta, visitas):
+        from core.dados_sinteticos import Escala, GeradorSintetico, escrever_planilhas
+
+        self.stdout.write(f'Gerando planilhas temporárias ({visitas} visitas)...')
+        escala = Escala(escolas=max(1, visitas // 10), visitas=visitas)
+        escrever_planilhas(GeradorSintetico(escala), pasta)
+        return Path(pasta)
+
+    # ------------------------------------------------------------------
+    # Comparação entre execuções
+    # ------------------------------------------------------------------
+
+    def _ler_json(self, caminho):
+        try:
+            return json.loads(Path(caminho).read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Não foi possível ler {caminho}: {e}')
+
+    def _comparar(self, anterior, atual):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\nComparação com {anterior.get('data')} ({anterior.get('commit') or 'sem commit'})"
+        ))
+        antes = {m['nome']: m for m in anterior.get('views', [])}
+        for medida in atual['views']:
+            velha = antes.get(medida['nome'])
+            if not velha:
+                continue
+            ms_antes, ms_agora = velha['ms_quente']['mediana'], medida['ms_quente']['mediana']
+            razao = ms_agora / ms_antes if ms_antes else 1.0
+            linha = (f"{medida['nome']:<38} {ms_antes:>8.1f} -> {ms_agora:>8.1f} ms ({razao:>5.2f}x)  "
+                     f"consultas {velha['consultas_frio']} -> {medida['consultas_frio']}")
+            if razao > 1.2 or medida['consultas_frio'] > velha['consultas_frio']:
+                self.stdout.write(self.style.WARNING(linha))
+            else:
+                self.stdout.write(linha)
+
+        antes = {m['nome']: m for m in anterior.get('importadores', [])}
+        for medida in atual.get('importadores', []):
+            velha = antes.get(medida['nome'])
+            if velha:
+                self.stdout.write(f"{medida['nome']:<38} {velha['segundos']:>8.2f} -> {medida['segundos']:>8.2f} s")
+
+    def _commit_atual(self):
+        try:
+            saida = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                                   capture_output=True, text=True, timeout=5)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        return saida.stdout.strip() or None
@@ -0,0 +1,59 @@
+# Em core/management/commands/medir_inicializacao.py
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Roda num processo Python novo: carrega a aplicação WSGI e as URLs (que
+# importam views, forms e models), como um worker do servidor ao subir.
+SCRIPT_WORKER = """
+import json, resource, sys, time
+inicio = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+segundos = time.perf_counter() - inicio
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss_kb //= 1024  # no macOS o ru_maxrss vem em bytes
+print(json.dumps({'segundos': segundos, 'rss_kb': rss_kb, 'pandas': 'pandas' in sys.modules}))
+"""
+
+
+class Command(BaseCommand):
+    help = 'Mede o tempo de arranque a frio e a memória (RSS) de um worker da aplicação.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=5)
+
+    def handle(self, *args, **options):
+        ambiente = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get(
+            'DJANGO_SETTINGS_MODULE', 'projeto_escola.settings'))
+
+        medidas = []
+        for _ in range(options['repeticoes']):
+            saida = subprocess.run(
+                [sys.executable, '-c', SCRIPT_WORKER],
+                cwd=settings.BASE_DIR, env=ambiente,
+                capture_output=True, text=True, check=True,
+            )
+            medidas.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+
+        tempos = [m['segundos'] * 1000 for m in medidas]
+        rss = [m['rss_kb'] / 1024 for m in medidas]
+        self.stdout.write(
+            f'Arranque a frio: mediana {statistics.median(tempos):.0f} ms '
+            f'(mín {min(tempos):.0f}, máx {max(tempos):.0f}) em {len(medidas)} processos'
+        )
+        self.stdout.write(f'RSS máximo: mediana {statistics.median(rss):.1f} MB')
+
+        if any(m['pandas'] for m in medidas):
+            self.stdout.write(self.style.WARNING('O pandas foi carregado durante o arranque do worker.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('O pandas não é carregado pelo worker.'))
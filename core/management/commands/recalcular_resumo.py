@@ -0,0 +1,20 @@
+# Em core/management/commands/recalcular_resumo.py
+
+from django.core.management.base import BaseCommand
+from core.models import ResumoDashboard, VisitaMensal
+
+
+class Command(BaseCommand):
+    help = 'Recalcula do zero o resumo do dashboard principal e o agregado mensal de visitas (corrige desvios).'
+
+    def handle(self, *args, **options):
+        resumo = ResumoDashboard.recalcular()
+        self.stdout.write(
+            f'Escolas: {resumo.total_escolas} | Visitas: {resumo.total_visitas} | '
+            f'Relatórios pendentes: {resumo.relatorios_pendentes} | '
+            f'Última visita: {resumo.ultima_data_visita or "N/A"}'
+        )
+
+        VisitaMensal.recalcular()
+        self.stdout.write(f'Agregado mensal de visitas: {VisitaMensal.objects.count()} linhas (mês, escola, técnico)')
+        self.stdout.write(self.style.SUCCESS('Resumo do dashboard recalculado com sucesso!'))
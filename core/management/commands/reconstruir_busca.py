@@ -0,0 +1,20 @@
+# Em core/management/commands/reconstruir_busca.py
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.busca import busca_disponivel, garantir_indice_busca
+
+
+class Command(BaseCommand):
+    help = 'Recria os triggers e reconstrói o índice de busca (FTS5) das visitas técnicas.'
+
+    def handle(self, *args, **options):
+        if not busca_disponivel(connection):
+            self.stdout.write(self.style.WARNING(
+                f'O banco "{connection.vendor}" não usa o índice FTS5; a busca funciona sem ele.'
+            ))
+            return
+
+        garantir_indice_busca(connection, reconstruir=True)
+        self.stdout.write(self.style.SUCCESS('Índice de busca das visitas reconstruído.'))
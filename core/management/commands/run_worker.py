@@ -0,0 +1,63 @@
+# Em core/management/commands/run_worker.py
+
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.tarefas import executar_proxima, identificacao_worker, recuperar_orfas
+
+
+class Command(BaseCommand):
+    help = ('Executa as tarefas em segundo plano (importações, recálculos, relatórios) da fila do banco. '
+            'Pode haver mais de um worker ao mesmo tempo.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help='Segundos entre uma consulta e outra à fila quando ela está vazia.')
+        parser.add_argument('--uma-vez', action='store_true', help='Esvazia a fila e termina.')
+        parser.add_argument('--max-tarefas', type=int, default=None,
+                            help='Termina depois de executar este número de tarefas (para reciclar o processo).')
+
+    def handle(self, *args, **options):
+        worker = identificacao_worker()
+        self.parar = False
+        # SIGTERM/Ctrl+C: termina a tarefa atual e sai (uma importação no meio
+        # seria desfeita, e a tarefa voltaria para a fila ao reiniciar)
+        signal.signal(signal.SIGTERM, self._pedir_parada)
+        signal.signal(signal.SIGINT, self._pedir_parada)
+
+        recuperadas = recuperar_orfas()
+        if recuperadas:
+            self.stdout.write(self.style.WARNING(f'{recuperadas} tarefa(s) de workers mortos voltaram para a fila.'))
+        self.stdout.write(f'Worker {worker} aguardando tarefas...')
+
+        executadas = 0
+        while not self.parar:
+            close_old_connections()
+            tarefa = executar_proxima(worker)
+            if tarefa is None:
+                if options['uma_vez']:
+                    break
+                time.sleep(options['intervalo'])
+                continue
+
+            executadas += 1
+            segundos = (tarefa.concluida_em - tarefa.iniciada_em).total_seconds() if tarefa.concluida_em else None
+            linha = (f'#{tarefa.pk} {tarefa.tipo}: {tarefa.get_status_display()}'
+                     + (f' em {segundos:.1f}s' if segundos is not None else '')
+                     + (f' ({tarefa.mensagem})' if tarefa.status != tarefa.CONCLUIDA else ''))
+            estilo = {tarefa.CONCLUIDA: self.style.SUCCESS, tarefa.FALHOU: self.style.ERROR}.get(
+                tarefa.status, self.style.WARNING)
+            self.stdout.write(estilo(linha))
+            if options['max_tarefas'] and executadas >= options['max_tarefas']:
+                break
+
+        self.stdout.write(f'Worker {worker} encerrado ({executadas} tarefa(s) executada(s)).')
+
+    def _pedir_parada(self, signum, frame):
+        if self.parar:
+            raise KeyboardInterrupt  # segundo sinal: sai na hora
+        self.parar = True
+        self.stdout.write('Parando depois da tarefa atual...')
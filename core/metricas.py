@@ -0,0 +1,259 @@
+# core/metricas.py
+
+# Métricas por view: tempo da requisição, número de consultas SQL, tempo
+# gasto no banco e detecção de consultas repetidas (N+1).
+#
+# O MetricasMiddleware observa as consultas da requisição (observar_sql):
+# cada uma custa um perf_counter() e um incremento num Counter pelo texto do
+# SQL, sem guardar parâmetros nem a lista de consultas (ao contrário do
+# DEBUG). Os valores vão para histogramas em memória, agregados pelo nome da
+# url, e saem em /metrics no formato texto do Prometheus.
+#
+# observar_sql não usa um execute_wrapper por requisição: as conexões são por
+# thread, e sob ASGI o ORM async e as consultas_paralelas dos dashboards
+# rodam as consultas em outras threads. Toda conexão recebe, ao ser criada,
+# um wrapper fixo que repassa a consulta aos observadores guardados num
+# contextvar, que o sync_to_async copia para a thread que executa o SQL.
+# O middleware funciona em WSGI e em ASGI (sync_capable e async_capable), sem
+# forçar as views async a passar por uma thread.
+#
+# Em respostas em streaming (exportações) só entra o que roda até o início
+# da resposta; as consultas feitas enquanto o corpo é enviado não são contadas.
+#
+# Os histogramas são do processo: com vários workers (gunicorn), cada um tem
+# os seus e cada coleta do Prometheus pega o de um só worker.
+
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Uma mesma instrução SQL executada este número de vezes (ou mais) numa
+# requisição conta como N+1
+LIMITE_REPETICAO_PADRAO = 10
+
+
+class Histograma:
+    """Histograma cumulativo no estilo do Prometheus (não é thread-safe; use com o lock do registro)."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.contagens = [0] * (len(buckets) + 1)  # o último é o +Inf
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.contagens[bisect.bisect_left(self.buckets, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def linhas(self, nome, rotulos):
+        acumulado = 0
+        for limite, contagem in zip(self.buckets, self.contagens):
+            acumulado += contagem
+            yield f'{nome}_bucket{{{rotulos},le="{limite}"}} {acumulado}'
+        yield f'{nome}_bucket{{{rotulos},le="+Inf"}} {self.total}'
+        yield f'{nome}_sum{{{rotulos}}} {self.soma:.6f}'
+        yield f'{nome}_count{{{rotulos}}} {self.total}'
+
+
+class _MetricasView:
+    def __init__(self):
+        self.segundos = Histograma(BUCKETS_SEGUNDOS)
+        self.consultas = Histograma(BUCKETS_CONSULTAS)
+        self.segundos_sql = Histograma(BUCKETS_SEGUNDOS)
+        self.status = Counter()
+        self.repeticoes = 0
+
+
+class Registro:
+    """Métricas acumuladas do processo, por view."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._avisadas = set()
+
+    def registrar(self, view, status, segundos, consultas, segundos_sql, repetida):
+        with self._lock:
+            metricas = self._views.get(view)
+            if metricas is None:
+                metricas = self._views[view] = _MetricasView()
+            metricas.segundos.observar(segundos)
+            metricas.consultas.observar(consultas)
+            metricas.segundos_sql.observar(segundos_sql)
+            metricas.status[status] += 1
+            if repetida:
+                metricas.repeticoes += 1
+                primeira = view not in self._avisadas
+                self._avisadas.add(view)
+            else:
+                primeira = False
+        if primeira:
+            sql, vezes = repetida
+            logger.warning('Possível N+1 em %s: a mesma consulta rodou %d vezes: %s', view, vezes, sql[:300])
+
+    def limpar(self):
+        with self._lock:
+            self._views.clear()
+            self._avisadas.clear()
+
+    def texto_prometheus(self):
+        with self._lock:
+            views = sorted(self._views.items())
+            blocos = {
+                'saepe_requisicao_segundos': ('histogram', 'Tempo total da requisição.', []),
+                'saepe_sql_consultas': ('histogram', 'Consultas SQL por requisição.', []),
+                'saepe_sql_segundos': ('histogram', 'Tempo gasto em SQL por requisição.', []),
+                'saepe_requisicoes_total': ('counter', 'Requisições por status HTTP.', []),
+                'saepe_sql_repetidas_total': ('counter', 'Requisições com a mesma consulta repetida (N+1).', []),
+            }
+            for view, m in views:
+                rotulo = f'view="{_escapar(view)}"'
+                blocos['saepe_requisicao_segundos'][2].extend(m.segundos.linhas('saepe_requisicao_segundos', rotulo))
+                blocos['saepe_sql_consultas'][2].extend(m.consultas.linhas('saepe_sql_consultas', rotulo))
+                blocos['saepe_sql_segundos'][2].extend(m.segundos_sql.linhas('saepe_sql_segundos', rotulo))
+                for status, total in sorted(m.status.items()):
+                    blocos['saepe_requisicoes_total'][2].append(
+                        f'saepe_requisicoes_total{{{rotulo},status="{status}"}} {total}')
+                blocos['saepe_sql_repetidas_total'][2].append(f'saepe_sql_repetidas_total{{{rotulo}}} {m.repeticoes}')
+
+        linhas = []
+        for nome, (tipo, ajuda, amostras) in blocos.items():
+            linhas.append(f'# HELP {nome} {ajuda}')
+            linhas.append(f'# TYPE {nome} {tipo}')
+            linhas.extend(amostras)
+        return '\n'.join(linhas) + '\n'
+
+
+def _escapar(valor):
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registro = Registro()
+
+
+# ------------------------------------------------------------------------------
+# Observadores de SQL
+# ------------------------------------------------------------------------------
+
+# Observadores (com a assinatura de um execute_wrapper) do contexto atual
+_observadores = contextvars.ContextVar('saepe_observadores_sql', default=())
+
+
+def _executar_observado(execute, sql, params, many, context):
+    observadores = _observadores.get()
+    for observador in reversed(observadores):
+        execute = partial(observador, execute)
+    return execute(sql, params, many, context)
+
+
+def instalar_observador(conexao):
+    """Põe o wrapper fixo na conexão (uma vez só; chamado pelo sinal connection_created)."""
+    if _executar_observado not in conexao.execute_wrappers:
+        conexao.execute_wrappers.append(_executar_observado)
+
+
+def ao_criar_conexao(sender, connection, **kwargs):
+    instalar_observador(connection)
+
+
+@contextmanager
+def observar_sql(observador):
+    """
+    Durante o bloco, `observador(execute, sql, params, many, context)` vê as
+    consultas deste contexto, em qualquer thread para onde o sync_to_async o
+    leve. Pode ser chamado de threads diferentes ao mesmo tempo.
+    """
+    # Conexões desta thread abertas antes do sinal estar ligado
+    for conexao in connections.all(initialized_only=True):
+        instalar_observador(conexao)
+    token = _observadores.set(_observadores.get() + (observador,))
+    try:
+        yield observador
+    finally:
+        _observadores.reset(token)
+
+
+class _ContadorSQL:
+    """Observador que conta e cronometra as consultas de uma requisição."""
+
+    def __init__(self):
+        self.instrucoes = Counter()
+        self.segundos = 0.0
+        self._lock = threading.Lock()  # consultas_paralelas: várias threads ao mesmo tempo
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self._lock:
+                self.segundos += time.perf_counter() - inicio
+                # O SQL vem com placeholders (%s): a mesma consulta com
+                # parâmetros diferentes tem o mesmo texto
+                self.instrucoes[sql] += 1
+
+    def repetida(self, limite):
+        if not self.instrucoes:
+            return None
+        sql, vezes = self.instrucoes.most_common(1)[0]
+        return (sql, vezes) if vezes >= limite else None
+
+
+class MetricasMiddleware:
+    """Registra tempo, consultas SQL e N+1 de cada requisição (desligue com METRICAS_ATIVAS = False)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.ativas = getattr(settings, 'METRICAS_ATIVAS', True)
+        self.limite_repeticao = getattr(settings, 'METRICAS_LIMITE_REPETICAO', LIMITE_REPETICAO_PADRAO)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.ativas:
+            return self.get_response(request)
+
+        inicio = time.perf_counter()
+        with observar_sql(_ContadorSQL()) as contador:
+            resposta = self.get_response(request)
+        self._registrar(request, resposta, time.perf_counter() - inicio, contador)
+        return resposta
+
+    async def __acall__(self, request):
+        if not self.ativas:
+            return await self.get_response(request)
+
+        inicio = time.perf_counter()
+        with observar_sql(_ContadorSQL()) as contador:
+            resposta = await self.get_response(request)
+        self._registrar(request, resposta, time.perf_counter() - inicio, contador)
+        return resposta
+
+    def _registrar(self, request, resposta, segundos, contador):
+        correspondencia = getattr(request, 'resolver_match', None)
+        view = correspondencia.view_name if correspondencia and correspondencia.view_name else 'nao_resolvida'
+        registro.registrar(
+            view, resposta.status_code, segundos,
+            sum(contador.instrucoes.values()), contador.segundos,
+            contador.repetida(self.limite_repeticao),
+        )
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_visitatecnica'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dadosficticiosescola',
+            name='hash_linha',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='visitatecnica',
+            name='hash_linha',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+    ]
@@ -0,0 +1,108 @@
+# Troca o nome da escola (texto livre) em VisitaTecnica e DadosFicticiosEscola
+# por uma chave estrangeira inteira para Escola, preenchida a partir dos nomes atuais.
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+MODELOS = ['VisitaTecnica', 'DadosFicticiosEscola']
+
+
+def preencher_escola_ref(apps, schema_editor):
+    Escola = apps.get_model('core', 'Escola')
+
+    nomes = set()
+    for nome_modelo in MODELOS:
+        modelo = apps.get_model('core', nome_modelo)
+        nomes.update(modelo.objects.values_list('escola', flat=True).distinct())
+
+    ids = {}
+    for pk, nome in Escola.objects.filter(nome__in=nomes).order_by('-id').values_list('id', 'nome'):
+        ids[nome] = pk
+    faltando = sorted(nomes - ids.keys())
+    Escola.objects.bulk_create([Escola(nome=nome, cidade='') for nome in faltando])
+    for pk, nome in Escola.objects.filter(nome__in=faltando).values_list('id', 'nome'):
+        ids.setdefault(nome, pk)
+
+    # Um UPDATE por escola distinta, não por linha
+    for nome_modelo in MODELOS:
+        modelo = apps.get_model('core', nome_modelo)
+        for nome, pk in ids.items():
+            modelo.objects.filter(escola=nome).update(escola_ref_id=pk)
+
+
+def restaurar_nome_escola(apps, schema_editor):
+    Escola = apps.get_model('core', 'Escola')
+    for pk, nome in Escola.objects.values_list('id', 'nome'):
+        for nome_modelo in MODELOS:
+            apps.get_model('core', nome_modelo).objects.filter(escola_ref_id=pk).update(escola=nome)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_dadosficticiosescola_hash_linha_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='escola',
+            name='nome',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='escola',
+            name='cidade',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='visitatecnica',
+            name='escola_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.escola'),
+        ),
+        migrations.AddField(
+            model_name='dadosficticiosescola',
+            name='escola_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.escola'),
+        ),
+        # Nulo só durante a troca, para a migração poder ser desfeita
+        migrations.AlterField(
+            model_name='visitatecnica',
+            name='escola',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='dadosficticiosescola',
+            name='escola',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.RunPython(preencher_escola_ref, restaurar_nome_escola),
+        migrations.RemoveField(
+            model_name='visitatecnica',
+            name='escola',
+        ),
+        migrations.RemoveField(
+            model_name='dadosficticiosescola',
+            name='escola',
+        ),
+        migrations.RenameField(
+            model_name='visitatecnica',
+            old_name='escola_ref',
+            new_name='escola',
+        ),
+        migrations.RenameField(
+            model_name='dadosficticiosescola',
+            old_name='escola_ref',
+            new_name='escola',
+        ),
+        migrations.AlterField(
+            model_name='visitatecnica',
+            name='escola',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visitas_tecnicas', to='core.escola'),
+        ),
+        migrations.AlterField(
+            model_name='dadosficticiosescola',
+            name='escola',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dados_ficticios', to='core.escola'),
+        ),
+    ]
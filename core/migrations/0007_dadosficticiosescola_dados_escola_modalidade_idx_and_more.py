@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_escola_dimensao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dadosficticiosescola',
+            index=models.Index(fields=['escola', 'modalidade'], name='dados_escola_modalidade_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visita',
+            index=models.Index(condition=models.Q(('status', 'agendada')), fields=['-data_visita', '-hora_visita'], name='visita_agendada_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visitatecnica',
+            index=models.Index(fields=['escola', '-data_visita', '-id'], name='visita_tec_escola_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visitatecnica',
+            index=models.Index(fields=['tecnico_gre'], name='visita_tec_tecnico_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visitatecnica',
+            index=models.Index(fields=['data_visita'], name='visita_tec_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visitatecnica',
+            index=models.Index(condition=models.Q(('encaminhamento__isnull', True), ('encaminhamento', ''), _connector='OR'), fields=['id'], name='visita_tec_pendente_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_dadosficticiosescola_dados_escola_modalidade_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDashboard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_escolas', models.IntegerField(default=0)),
+                ('total_visitas', models.IntegerField(default=0)),
+                ('relatorios_pendentes', models.IntegerField(default=0)),
+                ('ultima_data_visita', models.DateField(blank=True, null=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
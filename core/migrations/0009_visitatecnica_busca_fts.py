@@ -0,0 +1,65 @@
+# Índice de busca de texto (FTS5) das visitas técnicas. Só tem efeito no SQLite.
+#
+# O SQL fica copiado aqui (e não importado de core.busca) para a migração
+# continuar a mesma se o módulo mudar. O reparo depois de migrações que
+# recriam core_visitatecnica continua no post_migrate (core.busca).
+
+from django.db import migrations
+
+
+SQL_CRIAR = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_visitatecnica_fts USING fts5("
+    "demanda, encaminhamento, observacao, content='core_visitatecnica', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+
+    "CREATE TRIGGER IF NOT EXISTS core_visitatecnica_fts_ai AFTER INSERT ON core_visitatecnica BEGIN "
+    "INSERT INTO core_visitatecnica_fts(rowid, demanda, encaminhamento, observacao) "
+    "VALUES (new.id, new.demanda, new.encaminhamento, new.observacao); END",
+
+    "CREATE TRIGGER IF NOT EXISTS core_visitatecnica_fts_ad AFTER DELETE ON core_visitatecnica BEGIN "
+    "INSERT INTO core_visitatecnica_fts(core_visitatecnica_fts, rowid, demanda, encaminhamento, observacao) "
+    "VALUES ('delete', old.id, old.demanda, old.encaminhamento, old.observacao); END",
+
+    "CREATE TRIGGER IF NOT EXISTS core_visitatecnica_fts_au "
+    "AFTER UPDATE OF demanda, encaminhamento, observacao ON core_visitatecnica BEGIN "
+    "INSERT INTO core_visitatecnica_fts(core_visitatecnica_fts, rowid, demanda, encaminhamento, observacao) "
+    "VALUES ('delete', old.id, old.demanda, old.encaminhamento, old.observacao); "
+    "INSERT INTO core_visitatecnica_fts(rowid, demanda, encaminhamento, observacao) "
+    "VALUES (new.id, new.demanda, new.encaminhamento, new.observacao); END",
+
+    # Indexa as visitas que já existiam
+    "INSERT INTO core_visitatecnica_fts(core_visitatecnica_fts) VALUES ('rebuild')",
+]
+
+SQL_REMOVER = [
+    "DROP TRIGGER IF EXISTS core_visitatecnica_fts_ai",
+    "DROP TRIGGER IF EXISTS core_visitatecnica_fts_ad",
+    "DROP TRIGGER IF EXISTS core_visitatecnica_fts_au",
+    "DROP TABLE IF EXISTS core_visitatecnica_fts",
+]
+
+
+def _executar(schema_editor, comandos):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in comandos:
+        schema_editor.execute(sql, params=None)
+
+
+def criar_indice(apps, schema_editor):
+    _executar(schema_editor, SQL_CRIAR)
+
+
+def remover_indice(apps, schema_editor):
+    _executar(schema_editor, SQL_REMOVER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_resumodashboard'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
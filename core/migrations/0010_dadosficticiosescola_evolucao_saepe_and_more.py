@@ -0,0 +1,89 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:33
+
+from django.db import migrations, models
+from django.db.models.functions import Rank, Round
+
+
+def preencher_posicoes(apps, schema_editor):
+    # Mesma conta de DadosFicticiosEscola.recalcular_posicoes(), com o modelo histórico
+    DadosFicticiosEscola = apps.get_model('core', 'DadosFicticiosEscola')
+    DadosFicticiosEscola.objects.update(evolucao_saepe=Round(models.F('saepe_2023') - models.F('saepe_2022'), 4))
+
+    metricas = {
+        'proficiencia_lp_2023': 'posicao_lp',
+        'proficiencia_mt_2023': 'posicao_mt',
+        'saepe_2022': 'posicao_saepe_2022',
+        'saepe_2023': 'posicao_saepe_2023',
+        'evolucao_saepe': 'posicao_evolucao_saepe',
+    }
+    objetos = {d.id: d for d in DadosFicticiosEscola.objects.only('id')}
+    for campo_valor, campo_posicao in metricas.items():
+        ranking = (
+            DadosFicticiosEscola.objects.filter(**{f'{campo_valor}__isnull': False})
+            .annotate(posicao=models.Window(Rank(), order_by=models.F(campo_valor).desc()))
+            .values_list('id', 'posicao')
+        )
+        for dado_id, posicao in ranking:
+            setattr(objetos[dado_id], campo_posicao, posicao)
+    DadosFicticiosEscola.objects.bulk_update(objetos.values(), list(metricas.values()), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_visitatecnica_busca_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dadosficticiosescola',
+            name='evolucao_saepe',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='dadosficticiosescola',
+            name='posicao_evolucao_saepe',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='dadosficticiosescola',
+            name='posicao_lp',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='dadosficticiosescola',
+            name='posicao_mt',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='dadosficticiosescola',
+            name='posicao_saepe_2022',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='dadosficticiosescola',
+            name='posicao_saepe_2023',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='dadosficticiosescola',
+            index=models.Index(fields=['posicao_lp'], name='dados_posicao_lp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dadosficticiosescola',
+            index=models.Index(fields=['posicao_mt'], name='dados_posicao_mt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dadosficticiosescola',
+            index=models.Index(fields=['posicao_saepe_2022'], name='dados_posicao_saepe22_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dadosficticiosescola',
+            index=models.Index(fields=['posicao_saepe_2023'], name='dados_posicao_saepe23_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dadosficticiosescola',
+            index=models.Index(fields=['posicao_evolucao_saepe'], name='dados_posicao_evolucao_idx'),
+        ),
+        migrations.RunPython(preencher_posicoes, migrations.RunPython.noop),
+    ]
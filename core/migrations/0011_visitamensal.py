@@ -0,0 +1,48 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, TruncMonth
+
+
+def preencher_visitas_mensais(apps, schema_editor):
+    # Mesma conta de VisitaMensal.recalcular(), com os modelos históricos
+    VisitaTecnica = apps.get_model('core', 'VisitaTecnica')
+    VisitaMensal = apps.get_model('core', 'VisitaMensal')
+    pendente = models.Q(encaminhamento__isnull=True) | models.Q(encaminhamento='')
+    linhas = (VisitaTecnica.objects
+              .values('escola_id', mes=TruncMonth('data_visita'), tecnico=Coalesce('tecnico_gre', models.Value('')))
+              .annotate(n=models.Count('id'), n_pendentes=models.Count('id', filter=pendente))
+              .values_list('mes', 'escola_id', 'tecnico', 'n', 'n_pendentes')
+              .order_by())
+    VisitaMensal.objects.bulk_create(
+        (VisitaMensal(mes=mes, escola_id=escola_id, tecnico_gre=tecnico, total=n, pendentes=n_pendentes)
+         for mes, escola_id, tecnico, n, n_pendentes in linhas.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_dadosficticiosescola_evolucao_saepe_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VisitaMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(blank=True, null=True)),
+                ('tecnico_gre', models.CharField(blank=True, default='', max_length=255)),
+                ('total', models.IntegerField(default=0)),
+                ('pendentes', models.IntegerField(default=0)),
+                ('escola', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visitas_mensais', to='core.escola')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['escola', 'mes'], name='visita_mensal_escola_mes_idx')],
+                'constraints': [models.UniqueConstraint(fields=('mes', 'escola', 'tecnico_gre'), name='visita_mensal_chave_uniq'), models.UniqueConstraint(condition=models.Q(('mes__isnull', True)), fields=('escola', 'tecnico_gre'), name='visita_mensal_sem_data_uniq')],
+            },
+        ),
+        migrations.RunPython(preencher_visitas_mensais, migrations.RunPython.noop),
+    ]
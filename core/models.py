@@ -1,16 +1,44 @@
 # core/models.py
 
-from django.db import models
+import datetime
+from collections import defaultdict
+
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Coalesce, Rank, Round, TruncMonth
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .assincrono import consultas_paralelas
 
 # Modelo para representar cada escola
+# (é a dimensão compartilhada por VisitaTecnica e DadosFicticiosEscola)
 class Escola(models.Model):
-    nome = models.CharField(max_length=200)
-    cidade = models.CharField(max_length=100)
+    nome = models.CharField(max_length=255, db_index=True)
+    cidade = models.CharField(max_length=100, blank=True, default='')
 
     def __str__(self):
         return self.nome
 
+    @classmethod
+    def resolver_ids(cls, nomes):
+        """
+        Devolve {nome: id} para os nomes dados, criando as escolas que faltarem.
+
+        Usado pelas importações: uma consulta (e no máximo um INSERT em lote)
+        por importação, em vez de um get_or_create por linha.
+        """
+        nomes = set(nomes)
+        ids = {}
+        # Se houver nomes repetidos na tabela, fica o id mais antigo
+        for pk, nome in cls.objects.filter(nome__in=nomes).order_by('-id').values_list('id', 'nome'):
+            ids[nome] = pk
+        faltando = nomes - ids.keys()
+        if faltando:
+            cls.objects.bulk_create([cls(nome=nome) for nome in sorted(faltando)])
+            for pk, nome in cls.objects.filter(nome__in=faltando).values_list('id', 'nome'):
+                ids.setdefault(nome, pk)
+        return ids
+
 # Modelo para as possíveis ocorrências que podem ser marcadas
 class Ocorrencia(models.Model):
     descricao = models.CharField(max_length=255)
@@ -50,12 +78,17 @@ class Visita(models.Model):
         ordering = ['-data_visita', '-hora_visita']
         verbose_name = "Visita"
         verbose_name_plural = "Visitas"
+        indexes = [
+            # Só as visitas agendadas (a minoria), na ordem da listagem
+            models.Index(fields=['-data_visita', '-hora_visita'], condition=models.Q(status='agendada'),
+                         name='visita_agendada_idx'),
+        ]
 
     def __str__(self):
         return f"Visita à {self.escola.nome} em {self.data_visita.strftime('%d/%m/%Y')} - {self.get_status_display()}"
     
 class DadosFicticiosEscola(models.Model):
-    escola = models.CharField(max_length=255)
+    escola = models.ForeignKey(Escola, on_delete=models.CASCADE, related_name='dados_ficticios')
     modalidade = models.CharField(max_length=100)
     alunos_previstos_2023 = models.IntegerField(null=True, blank=True)
     percentual_peso = models.FloatField(null=True, blank=True)
@@ -64,9 +97,93 @@ class DadosFicticiosEscola(models.Model):
     proficiencia_lp_2023 = models.FloatField(null=True, blank=True)
     proficiencia_mt_2023 = models.FloatField(null=True, blank=True)
     matricula_efaf_2024 = models.IntegerField(null=True, blank=True)
+    # Impressão digital da linha do Excel (vazio = não veio de importação)
+    hash_linha = models.CharField(max_length=40, blank=True, default='', editable=False)
+
+    # Ranking pré-calculado (recalcular_posicoes() depois de cada importação).
+    # 1 = melhor; vazio quando a escola não tem a métrica.
+    evolucao_saepe = models.FloatField(null=True, blank=True, editable=False)  # SAEPE 2023 - 2022
+    posicao_lp = models.IntegerField(null=True, blank=True, editable=False)
+    posicao_mt = models.IntegerField(null=True, blank=True, editable=False)
+    posicao_saepe_2022 = models.IntegerField(null=True, blank=True, editable=False)
+    posicao_saepe_2023 = models.IntegerField(null=True, blank=True, editable=False)
+    posicao_evolucao_saepe = models.IntegerField(null=True, blank=True, editable=False)
+
+    # Chave natural usada pela importação incremental
+    CHAVE_IMPORTACAO = ['escola', 'modalidade']
+
+    # Métricas do ranking: código -> (campo do valor, campo da posição, rótulo)
+    METRICAS = {
+        'lp': ('proficiencia_lp_2023', 'posicao_lp', 'Proficiência LP 2023'),
+        'mt': ('proficiencia_mt_2023', 'posicao_mt', 'Proficiência MT 2023'),
+        'saepe_2022': ('saepe_2022', 'posicao_saepe_2022', 'SAEPE 2022'),
+        'saepe_2023': ('saepe_2023', 'posicao_saepe_2023', 'SAEPE 2023'),
+        'evolucao_saepe': ('evolucao_saepe', 'posicao_evolucao_saepe', 'Evolução SAEPE 2022→2023'),
+    }
+    METRICA_PADRAO = 'lp'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['escola', 'modalidade'], name='dados_escola_modalidade_idx'),
+            models.Index(fields=['posicao_lp'], name='dados_posicao_lp_idx'),
+            models.Index(fields=['posicao_mt'], name='dados_posicao_mt_idx'),
+            models.Index(fields=['posicao_saepe_2022'], name='dados_posicao_saepe22_idx'),
+            models.Index(fields=['posicao_saepe_2023'], name='dados_posicao_saepe23_idx'),
+            models.Index(fields=['posicao_evolucao_saepe'], name='dados_posicao_evolucao_idx'),
+        ]
 
     def __str__(self):
-        return self.escola
+        return self.escola.nome
+
+    @classmethod
+    def recalcular_posicoes(cls):
+        """
+        Recalcula a evolução do SAEPE e as posições de todas as métricas.
+
+        Cada posição sai de um RANK() no banco (empates dividem a posição);
+        linhas sem o valor ficam sem posição.
+        """
+        with transaction.atomic():
+            # Arredondada para empates (ex.: 4,9 - 4,8 e 5,0 - 4,9) não serem desfeitos por ruído de ponto flutuante
+            cls.objects.update(evolucao_saepe=Round(models.F('saepe_2023') - models.F('saepe_2022'), 4))
+
+            posicoes = {}
+            for campo_valor, campo_posicao, _ in cls.METRICAS.values():
+                ranking = (
+                    cls.objects.filter(**{f'{campo_valor}__isnull': False})
+                    .annotate(posicao=models.Window(Rank(), order_by=models.F(campo_valor).desc()))
+                    .values_list('id', 'posicao')
+                )
+                for dado_id, posicao in ranking:
+                    posicoes.setdefault(dado_id, {})[campo_posicao] = posicao
+
+            campos_posicao = [campo_posicao for _, campo_posicao, _ in cls.METRICAS.values()]
+            objetos = [
+                cls(id=dado_id, **{campo: posicoes.get(dado_id, {}).get(campo) for campo in campos_posicao})
+                for dado_id in cls.objects.values_list('id', flat=True)
+            ]
+            cls.objects.bulk_update(objetos, campos_posicao, batch_size=500)
+
+    @classmethod
+    def ranking(cls, metrica, n=5, melhores=True):
+        """Top (ou último) N pela métrica, lendo o índice da posição pré-calculada."""
+        _, campo_posicao, _ = cls.METRICAS[metrica]
+        ordem = [campo_posicao, 'id'] if melhores else [f'-{campo_posicao}', '-id']
+        return (cls.objects.filter(**{f'{campo_posicao}__isnull': False})
+                           .select_related('escola')
+                           .order_by(*ordem)[:n])
+
+    @classmethod
+    def total_ranqueado(cls, metrica):
+        """Quantas linhas têm posição na métrica (o "de N" em "3º de N")."""
+        _, campo_posicao, _ = cls.METRICAS[metrica]
+        return cls.objects.filter(**{f'{campo_posicao}__isnull': False}).count()
+
+
+# Visita técnica com "relatório pendente": sem encaminhamento (vazio ou nulo).
+# As consultas devem usar exatamente esta condição para o SQLite
+# aproveitar o índice parcial visita_tec_pendente_idx.
+RELATORIO_PENDENTE = models.Q(encaminhamento__isnull=True) | models.Q(encaminhamento='')
 
 
 # NOSSO NOVO MODELO PARA AS VISITAS TÉCNICAS
@@ -74,14 +191,348 @@ class VisitaTecnica(models.Model):
     # Usamos os nomes da sua planilha, mas em formato Python
     # (minúsculas, sem espaços, sem acentos)
     
-    escola = models.CharField(max_length=255)
+    escola = models.ForeignKey(Escola, on_delete=models.CASCADE, related_name='visitas_tecnicas')
     data_visita = models.DateField(null=True, blank=True) # Melhor tipo para datas
     tecnico_gre = models.CharField(max_length=255, null=True, blank=True)
     servidor_escola = models.CharField(max_length=255, null=True, blank=True)
     demanda = models.TextField(null=True, blank=True) # TextField é melhor para textos longos
     encaminhamento = models.TextField(null=True, blank=True)
     observacao = models.TextField(null=True, blank=True)
+    # Impressão digital da linha do Excel (vazio = registada pelo formulário)
+    hash_linha = models.CharField(max_length=40, blank=True, default='', editable=False)
+
+    # Chave natural usada pela importação incremental
+    CHAVE_IMPORTACAO = ['escola', 'data_visita', 'tecnico_gre']
+
+    class Meta:
+        indexes = [
+            # Histórico da escola (perfil) e "última visita por escola" (visitas)
+            models.Index(fields=['escola', '-data_visita', '-id'], name='visita_tec_escola_data_idx'),
+            # Visitas por técnico (gráfico de rosca)
+            models.Index(fields=['tecnico_gre'], name='visita_tec_tecnico_idx'),
+            # Data da última visita (Max) no dashboard principal
+            models.Index(fields=['data_visita'], name='visita_tec_data_idx'),
+            # Contagem de relatórios pendentes
+            models.Index(fields=['id'], condition=RELATORIO_PENDENTE, name='visita_tec_pendente_idx'),
+        ]
 
     def __str__(self):
         # Isto é o que vai aparecer no painel de admin do Django
-        return f"Visita em {self.escola} ({self.data_visita})"
\ No newline at end of file
+        return f"Visita em {self.escola} ({self.data_visita})"
+
+
+# Números do dashboard principal, guardados numa linha só (pk=1) para a
+# página inicial não precisar de varrer as tabelas a cada acesso.
+# Atualizado aos poucos quando uma visita é registada e recalculado por
+# inteiro depois das importações (ou com manage.py recalcular_resumo).
+class ResumoDashboard(models.Model):
+    total_escolas = models.IntegerField(default=0)
+    total_visitas = models.IntegerField(default=0)
+    relatorios_pendentes = models.IntegerField(default=0)
+    ultima_data_visita = models.DateField(null=True, blank=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Resumo do dashboard ({self.atualizado_em:%d/%m/%Y %H:%M})"
+
+    @classmethod
+    def recalcular(cls):
+        """Refaz os números a partir das tabelas (corrige qualquer desvio)."""
+        resumo, _ = cls.objects.update_or_create(pk=1, defaults={
+            'total_escolas': DadosFicticiosEscola.objects.values('escola').distinct().count(),
+            'total_visitas': VisitaTecnica.objects.count(),
+            'relatorios_pendentes': VisitaTecnica.objects.filter(RELATORIO_PENDENTE).count(),
+            'ultima_data_visita': VisitaTecnica.objects.aggregate(max_date=models.Max('data_visita'))['max_date'],
+        })
+        return resumo
+
+    @classmethod
+    def obter(cls):
+        return cls.objects.filter(pk=1).first() or cls.recalcular()
+
+    @classmethod
+    async def arecalcular(cls):
+        """recalcular() para as views async; as quatro contagens rodam ao mesmo tempo (consultas_paralelas)."""
+        total_escolas, total_visitas, relatorios_pendentes, ultima = await consultas_paralelas(
+            DadosFicticiosEscola.objects.values('escola').distinct().count,
+            VisitaTecnica.objects.count,
+            VisitaTecnica.objects.filter(RELATORIO_PENDENTE).count,
+            lambda: VisitaTecnica.objects.aggregate(max_date=models.Max('data_visita')),
+        )
+        resumo, _ = await cls.objects.aupdate_or_create(pk=1, defaults={
+            'total_escolas': total_escolas,
+            'total_visitas': total_visitas,
+            'relatorios_pendentes': relatorios_pendentes,
+            'ultima_data_visita': ultima['max_date'],
+        })
+        return resumo
+
+    @classmethod
+    async def aobter(cls):
+        return await cls.objects.filter(pk=1).afirst() or await cls.arecalcular()
+
+    @classmethod
+    def registrar_visita(cls, visita):
+        """Soma uma visita nova ao resumo com um único UPDATE (sem ler a linha antes)."""
+        alteracoes = {
+            'total_visitas': models.F('total_visitas') + 1,
+            'atualizado_em': timezone.now(),
+        }
+        if not visita.encaminhamento:
+            alteracoes['relatorios_pendentes'] = models.F('relatorios_pendentes') + 1
+        if visita.data_visita:
+            alteracoes['ultima_data_visita'] = models.Case(
+                models.When(
+                    models.Q(ultima_data_visita__isnull=True) | models.Q(ultima_data_visita__lt=visita.data_visita),
+                    then=models.Value(visita.data_visita),
+                ),
+                default=models.F('ultima_data_visita'),
+            )
+        if not cls.objects.filter(pk=1).update(**alteracoes):
+            # Ainda não existia resumo: calcula do zero (já inclui a visita nova)
+            cls.recalcular()
+
+
+# Visitas técnicas por mês, escola e técnico (para os gráficos de tendência).
+# A tabela é mantida aos poucos, nunca recalculada a cada escrita: uma visita
+# do formulário soma 1 na sua linha (registrar_visita) e as importações
+# aplicam só a diferença do que inseriram, alteraram ou removeram
+# (registrar_importacao). Os gráficos leem daqui para qualquer período sem
+# varrer VisitaTecnica. recalcular() (manage.py recalcular_resumo) refaz tudo.
+class VisitaMensal(models.Model):
+    mes = models.DateField(null=True, blank=True)  # dia 1 do mês; None = visita sem data
+    escola = models.ForeignKey(Escola, on_delete=models.CASCADE, related_name='visitas_mensais')
+    tecnico_gre = models.CharField(max_length=255, blank=True, default='')  # '' = não informado
+    total = models.IntegerField(default=0)
+    pendentes = models.IntegerField(default=0)  # relatórios pendentes (ver RELATORIO_PENDENTE)
+
+    class Meta:
+        constraints = [
+            # O índice da constraint também serve às consultas por período (mes__range)
+            models.UniqueConstraint(fields=['mes', 'escola', 'tecnico_gre'], name='visita_mensal_chave_uniq'),
+            # NULL não conta como repetido no UNIQUE acima: as visitas sem data têm o seu
+            models.UniqueConstraint(fields=['escola', 'tecnico_gre'], condition=models.Q(mes__isnull=True),
+                                    name='visita_mensal_sem_data_uniq'),
+        ]
+        indexes = [
+            # Série mensal de uma escola (perfil / filtro do dashboard)
+            models.Index(fields=['escola', 'mes'], name='visita_mensal_escola_mes_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.escola} - {self.tecnico_gre or 'sem técnico'} - {self.mes or 'sem data'}: {self.total}"
+
+    @staticmethod
+    def chave(data_visita, escola_id, tecnico_gre):
+        """(mês, escola, técnico) de uma visita; aceita os NaN/None vindos do pandas."""
+        try:
+            mes = datetime.date(data_visita.year, data_visita.month, 1)
+        except (AttributeError, TypeError, ValueError):  # None, NaN, NaT
+            mes = None
+        return mes, int(escola_id), tecnico_gre if isinstance(tecnico_gre, str) else ''
+
+    @classmethod
+    def contar(cls, linhas, sinal=1):
+        """
+        Soma (total, pendentes) por chave para linhas
+        (data_visita, escola_id, tecnico_gre, encaminhamento).
+        """
+        contagem = defaultdict(lambda: [0, 0])
+        for data_visita, escola_id, tecnico_gre, encaminhamento in linhas:
+            soma = contagem[cls.chave(data_visita, escola_id, tecnico_gre)]
+            soma[0] += sinal
+            if not isinstance(encaminhamento, str) or not encaminhamento:
+                soma[1] += sinal
+        return contagem
+
+    @classmethod
+    def aplicar_diferencas(cls, diferencas, batch_size=500):
+        """
+        Soma {chave: (total, pendentes)} às linhas do agregado.
+
+        As linhas existentes recebem UPDATE relativo (total = total + n), então
+        duas escritas ao mesmo tempo não perdem a contagem uma da outra. Chaves
+        novas são inseridas (ver _inserir_ou_somar) e linhas que chegam a zero
+        são apagadas.
+        """
+        diferencas = {chave: tuple(soma) for chave, soma in diferencas.items() if any(soma)}
+        if not diferencas:
+            return
+
+        existentes = {}
+        escolas = sorted({escola_id for _, escola_id, _ in diferencas})
+        for i in range(0, len(escolas), batch_size):
+            linhas = cls.objects.filter(escola_id__in=escolas[i:i + batch_size]).values_list(
+                'id', 'mes', 'escola_id', 'tecnico_gre')
+            existentes.update({(mes, escola_id, tecnico): pk for pk, mes, escola_id, tecnico in linhas})
+
+        alteradas, novas = [], []
+        for (mes, escola_id, tecnico), (total, pendentes) in diferencas.items():
+            pk = existentes.get((mes, escola_id, tecnico))
+            if pk is None:
+                novas.append(cls(mes=mes, escola_id=escola_id, tecnico_gre=tecnico, total=total, pendentes=pendentes))
+            else:
+                alteradas.append(cls(pk=pk, total=models.F('total') + total,
+                                     pendentes=models.F('pendentes') + pendentes))
+
+        with transaction.atomic():
+            if alteradas:
+                cls.objects.bulk_update(alteradas, ['total', 'pendentes'], batch_size=batch_size)
+                ids = [linha.pk for linha in alteradas]
+                for i in range(0, len(ids), batch_size):
+                    cls.objects.filter(pk__in=ids[i:i + batch_size], total__lte=0).delete()
+            cls._inserir_ou_somar([linha for linha in novas if linha.total > 0], batch_size)
+
+    @classmethod
+    def _inserir_ou_somar(cls, novas, batch_size):
+        """
+        Insere as linhas de chaves que não existiam na leitura. Se outra escrita
+        (outro formulário, o run_worker) criou a mesma chave nesse meio tempo, a
+        constraint única recusa o INSERT e a diferença é somada à linha dela.
+        """
+        if not novas:
+            return
+        try:
+            # Savepoint: um INSERT recusado não derruba a transação de quem chamou
+            with transaction.atomic():
+                cls.objects.bulk_create(novas, batch_size=batch_size)
+            return
+        except IntegrityError:
+            pass
+        # Alguma chave já existe: uma a uma, somando nas que foram criadas
+        for linha in novas:
+            linha.pk, linha._state.adding = None, True
+            try:
+                with transaction.atomic():
+                    linha.save(force_insert=True)
+            except IntegrityError:
+                somadas = cls.objects.filter(mes=linha.mes, escola_id=linha.escola_id,
+                                             tecnico_gre=linha.tecnico_gre).update(
+                    total=models.F('total') + linha.total, pendentes=models.F('pendentes') + linha.pendentes)
+                if not somadas:
+                    raise  # não era a chave repetida (ex: escola inexistente)
+
+    @classmethod
+    def registrar_visita(cls, visita):
+        """Soma uma visita nova do formulário (chamar na mesma transação do save)."""
+        cls.aplicar_diferencas(cls.contar(
+            [(visita.data_visita, visita.escola_id, visita.tecnico_gre, visita.encaminhamento)]))
+
+    @classmethod
+    def registrar_importacao(cls, alteracoes):
+        """
+        Hook `ao_gravar` da importação de visitas (core/importacao.py): recebe o
+        que vai ser gravado, antes das escritas e na mesma transação, e aplica
+        só a diferença. Numa importação completa a tabela de visitas é toda
+        substituída, então o agregado também.
+        """
+        campos = ['data_visita', 'escola_id', 'tecnico_gre', 'encaminhamento']
+        diferencas = defaultdict(lambda: [0, 0])
+
+        def somar(contagem):
+            for chave, (total, pendentes) in contagem.items():
+                diferencas[chave][0] += total
+                diferencas[chave][1] += pendentes
+
+        if alteracoes.tabela_limpa:
+            cls.objects.all().delete()
+        else:
+            # Valores antigos das linhas que vão sair ou mudar (ainda não foram gravadas)
+            ids = list(alteracoes.ids_removidos) + list(alteracoes.ids_alterados)
+            for i in range(0, len(ids), 1000):
+                antigas = VisitaTecnica.objects.filter(pk__in=ids[i:i + 1000]).values_list(*campos)
+                somar(cls.contar(antigas, sinal=-1))
+            if alteracoes.alterados is not None:
+                somar(cls.contar(alteracoes.alterados[campos].itertuples(index=False)))
+        somar(cls.contar(alteracoes.inseridos[campos].itertuples(index=False)))
+        cls.aplicar_diferencas(diferencas)
+
+    @classmethod
+    def recalcular(cls):
+        """Refaz o agregado inteiro a partir de VisitaTecnica (corrige qualquer desvio)."""
+        linhas = (VisitaTecnica.objects
+                  .values('escola_id', mes=TruncMonth('data_visita'), tecnico=Coalesce('tecnico_gre', models.Value('')))
+                  .annotate(n=models.Count('id'), n_pendentes=models.Count('id', filter=RELATORIO_PENDENTE))
+                  .values_list('mes', 'escola_id', 'tecnico', 'n', 'n_pendentes')
+                  .order_by())
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(
+                (cls(mes=mes, escola_id=escola_id, tecnico_gre=tecnico, total=n, pendentes=n_pendentes)
+                 for mes, escola_id, tecnico, n, n_pendentes in linhas.iterator()),
+                batch_size=1000,
+            )
+
+    @classmethod
+    def no_periodo(cls, inicio=None, fim=None, escola_id=None):
+        """Linhas entre os meses `inicio` e `fim` (datas no dia 1; None = sem limite)."""
+        linhas = cls.objects.all()
+        if inicio:
+            linhas = linhas.filter(mes__gte=inicio)
+        if fim:
+            linhas = linhas.filter(mes__lte=fim)
+        if escola_id:
+            linhas = linhas.filter(escola_id=escola_id)
+        return linhas
+
+    @classmethod
+    def por_tecnico(cls, inicio=None, fim=None, escola_id=None):
+        return (cls.no_periodo(inicio, fim, escola_id)
+                   .values('tecnico_gre')
+                   .annotate(total=models.Sum('total'))
+                   .order_by('-total', 'tecnico_gre'))
+
+    @classmethod
+    def por_mes(cls, inicio=None, fim=None, escola_id=None):
+        return (cls.no_periodo(inicio, fim, escola_id)
+                   .filter(mes__isnull=False)
+                   .values('mes')
+                   .annotate(total=models.Sum('total'), pendentes=models.Sum('pendentes'))
+                   .order_by('mes'))
+
+
+# Tarefas em segundo plano (core/tarefas.py): importações, recálculos e
+# exportações pedidos pela interface e executados por `manage.py run_worker`,
+# fora da requisição. O andamento (percentual e mensagem) de uma tarefa em
+# execução fica no cache; aqui ficam o estado final e o histórico.
+class Tarefa(models.Model):
+    PENDENTE, EXECUTANDO, CONCLUIDA, FALHOU, CANCELADA = 'pendente', 'executando', 'concluida', 'falhou', 'cancelada'
+    STATUS_CHOICES = [
+        (PENDENTE, 'Pendente'),
+        (EXECUTANDO, 'Executando'),
+        (CONCLUIDA, 'Concluída'),
+        (FALHOU, 'Falhou'),
+        (CANCELADA, 'Cancelada'),
+    ]
+    STATUS_FINAIS = (CONCLUIDA, FALHOU, CANCELADA)
+
+    tipo = models.CharField(max_length=50)
+    parametros = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDENTE)
+    progresso = models.PositiveSmallIntegerField(default=0)
+    mensagem = models.CharField(max_length=255, blank=True, default='')
+    resultado = models.JSONField(null=True, blank=True)
+    erro = models.TextField(blank=True, default='')
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    max_tentativas = models.PositiveSmallIntegerField(default=3)
+    executar_apos = models.DateTimeField(default=timezone.now)  # adiada entre uma tentativa e outra
+    worker = models.CharField(max_length=100, blank=True, default='')  # 'host:pid' de quem executa
+    criada_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='tarefas')
+    criada_em = models.DateTimeField(auto_now_add=True)
+    iniciada_em = models.DateTimeField(null=True, blank=True)
+    concluida_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-criada_em', '-id']
+        indexes = [
+            # A fila: só as pendentes, na ordem em que o worker as pega
+            models.Index(fields=['executar_apos', 'id'], condition=models.Q(status='pendente'),
+                         name='tarefa_fila_idx'),
+        ]
+
+    def __str__(self):
+        return f"Tarefa #{self.pk} ({self.tipo}) - {self.get_status_display()}"
+
+    @property
+    def finalizada(self):
+        return self.status in self.STATUS_FINAIS
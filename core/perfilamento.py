@@ -0,0 +1,224 @@
+# core/perfilamento.py
+
+# Perfilamento sob demanda de uma requisição, para usuários staff.
+#
+# Com ?perfilar=1 na URL (ou o cabeçalho X-Perfilar: 1), uma requisição para uma
+# view do app core roda sob cProfile (do último middleware para dentro: view,
+# template e os process_view/process_exception dos outros middlewares) e as
+# consultas SQL são anotadas. O resultado vai para
+# settings.PERFIS_DIR: o .prof (pstats, abre no snakeviz) e um .json com URL,
+# usuário, status, tempos e a lista de SQL. Só os últimos PERFIS_MAXIMO ficam;
+# os mais antigos são apagados. As páginas em /admin/perfis/ listam, mostram
+# e baixam os perfis (core/admin.py).
+#
+# Sem o parâmetro/cabeçalho o custo é uma verificação por requisição. O
+# middleware funciona em WSGI e em ASGI; sob ASGI o cProfile vê o event loop
+# inteiro (outras requisições no mesmo loop entram no perfil), e as consultas
+# vêm de observar_sql (core/metricas.py), que alcança as threads do ORM async.
+
+import cProfile
+import io
+import json
+import pstats
+import re
+import tempfile
+import time
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+from .metricas import observar_sql
+
+PARAMETRO = 'perfilar'
+CABECALHO = 'HTTP_X_PERFILAR'
+PERFIS_MAXIMO_PADRAO = 50
+# Guarda no máximo este número de consultas por perfil
+CONSULTAS_MAXIMO = 500
+
+_ID_VALIDO = re.compile(r'^[0-9]{8}_[0-9]{6}_[0-9]{6}_[0-9a-f]{6}$')
+
+
+def pasta_perfis():
+    pasta = getattr(settings, 'PERFIS_DIR', None) or Path(tempfile.gettempdir()) / 'projeto_saepe_perfis'
+    return Path(pasta)
+
+
+def _maximo():
+    return getattr(settings, 'PERFIS_MAXIMO', PERFIS_MAXIMO_PADRAO)
+
+
+class _RegistroSQL:
+    """Observador de SQL (observar_sql) que anota SQL, parâmetros e tempo de cada consulta."""
+
+    def __init__(self):
+        self.consultas = []
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self._lock:
+                self.total += 1
+                if len(self.consultas) < CONSULTAS_MAXIMO:
+                    self.consultas.append({
+                        'sql': sql,
+                        'params': repr(params)[:200],
+                        'ms': round((time.perf_counter() - inicio) * 1000, 3),
+                        'alias': context['connection'].alias,
+                    })
+
+
+class _Sessao:
+    """Um perfil em andamento: cProfile, consultas e tempo de uma requisição."""
+
+    def __init__(self, request, view_func):
+        self.request, self.view_func = request, view_func
+        self.sql = _RegistroSQL()
+        self.perfil = cProfile.Profile()
+        self.inicio = None
+
+    def iniciar(self):
+        try:
+            self.perfil.enable()
+        except ValueError:
+            return False  # outro perfil em andamento (Python 3.12+: um por processo)
+        self.inicio = time.perf_counter()
+        return True
+
+    def parar(self):
+        self.perfil.disable()
+        self.segundos = time.perf_counter() - self.inicio
+
+    def salvar(self, resposta, usuario):
+        resposta['X-Perfil-Id'] = salvar_perfil(self.perfil, {
+            'url': self.request.get_full_path(),
+            'metodo': self.request.method,
+            'view': f'{self.view_func.__module__}.{getattr(self.view_func, "__name__", "?")}',
+            'usuario': usuario.get_username(),
+            'status': resposta.status_code,
+            'ms': round(self.segundos * 1000, 2),
+            'consultas': self.sql.total,
+            'ms_sql': round(sum(c['ms'] for c in self.sql.consultas), 2),
+            'sql': self.sql.consultas,
+        })
+        return resposta
+
+
+class PerfilamentoMiddleware:
+    """Roda a requisição sob cProfile quando um staff pede (deixe por último em MIDDLEWARE)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    # O perfil envolve o get_response, não a view chamada daqui: os
+    # process_view e process_exception dos outros middlewares (e a contagem
+    # de erros das métricas) continuam valendo.
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        view_func = self._view_perfilada(request, request.user) if self._pedido(request) else None
+        sessao = _Sessao(request, view_func) if view_func else None
+        if sessao is None or not sessao.iniciar():
+            return self.get_response(request)
+        try:
+            with observar_sql(sessao.sql):
+                resposta = self.get_response(request)
+        finally:
+            sessao.parar()
+        return sessao.salvar(resposta, request.user)
+
+    async def __acall__(self, request):
+        if not self._pedido(request):
+            return await self.get_response(request)
+        usuario = await request.auser()
+        view_func = self._view_perfilada(request, usuario)
+        sessao = _Sessao(request, view_func) if view_func else None
+        if sessao is None or not sessao.iniciar():
+            return await self.get_response(request)
+        try:
+            with observar_sql(sessao.sql):
+                resposta = await self.get_response(request)
+        finally:
+            sessao.parar()
+        return sessao.salvar(resposta, usuario)
+
+    @staticmethod
+    def _pedido(request):
+        return request.GET.get(PARAMETRO) == '1' or request.META.get(CABECALHO) == '1'
+
+    @staticmethod
+    def _view_perfilada(request, usuario):
+        """A view que atende a requisição, se ela deve ser perfilada; senão None."""
+        if not (usuario.is_authenticated and usuario.is_staff):
+            return None
+        try:
+            view_func = resolve(request.path_info, getattr(request, 'urlconf', None)).func
+        except Resolver404:
+            return None
+        if not getattr(view_func, '__module__', '').startswith('core.'):
+            return None
+        return view_func
+
+
+def salvar_perfil(perfil, dados):
+    """Grava o .prof e o .json do perfil e apaga os excedentes; devolve o id."""
+    pasta = pasta_perfis()
+    pasta.mkdir(parents=True, exist_ok=True)
+    agora = datetime.now()
+    identificador = f'{agora:%Y%m%d_%H%M%S_%f}_{uuid.uuid4().hex[:6]}'
+    perfil.dump_stats(pasta / f'{identificador}.prof')
+    dados = {'id': identificador, 'data': agora.isoformat(timespec='seconds'), **dados}
+    (pasta / f'{identificador}.json').write_text(json.dumps(dados, ensure_ascii=False), encoding='utf-8')
+
+    # Anel: o nome começa pela data, então a ordem alfabética é a cronológica
+    for antigo in sorted(pasta.glob('*.json'))[:-_maximo()]:
+        antigo.unlink(missing_ok=True)
+        antigo.with_suffix('.prof').unlink(missing_ok=True)
+    return identificador
+
+
+def listar_perfis():
+    """Metadados dos perfis guardados, do mais recente para o mais antigo (sem a lista de SQL)."""
+    perfis = []
+    for arquivo in sorted(pasta_perfis().glob('*.json'), reverse=True):
+        try:
+            dados = json.loads(arquivo.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            continue  # apagado ou ainda sendo escrito por outro processo
+        dados.pop('sql', None)
+        perfis.append(dados)
+    return perfis
+
+
+def caminho_perfil(identificador, sufixo):
+    """Caminho do .prof/.json de um perfil, ou None se o id for inválido ou não existir."""
+    if not _ID_VALIDO.match(identificador):
+        return None
+    caminho = pasta_perfis() / f'{identificador}{sufixo}'
+    return caminho if caminho.exists() else None
+
+
+def ler_perfil(identificador, ordem='cumulative', linhas=40):
+    """Metadados completos e o resumo do pstats (as `linhas` funções mais caras)."""
+    caminho = caminho_perfil(identificador, '.json')
+    prof = caminho_perfil(identificador, '.prof')
+    if caminho is None or prof is None:
+        return None
+    dados = json.loads(caminho.read_text(encoding='utf-8'))
+    texto = io.StringIO()
+    pstats.Stats(str(prof), stream=texto).strip_dirs().sort_stats(ordem).print_stats(linhas)
+    dados['estatisticas'] = texto.getvalue()
+    return dados
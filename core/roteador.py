@@ -0,0 +1,124 @@
+# core/roteador.py
+
+# Réplica de leitura para os dashboards.
+#
+# Só as views marcadas com @leitura_replica leem de DATABASES['replica'], e só
+# em GET/HEAD; o resto (escritas, login/sessão, formulários, importações) fica
+# no 'default'. Depois de um POST o cliente recebe um cookie curto
+# (REPLICA_ATRASO_MAXIMO segundos) e, enquanto ele vale, também lê do
+# primário: quem acabou de registrar uma visita a vê na lista em seguida,
+# mesmo que a réplica ainda não tenha recebido a alteração.
+#
+# Ativado em settings.py com SAEPE_REPLICA=1. Localmente a réplica é um
+# segundo arquivo SQLite copiado do primário por `manage.py atualizar_replica`.
+
+import contextvars
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+ALIAS_REPLICA = 'replica'
+COOKIE_PRIMARIO = 'saepe_primario'
+METODOS_LEITURA = ('GET', 'HEAD')
+
+# Contextvars (e não threading.local) para valer também nas views async: o
+# sync_to_async do ORM copia o contexto para a thread que roda a consulta
+_usar_replica = contextvars.ContextVar('saepe_usar_replica', default=False)
+_preso_ao_primario = contextvars.ContextVar('saepe_preso_ao_primario', default=False)
+
+
+def replica_configurada():
+    return ALIAS_REPLICA in settings.DATABASES
+
+
+def _pode_usar_replica(request):
+    return request.method in METODOS_LEITURA and COOKIE_PRIMARIO not in request.COOKIES
+
+
+def leitura_replica(view):
+    """Faz as consultas da view (GET/HEAD) irem para a réplica; use abaixo do @login_required."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def envolvida(request, *args, **kwargs):
+            token = _usar_replica.set(_pode_usar_replica(request))
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _usar_replica.reset(token)
+        return markcoroutinefunction(envolvida)
+
+    @wraps(view)
+    def envolvida(request, *args, **kwargs):
+        token = _usar_replica.set(_pode_usar_replica(request))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _usar_replica.reset(token)
+    return envolvida
+
+
+def alias_leitura():
+    """Banco de onde saem as leituras da requisição atual ('default' ou a réplica)."""
+    if replica_configurada() and _usar_replica.get() and not _preso_ao_primario.get():
+        return ALIAS_REPLICA
+    return 'default'
+
+
+class RoteadorReplica:
+    """Leituras das views @leitura_replica na réplica; todo o resto no primário."""
+
+    def db_for_read(self, model, **hints):
+        return alias_leitura()
+
+    def db_for_write(self, model, **hints):
+        # Uma escrita no meio de uma view de leitura: o resto da requisição
+        # lê do primário para enxergar o que acabou de gravar
+        _preso_ao_primario.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A réplica recebe o esquema junto com os dados (atualizar_replica)
+        return db != ALIAS_REPLICA
+
+
+class ReplicaMiddleware:
+    """Mantém no primário, por REPLICA_ATRASO_MAXIMO segundos, o cliente que acabou de fazer um POST."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_configurada():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.atraso_maximo = getattr(settings, 'REPLICA_ATRASO_MAXIMO', 30)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _preso_ao_primario.set(False)
+        try:
+            resposta = self.get_response(request)
+        finally:
+            _preso_ao_primario.reset(token)
+        return self._marcar_escrita(request, resposta)
+
+    async def __acall__(self, request):
+        token = _preso_ao_primario.set(False)
+        try:
+            resposta = await self.get_response(request)
+        finally:
+            _preso_ao_primario.reset(token)
+        return self._marcar_escrita(request, resposta)
+
+    def _marcar_escrita(self, request, resposta):
+        if request.method not in METODOS_LEITURA + ('OPTIONS',):
+            resposta.set_cookie(COOKIE_PRIMARIO, '1', max_age=self.atraso_maximo, httponly=True, samesite='Lax')
+        return resposta
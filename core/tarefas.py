@@ -0,0 +1,367 @@
+# core/tarefas.py
+
+# Fila de tarefas em segundo plano, guardada no banco (modelo Tarefa).
+#
+# A interface só enfileira (enfileirar) e acompanha (api_tarefa); quem
+# executa é o `manage.py run_worker`, um processo à parte, então uma
+# importação de 100 mil linhas nunca prende um worker web.
+#
+#   - Cada tipo de tarefa é uma função registrada com @tipo_tarefa que recebe
+#     um Andamento e os parâmetros guardados na tarefa.
+#   - O worker pega a próxima pendente com um UPDATE condicional
+#     (status='pendente' -> 'executando'): dois workers nunca pegam a mesma,
+#     sem SELECT ... FOR UPDATE (que o SQLite não tem).
+#   - Andamento e pedido de cancelamento passam pelo cache, não pelo banco:
+#     a importação grava tudo numa transação só, e no SQLite nenhum outro
+#     processo consegue escrever no banco enquanto ela não termina. Por isso o
+#     cache precisa ser compartilhado entre os processos (FileBasedCache, como
+#     em settings.py; com LocMemCache a tela não vê o andamento).
+#   - Uma falha inesperada volta para a fila, com espera dobrando a cada
+#     tentativa, até max_tentativas; ErroTarefa (ex: planilha inválida) falha
+#     de vez. O cancelamento é verificado a cada atualização do andamento e,
+#     no meio de uma importação, desfaz a transação.
+
+import io
+import os
+import shutil
+import socket
+import traceback
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Tarefa
+
+TIPOS = {}
+
+# Uma tarefa em execução some do cache depois disso (worker morto no meio)
+TIMEOUT_ANDAMENTO = 24 * 60 * 60
+
+
+class ErroTarefa(Exception):
+    """Falha que não adianta tentar de novo (entrada inválida)."""
+
+
+class TarefaCancelada(Exception):
+    pass
+
+
+def tipo_tarefa(nome, rotulo, so_staff=True):
+    """Registra a função que executa as tarefas do tipo `nome`."""
+    def registrar(funcao):
+        TIPOS[nome] = {'funcao': funcao, 'rotulo': rotulo, 'so_staff': so_staff}
+        return funcao
+    return registrar
+
+
+def pasta_arquivos():
+    """Planilhas enviadas, CSVs de rejeitados e exportações das tarefas."""
+    pasta = Path(getattr(settings, 'TAREFAS_ARQUIVOS_DIR', settings.BASE_DIR / 'arquivos_tarefas'))
+    pasta.mkdir(parents=True, exist_ok=True)
+    return pasta
+
+
+def _chave_andamento(tarefa_id):
+    return f'saepe:tarefa:{tarefa_id}:andamento'
+
+
+def _chave_cancelar(tarefa_id):
+    return f'saepe:tarefa:{tarefa_id}:cancelar'
+
+
+# ------------------------------------------------------------------------------
+# Lado da interface
+# ------------------------------------------------------------------------------
+
+def enfileirar(tipo, parametros=None, usuario=None, max_tentativas=3):
+    if tipo not in TIPOS:
+        raise ValueError(f'Tipo de tarefa desconhecido: {tipo}')
+    return Tarefa.objects.create(
+        tipo=tipo, parametros=parametros or {}, max_tentativas=max_tentativas,
+        criada_por=usuario if usuario is not None and usuario.is_authenticated else None,
+    )
+
+
+def cancelar(tarefa):
+    """Cancela a tarefa (na fila ou em execução); devolve False se ela já terminou."""
+    tarefa.refresh_from_db(fields=['status'])
+    if tarefa.finalizada:
+        return False
+    # Primeiro o pedido no cache: não espera o lock de escrita que uma
+    # importação em andamento segura no SQLite. O worker o verifica antes de
+    # começar e a cada atualização do andamento.
+    cache.set(_chave_cancelar(tarefa.pk), True, TIMEOUT_ANDAMENTO)
+    if tarefa.status == Tarefa.PENDENTE:
+        if Tarefa.objects.filter(pk=tarefa.pk, status=Tarefa.PENDENTE).update(
+                status=Tarefa.CANCELADA, concluida_em=timezone.now(), mensagem='Cancelada antes de começar'):
+            apagar_envios(tarefa)
+    return True
+
+
+def estado(tarefa):
+    """Dicionário da tarefa para a API de status, com o andamento ao vivo se estiver rodando."""
+    progresso, mensagem = tarefa.progresso, tarefa.mensagem
+    cancelamento_pedido = False
+    if tarefa.status == Tarefa.EXECUTANDO:
+        progresso, mensagem = cache.get(_chave_andamento(tarefa.pk), (progresso, mensagem))
+        cancelamento_pedido = bool(cache.get(_chave_cancelar(tarefa.pk)))
+    return {
+        'id': tarefa.pk,
+        'tipo': tarefa.tipo,
+        'rotulo': TIPOS.get(tarefa.tipo, {}).get('rotulo', tarefa.tipo),
+        'status': tarefa.status,
+        'status_rotulo': tarefa.get_status_display(),
+        'finalizada': tarefa.finalizada,
+        'progresso': progresso,
+        'mensagem': mensagem,
+        'cancelamento_pedido': cancelamento_pedido,
+        'tentativas': tarefa.tentativas,
+        'max_tentativas': tarefa.max_tentativas,
+        'resultado': tarefa.resultado,
+        'erro': tarefa.erro.strip().splitlines()[-1] if tarefa.erro else '',
+        'criada_em': tarefa.criada_em.isoformat() if tarefa.criada_em else None,
+        'iniciada_em': tarefa.iniciada_em.isoformat() if tarefa.iniciada_em else None,
+        'concluida_em': tarefa.concluida_em.isoformat() if tarefa.concluida_em else None,
+    }
+
+
+# ------------------------------------------------------------------------------
+# Lado do worker
+# ------------------------------------------------------------------------------
+
+class Andamento:
+    """Passado às funções das tarefas: andamento(percentual, mensagem) atualiza a tela e verifica o cancelamento."""
+
+    def __init__(self, tarefa, inicio=0, fim=100):
+        self.tarefa = tarefa
+        self.inicio, self.fim = inicio, fim
+
+    def __call__(self, percentual, mensagem=''):
+        if cache.get(_chave_cancelar(self.tarefa.pk)):
+            raise TarefaCancelada
+        percentual = self.inicio + (self.fim - self.inicio) * max(0, min(percentual, 100)) // 100
+        cache.set(_chave_andamento(self.tarefa.pk), (percentual, mensagem[:255]), TIMEOUT_ANDAMENTO)
+
+    def parte(self, inicio, fim):
+        """Andamento de uma etapa: 0-100 da etapa vira inicio-fim desta tarefa."""
+        largura = self.fim - self.inicio
+        return Andamento(self.tarefa, self.inicio + largura * inicio // 100, self.inicio + largura * fim // 100)
+
+
+def identificacao_worker():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def executar_proxima(worker):
+    """Pega e executa a próxima tarefa pendente; devolve a tarefa ou None se a fila está vazia."""
+    agora = timezone.now()
+    candidatas = (Tarefa.objects.filter(status=Tarefa.PENDENTE, executar_apos__lte=agora)
+                  .order_by('executar_apos', 'id').values_list('id', flat=True)[:10])
+    for tarefa_id in candidatas:
+        pegou = Tarefa.objects.filter(pk=tarefa_id, status=Tarefa.PENDENTE).update(
+            status=Tarefa.EXECUTANDO, worker=worker, iniciada_em=agora, concluida_em=None,
+            tentativas=F('tentativas') + 1, progresso=0, mensagem='',
+        )
+        if pegou:  # outro worker pode ter pegado antes
+            tarefa = Tarefa.objects.get(pk=tarefa_id)
+            executar(tarefa)
+            return tarefa
+    return None
+
+
+def executar(tarefa):
+    tipo = TIPOS.get(tarefa.tipo)
+    andamento = Andamento(tarefa)
+    alteracoes = {}
+    try:
+        if tipo is None:
+            raise ErroTarefa(f'Tipo de tarefa desconhecido: {tarefa.tipo}')
+        andamento(0, 'Iniciando')  # cancelada enquanto esperava na fila?
+        resultado = tipo['funcao'](tarefa, andamento, **tarefa.parametros)
+    except TarefaCancelada:
+        alteracoes = {'status': Tarefa.CANCELADA, 'mensagem': 'Cancelada durante a execução',
+                      'concluida_em': timezone.now()}
+    except Exception as e:
+        erro = traceback.format_exc()
+        if not isinstance(e, ErroTarefa) and tarefa.tentativas < tarefa.max_tentativas:
+            espera = getattr(settings, 'TAREFAS_ESPERA_RETENTATIVA', 30) * 2 ** (tarefa.tentativas - 1)
+            alteracoes = {'status': Tarefa.PENDENTE, 'erro': erro,
+                          'executar_apos': timezone.now() + timedelta(seconds=espera),
+                          'mensagem': f'Falhou ({e}); nova tentativa em {espera}s'[:255]}
+        else:
+            alteracoes = {'status': Tarefa.FALHOU, 'erro': erro, 'mensagem': str(e)[:255],
+                          'concluida_em': timezone.now()}
+    else:
+        alteracoes = {'status': Tarefa.CONCLUIDA, 'progresso': 100, 'resultado': resultado,
+                      'mensagem': 'Concluída', 'concluida_em': timezone.now()}
+    finally:
+        if alteracoes.get('status') != Tarefa.CONCLUIDA:
+            # Guarda onde parou (o andamento do cache vai ser apagado)
+            progresso, _ = cache.get(_chave_andamento(tarefa.pk), (tarefa.progresso, ''))
+            alteracoes.setdefault('progresso', progresso)
+        Tarefa.objects.filter(pk=tarefa.pk).update(**alteracoes)
+        cache.delete_many([_chave_andamento(tarefa.pk), _chave_cancelar(tarefa.pk)])
+        if alteracoes.get('status') in Tarefa.STATUS_FINAIS:
+            apagar_envios(tarefa)  # numa nova tentativa as planilhas ainda são necessárias
+    for campo, valor in alteracoes.items():
+        setattr(tarefa, campo, valor)
+    return tarefa
+
+
+def recuperar_orfas():
+    """
+    Devolve à fila as tarefas 'executando' de workers desta máquina que já
+    morreram (o worker foi derrubado no meio). Workers de outras máquinas não
+    são tocados. Devolve quantas foram recuperadas.
+    """
+    host = socket.gethostname()
+    recuperadas = 0
+    for tarefa in Tarefa.objects.filter(status=Tarefa.EXECUTANDO, worker__startswith=f'{host}:'):
+        pid = int(tarefa.worker.rpartition(':')[2] or 0)
+        if pid and _processo_vivo(pid):
+            continue
+        esgotada = tarefa.tentativas >= tarefa.max_tentativas
+        Tarefa.objects.filter(pk=tarefa.pk, status=Tarefa.EXECUTANDO).update(
+            status=Tarefa.FALHOU if esgotada else Tarefa.PENDENTE,
+            mensagem='O worker parou no meio da tarefa',
+            concluida_em=timezone.now() if esgotada else None,
+        )
+        if esgotada:
+            apagar_envios(tarefa)
+        cache.delete_many([_chave_andamento(tarefa.pk), _chave_cancelar(tarefa.pk)])
+        recuperadas += 1
+    return recuperadas
+
+
+def _processo_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # existe, mas é de outro usuário
+    return True
+
+
+# ------------------------------------------------------------------------------
+# Tipos de tarefa
+# ------------------------------------------------------------------------------
+
+def _rodar_comando(nome, *args, **opcoes):
+    """call_command com a saída capturada; o que o comando escreve no stderr vira ErroTarefa."""
+    saida, erros = io.StringIO(), io.StringIO()
+    call_command(nome, *args, stdout=saida, stderr=erros, **opcoes)
+    if erros.getvalue().strip():
+        raise ErroTarefa(erros.getvalue().strip())
+    return saida.getvalue().strip().splitlines()
+
+
+def _importar(comando, tarefa, andamento, caminhos, incremental=False):
+    rejeitados = pasta_arquivos() / f'tarefa_{tarefa.pk}_rejeitados.csv'
+    saida = _rodar_comando(comando, *caminhos, incremental=incremental, rejeitados=str(rejeitados),
+                           progresso=andamento)
+    return {
+        'saida': saida,
+        'rejeitados': rejeitados.name if rejeitados.exists() else None,
+        'nome_rejeitados': f'{comando}_rejeitados.csv',
+    }
+
+
+@tipo_tarefa('importar_visitas', 'Importar visitas técnicas')
+def importar_visitas(tarefa, andamento, caminhos, incremental=False):
+    return _importar('importar_visitas', tarefa, andamento, caminhos, incremental)
+
+
+@tipo_tarefa('importar_ficticio', 'Importar dados das escolas (SAEPE)')
+def importar_ficticio(tarefa, andamento, caminhos, incremental=False):
+    return _importar('importar_ficticio', tarefa, andamento, caminhos, incremental)
+
+
+@tipo_tarefa('recalcular_resumo', 'Recalcular ranking, resumo e agregado mensal')
+def recalcular_resumo(tarefa, andamento):
+    from .cache_dados import invalidar_dados
+    from .models import DadosFicticiosEscola
+
+    andamento(0, 'Recalculando o ranking das escolas')
+    DadosFicticiosEscola.recalcular_posicoes()
+    andamento(30, 'Recalculando o resumo e o agregado mensal')
+    saida = _rodar_comando('recalcular_resumo')
+    invalidar_dados()
+    return {'saida': saida}
+
+
+@tipo_tarefa('aquecer_cache', 'Recalcular os dados dos dashboards (cache)')
+def aquecer_cache(tarefa, andamento):
+    """Deixa no cache o que os dashboards e as APIs pedem sem filtro (depois de uma importação)."""
+    from .indicadores import indicadores_rede
+    from .models import DadosFicticiosEscola
+    from .views import dados_desempenho, dados_grafico_visitas, dados_visitas_por_mes
+
+    etapas = [(f'Desempenho ({metrica})', lambda metrica=metrica: dados_desempenho(None, metrica))
+              for metrica in DadosFicticiosEscola.METRICAS]
+    etapas += [
+        ('Visitas por técnico', dados_grafico_visitas),
+        ('Visitas por mês', dados_visitas_por_mes),
+        ('Indicadores da rede', indicadores_rede),
+    ]
+    for i, (nome, calcular) in enumerate(etapas):
+        andamento(100 * i // len(etapas), nome)
+        calcular()
+    return {'etapas': [nome for nome, _ in etapas]}
+
+
+@tipo_tarefa('exportar', 'Gerar relatório (exportação CSV/XLSX)', so_staff=False)
+def exportar(tarefa, andamento, tabela='visitas', formato='csv', escola=None, tecnico=None,
+             data_inicio=None, data_fim=None):
+    from .exportacao import (COLUNAS_DADOS_ESCOLAS, COLUNAS_VISITAS, dados_escolas_filtrados,
+                             gravar_exportacao, visitas_filtradas)
+
+    if formato not in ('csv', 'xlsx'):
+        raise ErroTarefa(f'Formato inválido: {formato}')
+    if tabela == 'visitas':
+        queryset, colunas = visitas_filtradas(escola, tecnico, data_inicio, data_fim), COLUNAS_VISITAS
+        nome_base = 'visitas_tecnicas'
+    elif tabela == 'dados_escolas':
+        queryset, colunas = dados_escolas_filtrados(escola), COLUNAS_DADOS_ESCOLAS
+        nome_base = 'dados_escolas'
+    else:
+        raise ErroTarefa(f'Tabela inválida: {tabela}')
+
+    nome_arquivo = f'{nome_base}_{timezone.localdate():%Y%m%d}.{formato}'
+    nome = f'tarefa_{tarefa.pk}_{nome_arquivo}'
+    linhas = gravar_exportacao(
+        queryset, colunas, formato, pasta_arquivos() / nome, titulo=nome_base,
+        progresso=lambda feitas, total: andamento(100 * feitas // max(total, 1), f'{feitas} de {total} linhas'),
+    )
+    return {'arquivo': nome, 'nome_arquivo': nome_arquivo, 'linhas': linhas}
+
+
+def _pasta_envios():
+    return pasta_arquivos() / 'envios'
+
+
+def salvar_envios(arquivos):
+    """Grava as planilhas enviadas pelo formulário numa pasta nova; devolve o caminho da pasta."""
+    pasta = _pasta_envios() / uuid.uuid4().hex
+    pasta.mkdir(parents=True)
+    for arquivo in arquivos:
+        # Só o nome, sem diretórios vindos do navegador
+        with open(pasta / Path(arquivo.name).name, 'wb') as destino:
+            for pedaco in arquivo.chunks():
+                destino.write(pedaco)
+    return pasta
+
+
+def apagar_envios(tarefa):
+    """Apaga as pastas de planilhas enviadas de uma tarefa que terminou (só as de salvar_envios)."""
+    envios = _pasta_envios().resolve()
+    for caminho in (tarefa.parametros or {}).get('caminhos', []):
+        pasta = Path(caminho).resolve()
+        if pasta.parent == envios:
+            shutil.rmtree(pasta, ignore_errors=True)
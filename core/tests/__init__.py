@@ -0,0 +1,6 @@
+# core/tests/__init__.py
+
+# Um módulo de testes por parte do sistema (test_importacao.py, test_tarefas.py...).
+
+# Cache só do processo de teste (o do settings é um FileBasedCache compartilhado)
+CACHE_TESTES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from . import CACHE_TESTES
+from ..cache_dados import invalidar_dados
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class ApiDadosAnaliseTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('tecnico', password='senha'))
+        self.url = reverse('api_visitas_por_mes')
+
+    def test_etag_responde_304_enquanto_os_dados_nao_mudam(self):
+        resposta = self.client.get(self.url)
+        self.assertEqual(resposta.status_code, 200)
+        etag = resposta['ETag']
+
+        resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 304)
+        self.assertEqual(resposta.content, b'')
+
+        # Outros parâmetros, outro ETag
+        resposta = self.client.get(self.url, {'inicio': '2025-01'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta['ETag'], etag)
+
+    def test_escrita_troca_o_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        invalidar_dados()
+        resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta['ETag'], etag)
+
+    def test_parametro_invalido_responde_400(self):
+        resposta = self.client.get(self.url, {'inicio': 'março'})
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('erro', resposta.json())
+        self.assertFalse(resposta.has_header('ETag'))
+
+    def test_parametros_desconhecidos_ou_equivalentes_nao_trocam_o_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        for params in ({'_': '1712345678'}, {'metrica': 'lp'}, {'ordem': 'qualquer'}, {'escola': ''}):
+            with self.subTest(params=params):
+                resposta = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(resposta.status_code, 304)
+
+    def test_etag_nao_repete_o_que_o_cliente_mandou(self):
+        etag = self.client.get(self.url, {'inicio': '2025-01', 'x': '"<script>'})['ETag']
+        self.assertNotIn('2025', etag)
+        self.assertNotIn('script', etag)
+
+    def test_sem_login_nao_responde_dados(self):
+        self.client.logout()
+        resposta = self.client.get(self.url)
+        self.assertEqual(resposta.status_code, 302)
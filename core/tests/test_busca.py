@@ -0,0 +1,95 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import busca
+from ..busca import TABELA_BUSCA, buscar_visitas, garantir_indice_busca, montar_consulta_fts
+from ..models import Escola, VisitaTecnica
+
+
+class MontarConsultaTests(TestCase):
+    def test_palavras_entre_aspas_e_prefixo_so_na_ultima(self):
+        self.assertEqual(montar_consulta_fts('falta merend'), '"falta" "merend"*')
+        # Prefixo de uma ou duas letras expandiria demais
+        self.assertEqual(montar_consulta_fts('falta de'), '"falta" "de"')
+
+    def test_operadores_e_aspas_sao_ignorados(self):
+        for texto in ('"', 'merenda OR (', 'NEAR(a b', '-merenda*', 'a:b ^c'):
+            with self.subTest(texto=texto):
+                self.assertNotIn('(', montar_consulta_fts(texto))
+                buscar_visitas(texto)  # não pode dar erro de sintaxe no MATCH
+
+    def test_texto_vazio(self):
+        self.assertEqual(montar_consulta_fts(''), '')
+        self.assertEqual(montar_consulta_fts(None), '')
+        self.assertEqual(buscar_visitas('  !! ').total, 0)
+
+
+class BuscarVisitasTests(TestCase):
+    def setUp(self):
+        self.escola = Escola.objects.create(nome='Escola A')
+        visita = VisitaTecnica.objects.create
+        self.merenda = visita(escola=self.escola, data_visita=datetime.date(2025, 3, 1),
+                              demanda='Falta de merenda', encaminhamento='Merenda reposta; merenda conferida')
+        self.transporte = visita(escola=self.escola, data_visita=datetime.date(2025, 3, 2),
+                                 demanda='Transporte escolar', observacao='Ônibus quebrado, sem merenda extra')
+        self.outra = visita(escola=self.escola, demanda='Reforma do telhado')
+
+    def ids(self, texto):
+        return [r['id'] for r in buscar_visitas(texto).resultados]
+
+    def test_ordena_por_relevancia(self):
+        self.assertEqual(self.ids('merenda'), [self.merenda.pk, self.transporte.pk])
+
+    def test_sem_acento_e_por_prefixo(self):
+        self.assertEqual(self.ids('onibus'), [self.transporte.pk])
+        self.assertEqual(self.ids('transp'), [self.transporte.pk])
+
+    def test_trecho_destacado_e_escapado(self):
+        VisitaTecnica.objects.create(escola=self.escola, demanda='<b>goteira</b> na sala')
+        trecho = buscar_visitas('goteira').resultados[0]['trecho']
+        self.assertIn('<mark>goteira</mark>', trecho)
+        self.assertIn('&lt;b&gt;', trecho)
+
+    def test_triggers_acompanham_as_escritas(self):
+        self.outra.demanda = 'Goteira no telhado'
+        self.outra.save()
+        self.assertEqual(self.ids('goteira'), [self.outra.pk])
+        self.assertEqual(self.ids('reforma'), [])
+
+        VisitaTecnica.objects.bulk_create([VisitaTecnica(escola=self.escola, observacao='goteira de novo')])
+        self.assertEqual(len(self.ids('goteira')), 2)
+
+        VisitaTecnica.objects.filter(pk=self.outra.pk).delete()
+        self.assertNotIn(self.outra.pk, self.ids('goteira'))
+
+    def test_paginacao(self):
+        resultado = buscar_visitas('merenda', pagina=2, por_pagina=1)
+        self.assertEqual((resultado.total, resultado.paginas), (2, 2))
+        self.assertEqual([r['id'] for r in resultado.resultados], [self.transporte.pk])
+
+    def test_recria_triggers_apagados_e_reconstroi(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {TABELA_BUSCA}_ai')
+        nova = VisitaTecnica.objects.create(escola=self.escola, demanda='Goteira')
+        self.assertEqual(self.ids('goteira'), [])
+        self.assertTrue(garantir_indice_busca())
+        self.assertEqual(self.ids('goteira'), [nova.pk])
+        self.assertFalse(garantir_indice_busca())
+
+    def test_sem_fts_cai_no_icontains(self):
+        with mock.patch.object(busca, 'busca_disponivel', return_value=False):
+            resultado = buscar_visitas('MERENDA')
+        self.assertEqual(resultado.total, 2)
+        # Sem ranking: das mais recentes para as mais antigas
+        self.assertEqual([r['id'] for r in resultado.resultados], [self.transporte.pk, self.merenda.pk])
+
+    def test_view(self):
+        self.client.force_login(User.objects.create_user('tecnico', password='senha'))
+        dados = self.client.get(reverse('busca_visitas'), {'q': 'telhado', 'pagina': 'x'}).json()
+        self.assertEqual(dados['total'], 1)
+        self.assertEqual(dados['resultados'][0]['url_perfil'], reverse('perfil_escola', args=[self.escola.pk]))
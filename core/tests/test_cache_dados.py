@@ -0,0 +1,85 @@
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from . import CACHE_TESTES
+from ..cache_dados import chave_cache, invalidar_dados, obter_ou_calcular, versao_dados
+from ..models import DadosFicticiosEscola, Escola
+from ..views import dados_desempenho
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class CacheDadosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calculos = 0
+
+    def calcular(self):
+        self.calculos += 1
+        return {'calculo': self.calculos}
+
+    def test_guarda_ate_a_versao_mudar(self):
+        self.assertEqual(obter_ou_calcular(('teste', 1), self.calcular), {'calculo': 1})
+        self.assertEqual(obter_ou_calcular(('teste', 1), self.calcular), {'calculo': 1})
+        # Outro filtro, outra entrada
+        self.assertEqual(obter_ou_calcular(('teste', 2), self.calcular), {'calculo': 2})
+
+        invalidar_dados()
+        self.assertEqual(obter_ou_calcular(('teste', 1), self.calcular), {'calculo': 3})
+
+    def test_versao_e_estavel_e_troca_a_cada_escrita(self):
+        versao = versao_dados()
+        self.assertEqual(versao_dados(), versao)
+        invalidar_dados()
+        self.assertNotEqual(versao_dados(), versao)
+
+    def test_erro_no_calculo_nao_e_guardado(self):
+        def falhar():
+            raise RuntimeError('banco fora do ar')
+
+        with self.assertRaises(RuntimeError):
+            obter_ou_calcular(('teste',), falhar)
+        self.assertIsNone(cache.get(chave_cache('teste')))
+        self.assertEqual(obter_ou_calcular(('teste',), self.calcular), {'calculo': 1})
+
+    def test_funciona_com_o_cache_em_arquivo(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            em_arquivo = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                                      'LOCATION': pasta}}
+            with self.settings(CACHES=em_arquivo):
+                self.assertEqual(obter_ou_calcular(('teste',), self.calcular), {'calculo': 1})
+                self.assertEqual(obter_ou_calcular(('teste',), self.calcular), {'calculo': 1})
+                invalidar_dados()
+                self.assertEqual(obter_ou_calcular(('teste',), self.calcular), {'calculo': 2})
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class CacheDashboardAnaliseTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        escola = Escola.objects.create(nome='Escola A')
+        DadosFicticiosEscola.objects.create(escola=escola, modalidade='EFAF', proficiencia_lp_2023=250)
+        self.escola = escola
+
+    def test_repeticao_nao_vai_ao_banco(self):
+        primeira = dados_desempenho(None)
+        with self.assertNumQueries(0):
+            self.assertEqual(dados_desempenho(None), primeira)
+
+    def test_importacao_ou_visita_nova_aparecem(self):
+        self.assertEqual(len(dados_desempenho(self.escola.pk)['linhas_tabela']), 1)
+        DadosFicticiosEscola.objects.create(escola=self.escola, modalidade='ENME', proficiencia_lp_2023=260)
+        # Sem invalidar, o valor guardado continua valendo
+        self.assertEqual(len(dados_desempenho(self.escola.pk)['linhas_tabela']), 1)
+        invalidar_dados()
+        self.assertEqual(len(dados_desempenho(self.escola.pk)['linhas_tabela']), 2)
+
+    def test_pagina_usa_o_mesmo_cache(self):
+        self.client.force_login(User.objects.create_user('tecnico', password='senha'))
+        url = reverse('analise_dashboard')
+        self.client.get(url, {'escola': self.escola.pk})
+        with self.assertNumQueries(0):
+            dados_desempenho(self.escola.pk)
@@ -0,0 +1,111 @@
+import datetime
+import os
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from .. import cache_planilhas
+from ..cache_planilhas import carregar_npz, ler_excel_com_cache, podar_cache, salvar_npz
+
+
+class CachePlanilhasTests(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = Path(pasta.name)
+        self.cache = self.pasta / 'cache'
+        self.planilha = self.pasta / 'visitas.xlsx'
+
+    def escrever(self, df):
+        df.to_excel(self.planilha, index=False)
+
+    def test_segunda_leitura_vem_do_cache(self):
+        self.escrever(pd.DataFrame({'ESCOLA': ['A', 'B'], 'NOTA': [1.5, 2.0]}))
+        df, do_cache = ler_excel_com_cache(self.planilha, pasta=self.cache)
+        self.assertFalse(do_cache)
+        with mock.patch.object(pd, 'read_excel', side_effect=AssertionError('leu de novo')):
+            de_novo, do_cache = ler_excel_com_cache(self.planilha, pasta=self.cache)
+        self.assertTrue(do_cache)
+        pd.testing.assert_frame_equal(de_novo, df)
+
+    def test_planilha_alterada_e_lida_de_novo(self):
+        self.escrever(pd.DataFrame({'ESCOLA': ['A']}))
+        ler_excel_com_cache(self.planilha, pasta=self.cache)
+        # Mesmo nome, outro conteúdo
+        self.escrever(pd.DataFrame({'ESCOLA': ['A', 'B']}))
+        df, do_cache = ler_excel_com_cache(self.planilha, pasta=self.cache)
+        self.assertFalse(do_cache)
+        self.assertEqual(df['ESCOLA'].tolist(), ['A', 'B'])
+
+    def test_sem_pasta_le_direto(self):
+        self.escrever(pd.DataFrame({'ESCOLA': ['A']}))
+        self.assertFalse(ler_excel_com_cache(self.planilha)[1])
+        self.assertFalse(self.cache.exists())
+
+    def test_colunas_object_voltam_iguais(self):
+        df = pd.DataFrame({
+            'misturada': pd.Series(['texto', 7, 2.5, None, True, datetime.datetime(2025, 3, 1, 8, 30)], dtype=object),
+            'inteiros': np.arange(6, dtype=np.int64),
+            'datas': pd.date_range('2025-01-01', periods=6),
+        })
+        destino = self.cache / 'teste.npz'
+        salvar_npz(df, destino)
+        volta = carregar_npz(destino)
+        self.assertEqual(volta['misturada'].tolist()[:3], ['texto', 7, 2.5])
+        self.assertTrue(np.isnan(volta['misturada'][3]))
+        self.assertIs(volta['misturada'][4], True)
+        self.assertEqual(volta['misturada'][5], pd.Timestamp(2025, 3, 1, 8, 30))
+        pd.testing.assert_series_equal(volta['inteiros'], df['inteiros'])
+        pd.testing.assert_series_equal(volta['datas'], df['datas'], check_freq=False)
+
+    def test_tipo_sem_suporte_nao_e_guardado(self):
+        df = pd.DataFrame({'HORA': pd.Series([datetime.time(8, 30)], dtype=object)})
+        with self.assertRaises(TypeError):
+            salvar_npz(df, self.cache / 'teste.npz')
+        self.assertFalse((self.cache / 'teste.npz').exists())
+
+    def test_falha_ao_gravar_so_nao_guarda(self):
+        self.escrever(pd.DataFrame({'ESCOLA': ['A']}))
+        with mock.patch.object(cache_planilhas, 'salvar_npz', side_effect=PermissionError('somente leitura')):
+            with self.assertLogs('core.cache_planilhas', 'WARNING'):
+                df, do_cache = ler_excel_com_cache(self.planilha, pasta=self.cache)
+        self.assertEqual((df['ESCOLA'].tolist(), do_cache), (['A'], False))
+
+    def test_cache_ilegivel_e_refeito(self):
+        self.escrever(pd.DataFrame({'ESCOLA': ['A']}))
+        ler_excel_com_cache(self.planilha, pasta=self.cache)
+        (arquivo,) = self.cache.glob('*.npz')
+        arquivo.write_bytes(b'lixo')
+        with self.assertLogs('core.cache_planilhas', 'WARNING'):
+            df, do_cache = ler_excel_com_cache(self.planilha, pasta=self.cache)
+        self.assertFalse(do_cache)
+        self.assertTrue(ler_excel_com_cache(self.planilha, pasta=self.cache)[1])
+
+    def test_poda_mantem_os_mais_usados(self):
+        self.cache.mkdir()
+        agora = time.time()
+        for i in range(5):
+            arquivo = self.cache / f'{i}.npz'
+            arquivo.write_bytes(b'')
+            os.utime(arquivo, (agora - 100 * i, agora - 100 * i))
+        orfao, recente = self.cache / 'a.npz.tmp', self.cache / 'b.npz.tmp'
+        orfao.write_bytes(b'')
+        recente.write_bytes(b'')
+        velho = agora - cache_planilhas.IDADE_TEMPORARIO_ORFAO - 1
+        os.utime(orfao, (velho, velho))
+
+        podar_cache(self.cache, manter=2)
+        self.assertEqual(sorted(p.name for p in self.cache.iterdir()), ['0.npz', '1.npz', 'b.npz.tmp'])
+
+    def test_leitura_do_cache_renova_o_arquivo(self):
+        self.escrever(pd.DataFrame({'ESCOLA': ['A']}))
+        ler_excel_com_cache(self.planilha, pasta=self.cache)
+        (arquivo,) = self.cache.glob('*.npz')
+        os.utime(arquivo, (0, 0))
+        ler_excel_com_cache(self.planilha, pasta=self.cache)
+        self.assertGreater(arquivo.stat().st_mtime, 0)
@@ -0,0 +1,56 @@
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+from django.test import TestCase, override_settings
+
+from . import CACHE_TESTES
+from ..dados_sinteticos import Escala, GeradorSintetico, escrever_planilhas, gravar_no_banco
+from ..importacao import importar_incremental, ler_planilhas
+from ..management.commands.importar_ficticio import COLUNAS as COLUNAS_DADOS
+from ..management.commands.importar_visitas import COLUNAS as COLUNAS_VISITAS
+from ..models import DadosFicticiosEscola, Escola, Relatorio, Visita, VisitaTecnica
+
+ESCALA = Escala(escolas=20, visitas=120, visitas_agendadas=10, relatorios=8, tecnicos_por_gre=2)
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class GeradorSinteticoTests(TestCase):
+    def test_mesma_semente_gera_os_mesmos_dados(self):
+        um, outro = GeradorSintetico(ESCALA), GeradorSintetico(ESCALA)
+        pd.testing.assert_frame_equal(um.dados_escolas(), outro.dados_escolas())
+        for (gre_a, lote_a), (gre_b, lote_b) in zip(um.todos_lotes_visitas(50), outro.todos_lotes_visitas(50)):
+            self.assertEqual(gre_a, gre_b)
+            pd.testing.assert_frame_equal(lote_a, lote_b)
+
+    def test_modalidade_nao_se_repete_na_mesma_escola(self):
+        dados = GeradorSintetico(ESCALA).dados_escolas()
+        self.assertFalse(dados.duplicated(['ESCOLA', 'MODALIDADE']).any())
+
+    def test_grava_as_quantidades_da_escala(self):
+        contagem = gravar_no_banco(GeradorSintetico(ESCALA), COLUNAS_VISITAS, COLUNAS_DADOS, tamanho_lote=50)
+        self.assertEqual(contagem['escolas'], Escola.objects.count())
+        self.assertEqual(contagem['dados_escolas'], DadosFicticiosEscola.objects.count())
+        self.assertEqual(contagem['visitas_tecnicas'], VisitaTecnica.objects.count())
+        self.assertEqual(Visita.objects.count(), ESCALA.visitas_agendadas)
+        self.assertEqual(Relatorio.objects.count(), ESCALA.relatorios)
+        # Visitas sem data ou sem escola seriam rejeitadas: quase todas entram
+        self.assertGreaterEqual(contagem['visitas_tecnicas'], ESCALA.visitas * 0.95)
+
+    def test_planilhas_batem_com_o_banco(self):
+        gravar_no_banco(GeradorSintetico(ESCALA), COLUNAS_VISITAS, COLUNAS_DADOS, tamanho_lote=50)
+        with tempfile.TemporaryDirectory() as pasta:
+            escrever_planilhas(GeradorSintetico(ESCALA), pasta, tamanho_lote=50)
+            visitas = ler_planilhas(sorted(Path(pasta, 'visitas').iterdir()), COLUNAS_VISITAS, processos=1)
+            resultado = importar_incremental(VisitaTecnica, visitas, COLUNAS_VISITAS, VisitaTecnica.CHAVE_IMPORTACAO)
+
+        # Reimportar o que foi gerado não muda nada
+        self.assertEqual((resultado.inseridos, resultado.atualizados, resultado.removidos), (0, 0, 0))
+        self.assertEqual(resultado.inalterados, VisitaTecnica.objects.count())
+
+    def test_gre_sem_visitas_tem_planilha_so_com_cabecalho(self):
+        gerador = GeradorSintetico(Escala(escolas=3, visitas=0, visitas_agendadas=0, relatorios=0))
+        with tempfile.TemporaryDirectory() as pasta:
+            escritos = escrever_planilhas(gerador, pasta)
+            visitas = ler_planilhas(escritos[1:], COLUNAS_VISITAS, processos=1)
+        self.assertTrue(visitas.empty)
@@ -0,0 +1,89 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from . import CACHE_TESTES
+from ..models import DadosFicticiosEscola, Escola
+
+ANTES = [('core', '0005_dadosficticiosescola_hash_linha_and_more')]
+DEPOIS = [('core', '0006_escola_dimensao')]
+
+
+class MigracaoEscolaTests(TransactionTestCase):
+    """0006: o nome da escola (texto) vira chave estrangeira para Escola."""
+
+    def migrar(self, alvo):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(alvo)
+        return executor.loader.project_state(alvo).apps
+
+    def tearDown(self):
+        self.migrar(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_preenche_a_chave_a_partir_dos_nomes(self):
+        apps = self.migrar(ANTES)
+        apps.get_model('core', 'Escola').objects.create(nome='Escola A', cidade='Recife')
+        VisitaTecnica = apps.get_model('core', 'VisitaTecnica')
+        VisitaTecnica.objects.create(escola='Escola A', data_visita=datetime.date(2025, 3, 10))
+        VisitaTecnica.objects.create(escola='Escola B')
+        apps.get_model('core', 'DadosFicticiosEscola').objects.create(escola='Escola B', modalidade='EFAF')
+
+        apps = self.migrar(DEPOIS)
+        Escola = apps.get_model('core', 'Escola')
+        # A escola que já existia é aproveitada; a que faltava é criada uma vez só
+        self.assertEqual(sorted(Escola.objects.values_list('nome', 'cidade')),
+                         [('Escola A', 'Recife'), ('Escola B', '')])
+        ids = dict(Escola.objects.values_list('nome', 'id'))
+        self.assertEqual(
+            sorted(apps.get_model('core', 'VisitaTecnica').objects.values_list('escola_id', flat=True)),
+            sorted([ids['Escola A'], ids['Escola B']]),
+        )
+        self.assertEqual(apps.get_model('core', 'DadosFicticiosEscola').objects.get().escola_id, ids['Escola B'])
+
+    def test_desfazer_devolve_os_nomes(self):
+        apps = self.migrar(DEPOIS)
+        escola = apps.get_model('core', 'Escola').objects.create(nome='Escola A')
+        apps.get_model('core', 'VisitaTecnica').objects.create(escola_id=escola.pk)
+
+        apps = self.migrar(ANTES)
+        self.assertEqual(list(apps.get_model('core', 'VisitaTecnica').objects.values_list('escola', flat=True)),
+                         ['Escola A'])
+
+
+class ResolverIdsTests(TestCase):
+    def test_uma_escola_por_nome(self):
+        existente = Escola.objects.create(nome='Escola A')
+        ids = Escola.resolver_ids(['Escola A', 'Escola B', 'Escola B'])
+        self.assertEqual(ids['Escola A'], existente.pk)
+        self.assertEqual(Escola.objects.filter(nome='Escola B').count(), 1)
+        # Segunda chamada não cria nada
+        self.assertEqual(Escola.resolver_ids(['Escola B']), {'Escola B': ids['Escola B']})
+        self.assertEqual(Escola.objects.count(), 2)
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class PerfilEscolaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('tecnico', password='senha'))
+        self.escola = Escola.objects.create(nome='Escola A')
+
+    def test_mostra_todas_as_modalidades(self):
+        for modalidade, alunos in (('EFAF', 120), ('ENME', 95)):
+            DadosFicticiosEscola.objects.create(escola=self.escola, modalidade=modalidade,
+                                                alunos_previstos_2023=alunos)
+        resposta = self.client.get(reverse('perfil_escola', args=[self.escola.pk]))
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.context['escola'], self.escola)
+        self.assertEqual([d.modalidade for d in resposta.context['dados_modalidades']], ['EFAF', 'ENME'])
+        self.assertContains(resposta, '95')
+
+    def test_escola_sem_dados_volta_ao_dashboard(self):
+        resposta = self.client.get(reverse('perfil_escola', args=[self.escola.pk]))
+        self.assertRedirects(resposta, reverse('analise_dashboard'), fetch_redirect_response=False)
@@ -0,0 +1,116 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from . import CACHE_TESTES
+from ..cache_dados import CHAVE_VERSAO, invalidar_dados
+from ..escolhas import ESCOLAS, TECNICOS, ProvedorEscolhas, invalidar_escolhas
+from ..forms import VisitaTecnicaForm
+from ..models import DadosFicticiosEscola, Escola, VisitaTecnica
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class ProvedorEscolhasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidar_escolhas()
+        self.addCleanup(invalidar_escolhas)
+        self.escola = Escola.objects.create(nome='Escola A')
+        DadosFicticiosEscola.objects.create(escola=self.escola, modalidade='EFAF')
+        VisitaTecnica.objects.create(escola=self.escola, tecnico_gre='Ana')
+
+    def test_consulta_uma_vez_e_guarda(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(ESCOLAS.lista(), [(self.escola.pk, 'Escola A')])
+            self.assertEqual(TECNICOS.lista(), [('Ana', 'Ana')])
+        with self.assertNumQueries(0):
+            self.assertEqual(ESCOLAS.lista(), [(self.escola.pk, 'Escola A')])
+            VisitaTecnicaForm().as_p()
+
+    def test_invalidar_refaz_a_lista(self):
+        self.assertEqual(TECNICOS.lista(), [('Ana', 'Ana')])
+        VisitaTecnica.objects.create(escola=self.escola, tecnico_gre='Bruno')
+        self.assertEqual(TECNICOS.lista(), [('Ana', 'Ana')])
+        invalidar_escolhas()
+        self.assertEqual(TECNICOS.lista(), [('Ana', 'Ana'), ('Bruno', 'Bruno')])
+
+    def test_escrita_de_outro_processo_troca_a_versao(self):
+        ESCOLAS.lista()
+        outra = Escola.objects.create(nome='Escola B')
+        DadosFicticiosEscola.objects.create(escola=outra, modalidade='EFAF')
+        # Um comando de importação em outro processo só troca a versão dos dados
+        invalidar_dados()
+        self.assertEqual([nome for _, nome in ESCOLAS.lista()], ['Escola A', 'Escola B'])
+
+    def test_banco_sem_tabela_devolve_lista_vazia_sem_guardar(self):
+        consultas = []
+
+        def consulta():
+            consultas.append(1)
+            if len(consultas) == 1:
+                raise DatabaseError('no such table: core_dadosficticiosescola')
+            return [(1, 'Escola A')]
+
+        provedor = ProvedorEscolhas(consulta)
+        self.assertEqual(provedor.lista(), [])
+        self.assertEqual(provedor.lista(), [(1, 'Escola A')])
+        self.assertEqual(provedor.lista(), [(1, 'Escola A')])
+        self.assertEqual(len(consultas), 2)
+
+    def test_opcao_vazia_depois_de_invalidar(self):
+        opcoes = ESCOLAS.com_opcao_vazia('Selecione...')
+        opcoes()
+        ESCOLAS.invalidar()
+        self.assertEqual(opcoes(), [('', 'Selecione...'), (self.escola.pk, 'Escola A')])
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class FormularioVisitaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidar_escolhas()
+        self.addCleanup(invalidar_escolhas)
+        self.escola = Escola.objects.create(nome='Escola A')
+        DadosFicticiosEscola.objects.create(escola=self.escola, modalidade='EFAF')
+        VisitaTecnica.objects.create(escola=self.escola, tecnico_gre='Ana')
+
+    def dados(self, **extra):
+        return {'escola': self.escola.pk, 'tecnico_gre': 'Ana', 'servidor_escola': 'Diretora',
+                'demanda': 'merenda', **extra}
+
+    def test_escola_apagada_depois_de_montar_a_lista(self):
+        ESCOLAS.lista()
+        DadosFicticiosEscola.objects.all().delete()
+        Escola.objects.filter(pk=self.escola.pk).delete()
+        # A lista guardada ainda tem a escola, mas ela não existe mais
+        form = VisitaTecnicaForm(self.dados())
+        self.assertFalse(form.is_valid())
+        self.assertIn('escola', form.errors)
+
+    def test_salvar_invalida_as_listas(self):
+        self.assertEqual(TECNICOS.lista(), [('Ana', 'Ana')])
+        VisitaTecnica.objects.create(escola=self.escola, tecnico_gre='Bruno')
+        form = VisitaTecnicaForm(self.dados())
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        self.assertEqual(TECNICOS.lista(), [('Ana', 'Ana'), ('Bruno', 'Bruno')])
+
+    def test_versao_dos_dados_lida_uma_vez_por_requisicao(self):
+        self.client.force_login(User.objects.create_user('tecnico', password='senha'))
+        leituras = []
+        ler = cache.get
+
+        def contar(chave, *args, **kwargs):
+            if chave == CHAVE_VERSAO:
+                leituras.append(chave)
+            return ler(chave, *args, **kwargs)
+
+        self.client.get(reverse('visitas'))  # cria o token
+        with mock.patch.object(cache, 'get', contar):
+            # Dois dropdowns do formulário, cada um confere a versão
+            self.assertEqual(self.client.get(reverse('visitas')).status_code, 200)
+        self.assertEqual(len(leituras), 1)
@@ -0,0 +1,111 @@
+import csv
+import datetime
+import io
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from openpyxl import load_workbook
+
+from .. import exportacao
+from ..exportacao import (
+    COLUNAS_DADOS_ESCOLAS, COLUNAS_VISITAS, gravar_exportacao, visitas_filtradas,
+)
+from ..models import DadosFicticiosEscola, Escola, VisitaTecnica
+
+
+class ExportacaoTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('tecnico', password='senha'))
+        self.a = Escola.objects.create(nome='Escola Ângelo')
+        self.b = Escola.objects.create(nome='Escola B')
+        VisitaTecnica.objects.create(escola=self.a, data_visita=datetime.date(2025, 3, 1), tecnico_gre='Ana',
+                                     demanda='=HYPERLINK("http://x","clique")', encaminhamento='-1+2',
+                                     observacao='Sem problemas')
+        VisitaTecnica.objects.create(escola=self.b, data_visita=datetime.date(2025, 4, 1), tecnico_gre='Bruno',
+                                     demanda='merenda')
+        DadosFicticiosEscola.objects.create(escola=self.a, modalidade='EFAF', saepe_2023=4.5)
+
+    def baixar_csv(self, url, **params):
+        resposta = self.client.get(reverse(url), params)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(resposta.streaming)
+        self.assertIn('attachment;', resposta['Content-Disposition'])
+        conteudo = b''.join(resposta.streaming_content).decode('utf-8')
+        self.assertTrue(conteudo.startswith('\ufeff'))
+        return list(csv.reader(io.StringIO(conteudo[1:])))
+
+    def baixar_xlsx(self, url, **params):
+        resposta = self.client.get(reverse(url), {'formato': 'xlsx', **params})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta['Content-Type'], exportacao.FORMATOS['xlsx'])
+        planilha = load_workbook(io.BytesIO(b''.join(resposta.streaming_content))).active
+        return planilha
+
+    def test_csv_com_cabecalho_da_importacao(self):
+        linhas = self.baixar_csv('exportar_visitas')
+        self.assertEqual(linhas[0], [cabecalho for cabecalho, _ in COLUNAS_VISITAS])
+        self.assertEqual([linha[0] for linha in linhas[1:]], ['Escola Ângelo', 'Escola B'])
+        self.assertEqual(linhas[1][1], '2025-03-01')
+
+    def test_csv_nao_deixa_texto_virar_formula(self):
+        linha = self.baixar_csv('exportar_visitas')[1]
+        self.assertEqual(linha[4], '\'=HYPERLINK("http://x","clique")')
+        self.assertEqual(linha[5], "'-1+2")
+        self.assertEqual(linha[6], 'Sem problemas')
+
+    def test_xlsx_grava_formula_como_texto(self):
+        planilha = self.baixar_xlsx('exportar_visitas')
+        linhas = list(planilha.iter_rows(values_only=True))
+        self.assertEqual(list(linhas[0]), [cabecalho for cabecalho, _ in COLUNAS_VISITAS])
+        celula = planilha.cell(row=2, column=5)
+        self.assertEqual(celula.value, '=HYPERLINK("http://x","clique")')
+        self.assertEqual(celula.data_type, 's')
+        self.assertEqual(planilha.cell(row=2, column=6).value, '-1+2')
+
+    def test_filtros(self):
+        filtradas = visitas_filtradas(tecnico='Bruno', data_inicio=datetime.date(2025, 3, 15))
+        self.assertEqual([v.escola_id for v in filtradas], [self.b.pk])
+        linhas = self.baixar_csv('exportar_visitas', escola=self.a.pk)
+        self.assertEqual(len(linhas), 2)
+        linhas = self.baixar_csv('exportar_dados_escolas')
+        self.assertEqual(linhas[0], [cabecalho for cabecalho, _ in COLUNAS_DADOS_ESCOLAS])
+        self.assertEqual(linhas[1][:2], ['Escola Ângelo', 'EFAF'])
+
+    def test_filtros_invalidos(self):
+        for params in ({'formato': 'pdf'}, {'data_inicio': '2025-05-01', 'data_fim': '2025-01-01'}):
+            with self.subTest(params=params):
+                resposta = self.client.get(reverse('exportar_visitas'), params)
+                self.assertEqual(resposta.status_code, 400)
+                self.assertIn('erro', resposta.json())
+
+    def test_le_o_banco_em_lotes(self):
+        VisitaTecnica.objects.bulk_create([VisitaTecnica(escola=self.b, demanda=f'd{i}') for i in range(5)])
+        original = exportacao.TAMANHO_LOTE_EXPORTACAO
+        exportacao.TAMANHO_LOTE_EXPORTACAO = 2
+        self.addCleanup(setattr, exportacao, 'TAMANHO_LOTE_EXPORTACAO', original)
+        self.assertEqual(len(self.baixar_csv('exportar_visitas')), 8)
+
+    def test_gravar_exportacao(self):
+        chamadas = []
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'visitas.csv')
+            total = gravar_exportacao(visitas_filtradas(), COLUNAS_VISITAS, 'csv', caminho,
+                                      progresso=lambda feitas, total: chamadas.append((feitas, total)))
+            with open(caminho, encoding='utf-8-sig', newline='') as arquivo:
+                linhas = list(csv.reader(arquivo))
+
+            caminho_xlsx = os.path.join(pasta, 'visitas.xlsx')
+            gravar_exportacao(visitas_filtradas(), COLUNAS_VISITAS, 'xlsx', caminho_xlsx)
+            celula = load_workbook(caminho_xlsx).active.cell(row=2, column=5)
+
+        self.assertEqual(total, 2)
+        self.assertEqual(chamadas[-1], (2, 2))
+        self.assertEqual(linhas[1][4], '\'=HYPERLINK("http://x","clique")')
+        self.assertEqual((celula.value, celula.data_type), ('=HYPERLINK("http://x","clique")', 's'))
+
+    def test_sem_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('exportar_visitas')).status_code, 302)
@@ -0,0 +1,67 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Escola, VisitaTecnica
+from ..views import historico_visitas
+
+
+class HistoricoVisitasTests(TestCase):
+    def setUp(self):
+        self.escola = Escola.objects.create(nome='Escola A')
+        datas = [datetime.date(2025, 3, 10), datetime.date(2025, 3, 10), datetime.date(2025, 3, 10),
+                 datetime.date(2025, 2, 1), None, None, datetime.date(2025, 4, 5)]
+        for data in datas:
+            VisitaTecnica.objects.create(escola=self.escola, data_visita=data, tecnico_gre='Ana')
+        # Outra escola não aparece no histórico
+        VisitaTecnica.objects.create(escola=Escola.objects.create(nome='Escola B'),
+                                     data_visita=datetime.date(2025, 3, 10))
+
+    def esperado(self):
+        visitas = list(VisitaTecnica.objects.filter(escola=self.escola).values_list('id', 'data_visita'))
+        com_data = sorted((v for v in visitas if v[1]), key=lambda v: (v[1], v[0]), reverse=True)
+        sem_data = sorted((v for v in visitas if not v[1]), reverse=True)
+        return [pk for pk, _ in com_data + sem_data]
+
+    def paginas(self, limite):
+        ids, cursor, paginas = [], None, 0
+        while True:
+            pagina, cursor = historico_visitas(self.escola.pk, cursor, limite)
+            paginas += 1
+            self.assertLessEqual(len(pagina), limite)
+            ids += [visita['id'] for visita in pagina]
+            if cursor is None:
+                return ids, paginas
+
+    def test_percorre_todas_as_visitas_na_ordem(self):
+        for limite in (1, 2, 3, 4, 6, 7, 20):
+            with self.subTest(limite=limite):
+                ids, paginas = self.paginas(limite)
+                self.assertEqual(ids, self.esperado())
+                # Sem página vazia no fim quando o total é múltiplo do limite
+                self.assertEqual(paginas, -(-len(ids) // limite))
+
+    def test_cursor_na_ultima_visita_com_data_continua_nas_sem_data(self):
+        esperado = self.esperado()
+        pagina, cursor = historico_visitas(self.escola.pk, limite=5)
+        self.assertEqual([v['id'] for v in pagina], esperado[:5])
+        self.assertEqual(cursor.partition('_')[0], '2025-02-01')
+        pagina, cursor = historico_visitas(self.escola.pk, cursor, limite=5)
+        self.assertEqual([v['id'] for v in pagina], esperado[5:])
+        self.assertIsNone(cursor)
+
+    def test_cursor_invalido(self):
+        with self.assertRaises(ValueError):
+            historico_visitas(self.escola.pk, 'ontem_x')
+
+    def test_view_carregar_mais(self):
+        self.client.force_login(User.objects.create_user('tecnico', password='senha'))
+        url = reverse('historico_visitas', args=[self.escola.pk])
+        dados = self.client.get(url).json()
+        self.assertEqual(len(dados['visitas']), 7)
+        self.assertEqual(dados['visitas'][0]['data_visita'], '05/04/2025')
+        self.assertEqual(dados['visitas'][-1]['data_visita'], '')
+        self.assertIsNone(dados['proximo'])
+        self.assertEqual(self.client.get(url, {'depois': 'ontem_x'}).status_code, 400)
@@ -0,0 +1,213 @@
+import datetime
+import os
+import tempfile
+
+import pandas as pd
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from . import CACHE_TESTES
+from ..importacao import converter_dataframe, importar_dataframe, importar_incremental
+from ..management.commands.importar_ficticio import COLUNAS as COLUNAS_DADOS
+from ..management.commands.importar_visitas import COLUNAS
+from ..models import DadosFicticiosEscola, Escola, VisitaMensal, VisitaTecnica
+
+
+def planilha_visitas(linhas):
+    """DataFrame como o lido do Excel: (escola, data, técnico, demanda, encaminhamento)."""
+    return pd.DataFrame([
+        {'Escola': escola, 'Data da Visita': data, 'Técnico/Analista - GRE': tecnico,
+         'Servidor da Escola': 'Diretora', 'Demanda': demanda, 'Encaminhamento': encaminhamento,
+         'Observação': None}
+        for escola, data, tecnico, demanda, encaminhamento in linhas
+    ])
+
+
+def planilha_dados(linhas):
+    """DataFrame da planilha de acompanhamento: (escola, modalidade, alunos, SAEPE 2022)."""
+    return pd.DataFrame([
+        {'ESCOLA': escola, 'MODALIDADE': modalidade, 'ALUNOS PREVISTOS SAEPE 2023': alunos, '% PESO': None,
+         'SAEPE 2022': saepe, 'SAEPE 2023': None, 'PROFICIÊNCIA LP SAEPE 2023': None,
+         'PROFICIÊNCIA MT SAEPE 2023': None, 'MATRÍCULA EFAF 2024': None}
+        for escola, modalidade, alunos, saepe in linhas
+    ])
+
+
+def agregado_mensal():
+    return sorted(VisitaMensal.objects.values_list('mes', 'escola_id', 'tecnico_gre', 'total', 'pendentes'),
+                  key=str)
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class ConversaoTests(TestCase):
+    def test_tipos_das_colunas(self):
+        df = planilha_visitas([
+            (' Escola A ', '10/03/2025', 'Ana', 'merenda', ''),
+            ('Escola A', datetime.datetime(2025, 3, 11, 0, 0), None, None, 'ok'),
+        ])
+        dados, motivos = converter_dataframe(VisitaTecnica, df, COLUNAS)
+
+        self.assertTrue(motivos.isna().all())
+        escola = Escola.objects.get(nome='Escola A')  # espaços das pontas removidos, uma escola só
+        self.assertEqual(list(dados['escola_id']), [escola.pk, escola.pk])
+        self.assertEqual(list(dados['data_visita']), [datetime.date(2025, 3, 10), datetime.date(2025, 3, 11)])
+        # Texto vazio vira nulo (relatório pendente)
+        self.assertTrue(pd.isna(dados['encaminhamento'].iloc[0]))
+
+    def test_numeros_da_planilha_de_acompanhamento(self):
+        dados, motivos = converter_dataframe(DadosFicticiosEscola, planilha_dados([
+            ('Escola A', 'EFAF', '120', 4.5),
+            ('Escola B', 'EFAF', 80.0, ' 4.6'),
+        ]), COLUNAS_DADOS)
+        self.assertTrue(motivos.isna().all())
+        self.assertEqual(list(dados['alunos_previstos_2023']), [120, 80])
+        self.assertEqual(dados['saepe_2022'].iloc[0], 4.5)
+
+    def test_linhas_rejeitadas_e_o_motivo(self):
+        df = planilha_dados([
+            ('Escola A', 'EFAF', 120, 4.5),
+            ('Escola B', 'EFAF', 3.5, 4.0),       # inteiro com casas decimais
+            ('Escola C', 'EFAF', 'muitos', 4.0),  # texto num campo numérico
+            (None, 'EFAF', 100, 4.0),             # escola é obrigatória
+            ('Escola D', 'x' * 101, 100, 4.0),    # maior que o max_length
+        ])
+        dados, motivos = converter_dataframe(DadosFicticiosEscola, df, COLUNAS_DADOS)
+        self.assertEqual(motivos.fillna('').tolist(), [
+            '',
+            "valor inválido em 'ALUNOS PREVISTOS SAEPE 2023'",
+            "valor inválido em 'ALUNOS PREVISTOS SAEPE 2023'",
+            "'ESCOLA' é obrigatório",
+            "valor inválido em 'MODALIDADE'",
+        ])
+
+    def test_data_que_nao_e_data_e_rejeitada(self):
+        _, motivos = converter_dataframe(VisitaTecnica, planilha_visitas([
+            ('Escola A', 'semana que vem', 'Ana', None, None),
+            ('Escola A', None, 'Ana', None, None),  # sem data é permitido
+        ]), COLUNAS)
+        self.assertEqual(motivos.fillna('').tolist(), ["valor inválido em 'Data da Visita'", ''])
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class ImportacaoCompletaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_grava_as_validas_e_salva_as_rejeitadas(self):
+        df = planilha_visitas([
+            ('Escola A', '10/03/2025', 'Ana', 'merenda', None),
+            ('Escola A', '31/02/2025', 'Ana', 'data impossível', None),
+            ('Escola B', '11/03/2025', 'Bruno', 'reforma', 'agendado'),
+        ])
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'rejeitadas.csv')
+            resultado = importar_dataframe(VisitaTecnica, df, COLUNAS, batch_size=1, caminho_rejeitados=caminho)
+            rejeitadas = pd.read_csv(caminho, encoding='utf-8-sig')
+
+        self.assertEqual((resultado.total, resultado.inseridos, resultado.rejeitados), (3, 2, 1))
+        self.assertEqual(VisitaTecnica.objects.count(), 2)
+        self.assertEqual(list(rejeitadas['linha_excel']), [3])
+        self.assertEqual(list(rejeitadas['motivo']), ["valor inválido em 'Data da Visita'"])
+
+    def test_substitui_a_tabela_inteira(self):
+        importar_dataframe(VisitaTecnica, planilha_visitas([('Escola A', '10/03/2025', 'Ana', 'a', None)]), COLUNAS)
+        importar_dataframe(VisitaTecnica, planilha_visitas([('Escola B', '11/03/2025', 'Bruno', 'b', None)]), COLUNAS)
+        self.assertEqual(list(VisitaTecnica.objects.values_list('escola__nome', flat=True)), ['Escola B'])
+
+    def test_erro_no_meio_desfaz_tudo(self):
+        importar_dataframe(VisitaTecnica, planilha_visitas([('Escola A', '10/03/2025', 'Ana', 'a', None)]), COLUNAS)
+        antes = list(VisitaTecnica.objects.values_list('id', flat=True))
+
+        def progresso(gravadas, total):
+            if gravadas >= 2:
+                raise RuntimeError('falhou no segundo lote')
+
+        df = planilha_visitas([('Escola B', '11/03/2025', 'Bruno', str(i), None) for i in range(3)])
+        with self.assertRaises(RuntimeError):
+            importar_dataframe(VisitaTecnica, df, COLUNAS, batch_size=1, progresso=progresso)
+        # A limpeza e o primeiro lote também voltaram atrás
+        self.assertEqual(list(VisitaTecnica.objects.values_list('id', flat=True)), antes)
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class ImportacaoIncrementalTests(TestCase):
+    LINHAS = [
+        ('Escola A', '10/03/2025', 'Ana', 'merenda', 'resolvido'),
+        # Duas visitas do mesmo técnico no mesmo dia: a chave se repete
+        ('Escola A', '10/03/2025', 'Ana', 'transporte', None),
+        ('Escola B', '11/03/2025', 'Bruno', 'reforma', 'agendado'),
+    ]
+
+    def setUp(self):
+        cache.clear()
+        importar_dataframe(VisitaTecnica, planilha_visitas(self.LINHAS), COLUNAS,
+                           ao_gravar=VisitaMensal.registrar_importacao)
+        self.ids = list(VisitaTecnica.objects.order_by('id').values_list('id', flat=True))
+
+    def importar(self, linhas):
+        return importar_incremental(VisitaTecnica, planilha_visitas(linhas), COLUNAS,
+                                    VisitaTecnica.CHAVE_IMPORTACAO, ao_gravar=VisitaMensal.registrar_importacao)
+
+    def assertAgregadoCorreto(self):
+        # As diferenças aplicadas aos poucos batem com o recálculo do zero
+        incremental = agregado_mensal()
+        VisitaMensal.recalcular()
+        self.assertEqual(incremental, agregado_mensal())
+
+    def test_reimportar_sem_mudancas_nao_grava_nada(self):
+        resultado = self.importar(self.LINHAS)
+        self.assertEqual((resultado.inseridos, resultado.atualizados, resultado.removidos, resultado.inalterados),
+                         (0, 0, 0, 3))
+        self.assertEqual(list(VisitaTecnica.objects.order_by('id').values_list('id', flat=True)), self.ids)
+        self.assertAgregadoCorreto()
+
+    def test_linha_alterada_mantem_o_id(self):
+        linhas = list(self.LINHAS)
+        linhas[1] = ('Escola A', '10/03/2025', 'Ana', 'transporte', 'ônibus consertado')
+        resultado = self.importar(linhas)
+        self.assertEqual((resultado.inseridos, resultado.atualizados, resultado.removidos), (0, 1, 0))
+        visita = VisitaTecnica.objects.get(pk=self.ids[1])
+        self.assertEqual(visita.encaminhamento, 'ônibus consertado')
+        self.assertAgregadoCorreto()
+
+    def test_linha_removida_e_apagada(self):
+        resultado = self.importar(self.LINHAS[:1] + self.LINHAS[2:])
+        self.assertEqual((resultado.inseridos, resultado.atualizados, resultado.removidos), (0, 0, 1))
+        self.assertEqual(VisitaTecnica.objects.count(), 2)
+        self.assertAgregadoCorreto()
+
+    def test_linha_nova_e_inserida(self):
+        resultado = self.importar(self.LINHAS + [('Escola C', '12/03/2025', 'Carla', 'internet', None)])
+        self.assertEqual((resultado.inseridos, resultado.atualizados, resultado.removidos), (1, 0, 0))
+        self.assertTrue(VisitaTecnica.objects.filter(escola__nome='Escola C').exists())
+        self.assertAgregadoCorreto()
+
+    def test_visita_do_formulario_nao_e_tocada(self):
+        # Mesma chave natural de uma linha da planilha, mas registada pelo formulário (sem hash)
+        escola = Escola.objects.get(nome='Escola B')
+        formulario = VisitaTecnica.objects.create(
+            escola=escola, data_visita=datetime.date(2025, 3, 11), tecnico_gre='Bruno', demanda='pelo formulário')
+        VisitaMensal.registrar_visita(formulario)
+
+        resultado = self.importar(self.LINHAS)
+        self.assertEqual((resultado.inseridos, resultado.atualizados, resultado.removidos, resultado.inalterados),
+                         (0, 0, 0, 3))
+        formulario.refresh_from_db()
+        self.assertEqual(formulario.demanda, 'pelo formulário')
+
+        # Nem quando a linha de mesma chave sai da planilha
+        resultado = self.importar(self.LINHAS[:2])
+        self.assertEqual(resultado.removidos, 1)
+        self.assertTrue(VisitaTecnica.objects.filter(pk=formulario.pk).exists())
+        self.assertAgregadoCorreto()
+
+    def test_chave_da_planilha_de_acompanhamento_e_escola_e_modalidade(self):
+        linhas = [('Escola A', 'EFAF', 120, 4.5), ('Escola A', 'ENME', 90, 4.1)]
+        importar_dataframe(DadosFicticiosEscola, planilha_dados(linhas), COLUNAS_DADOS)
+        ids = dict(DadosFicticiosEscola.objects.values_list('modalidade', 'id'))
+
+        linhas[1] = ('Escola A', 'ENME', 95, 4.1)
+        resultado = importar_incremental(DadosFicticiosEscola, planilha_dados(linhas), COLUNAS_DADOS,
+                                         DadosFicticiosEscola.CHAVE_IMPORTACAO)
+        self.assertEqual((resultado.inseridos, resultado.atualizados, resultado.inalterados), (0, 1, 1))
+        self.assertEqual(DadosFicticiosEscola.objects.get(pk=ids['ENME']).alunos_previstos_2023, 95)
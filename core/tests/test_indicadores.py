@@ -0,0 +1,118 @@
+import statistics
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from . import CACHE_TESTES
+from ..cache_dados import invalidar_dados
+from ..indicadores import (
+    calcular_indicadores, carregar_arrays, indicadores_escola, indicadores_rede, media_ponderada_por_grupo,
+    percentil_de_cada, z_scores,
+)
+from ..models import DadosFicticiosEscola, Escola
+
+NAN = float('nan')
+
+
+class FuncoesVetorizadasTests(TestCase):
+    def test_z_scores(self):
+        valores = np.array([1.0, 2.0, NAN, 5.0])
+        media, desvio = statistics.mean([1, 2, 5]), statistics.pstdev([1, 2, 5])
+        esperado = [(1 - media) / desvio, (2 - media) / desvio, NAN, (5 - media) / desvio]
+        np.testing.assert_allclose(z_scores(valores), esperado)
+        # Desvio zero ou nenhum valor: tudo NaN, sem divisão por zero
+        self.assertTrue(np.isnan(z_scores(np.array([3.0, 3.0]))).all())
+        self.assertTrue(np.isnan(z_scores(np.array([NAN]))).all())
+
+    def test_percentil_de_cada(self):
+        np.testing.assert_allclose(percentil_de_cada(np.array([10.0, 20.0, 20.0, NAN, 40.0])),
+                                   [25.0, 75.0, 75.0, NAN, 100.0])
+
+    def test_media_ponderada_ignora_nan_e_peso_zero(self):
+        valores = np.array([10.0, 20.0, 30.0, NAN, 50.0])
+        pesos = np.array([1.0, 3.0, 0.0, 2.0, NAN])
+        grupos = np.array([0, 0, 0, 1, 1])
+        np.testing.assert_allclose(media_ponderada_por_grupo(valores, pesos, grupos, 3),
+                                   [(10 * 1 + 20 * 3) / 4, NAN, NAN])
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class IndicadoresTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        linhas = [
+            # escola, modalidade, SAEPE 2022, SAEPE 2023, LP, MT, peso, alunos
+            ('Escola A', 'EFAF', 4.0, 4.5, 250.0, 260.0, 0.5, 100),
+            ('Escola A', 'ENME', 3.0, 2.5, 270.0, None, 0.2, 50),
+            ('Escola B', 'EFAF', 5.0, 5.0, 230.0, 240.0, 0.3, 300),
+            ('Escola C', 'EFAF', None, 4.0, None, 250.0, None, None),
+        ]
+        self.escolas = {}
+        for nome, modalidade, s22, s23, lp, mt, peso, alunos in linhas:
+            escola = self.escolas.get(nome) or Escola.objects.create(nome=nome)
+            self.escolas[nome] = escola
+            DadosFicticiosEscola.objects.create(
+                escola=escola, modalidade=modalidade, saepe_2022=s22, saepe_2023=s23,
+                proficiencia_lp_2023=lp, proficiencia_mt_2023=mt, percentual_peso=peso, alunos_previstos_2023=alunos)
+        invalidar_dados()
+
+    def test_arrays_na_ordem_das_linhas(self):
+        dados = carregar_arrays()
+        self.assertEqual(len(dados), 4)
+        self.assertEqual(dados.modalidades, ['EFAF', 'ENME'])
+        self.assertEqual(dados.modalidade.tolist(), [0, 1, 0, 0])
+        self.assertTrue(np.isnan(dados.lp[3]))
+
+    def test_rede_confere_com_a_conta_a_mao(self):
+        rede = calcular_indicadores()
+        self.assertEqual(rede['total_escolas'], 4)
+
+        crescimento = rede['crescimento_saepe']
+        self.assertEqual((crescimento['n'], crescimento['melhoraram'], crescimento['pioraram']), (3, 1, 1))
+        self.assertAlmostEqual(crescimento['media'], statistics.mean([0.5, -0.5, 0.0]))
+
+        lp = rede['proficiencia_lp_2023']
+        self.assertAlmostEqual(lp['media'], statistics.mean([250, 270, 230]), places=4)
+        self.assertAlmostEqual(lp['desvio_padrao'], round(statistics.pstdev([250, 270, 230]), 4))
+        self.assertEqual(lp['percentis']['50'], 250.0)
+
+        efaf = rede['por_modalidade'][0]
+        self.assertEqual((efaf['modalidade'], efaf['escolas']), ('EFAF', 3))
+        self.assertAlmostEqual(efaf['medias_ponderadas']['lp']['percentual_peso'],
+                               round((250 * 0.5 + 230 * 0.3) / 0.8, 4))
+        self.assertAlmostEqual(efaf['medias_ponderadas']['mt']['alunos_previstos_2023'],
+                               round((260 * 100 + 240 * 300) / 400, 4))
+        self.assertIsNone(rede['por_modalidade'][1]['medias_ponderadas']['mt']['percentual_peso'])
+
+    def test_escola(self):
+        linhas = indicadores_escola(self.escolas['Escola A'].pk)
+        self.assertEqual([linha['modalidade'] for linha in linhas], ['EFAF', 'ENME'])
+        efaf, enme = linhas
+        self.assertEqual((efaf['crescimento_saepe'], enme['crescimento_saepe']), (0.5, -0.5))
+        self.assertEqual(efaf['z_lp'], 0.0)
+        self.assertAlmostEqual(enme['percentil_lp'], 100.0)
+        self.assertIsNone(enme['z_mt'])
+        self.assertEqual(indicadores_escola(999999), [])
+
+    def test_rede_guardada_ate_a_versao_mudar(self):
+        indicadores_rede()
+        with self.assertNumQueries(0):
+            indicadores_rede()
+        DadosFicticiosEscola.objects.create(escola=self.escolas['Escola C'], modalidade='ENME')
+        invalidar_dados()
+        self.assertEqual(indicadores_rede()['total_escolas'], 5)
+
+    def test_banco_vazio(self):
+        DadosFicticiosEscola.objects.all().delete()
+        rede = calcular_indicadores(carregar_arrays())
+        self.assertEqual((rede['total_escolas'], rede['por_modalidade']), (0, []))
+        self.assertIsNone(rede['proficiencia_lp_2023']['media'])
+
+    def test_api(self):
+        self.client.force_login(User.objects.create_user('tecnico', password='senha'))
+        dados = self.client.get(reverse('api_indicadores'), {'escola': self.escolas['Escola B'].pk}).json()
+        self.assertEqual(dados['rede']['total_escolas'], 4)
+        self.assertEqual(dados['escola'][0]['crescimento_saepe'], 0.0)
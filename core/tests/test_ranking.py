@@ -0,0 +1,72 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from . import CACHE_TESTES
+from ..models import DadosFicticiosEscola, Escola
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class RankingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('tecnico', password='senha'))
+        # (nome, LP, SAEPE 2022, SAEPE 2023)
+        valores = [
+            ('Escola A', 250.0, 4.9, 5.0),
+            ('Escola B', 270.0, 4.8, 4.9),  # mesma evolução que A
+            ('Escola C', 250.0, None, 4.0),  # empata com A em LP
+            ('Escola D', None, 5.0, 4.5),    # sem LP: fica fora do ranking de LP
+        ]
+        self.dados = {}
+        for nome, lp, s22, s23 in valores:
+            escola = Escola.objects.create(nome=nome)
+            self.dados[nome] = DadosFicticiosEscola.objects.create(
+                escola=escola, modalidade='EFAF', proficiencia_lp_2023=lp, saepe_2022=s22, saepe_2023=s23)
+        DadosFicticiosEscola.recalcular_posicoes()
+
+    def posicoes(self, campo):
+        return dict(DadosFicticiosEscola.objects.values_list('escola__nome', campo))
+
+    def test_rank_com_empates_e_sem_valor(self):
+        self.assertEqual(self.posicoes('posicao_lp'),
+                         {'Escola A': 2, 'Escola B': 1, 'Escola C': 2, 'Escola D': None})
+
+    def test_evolucao_calculada_e_empates_arredondados(self):
+        self.assertEqual(self.posicoes('evolucao_saepe'),
+                         {'Escola A': 0.1, 'Escola B': 0.1, 'Escola C': None, 'Escola D': -0.5})
+        self.assertEqual(self.posicoes('posicao_evolucao_saepe'),
+                         {'Escola A': 1, 'Escola B': 1, 'Escola C': None, 'Escola D': 3})
+
+    def test_ranking_melhores_e_piores(self):
+        melhores = [d.escola.nome for d in DadosFicticiosEscola.ranking('lp', 3)]
+        self.assertEqual(melhores, ['Escola B', 'Escola A', 'Escola C'])
+        # Linhas sem valor nunca aparecem, nem no fim da lista
+        piores = [d.escola.nome for d in DadosFicticiosEscola.ranking('lp', 5, melhores=False)]
+        self.assertEqual(piores, ['Escola C', 'Escola A', 'Escola B'])
+        self.assertEqual(DadosFicticiosEscola.total_ranqueado('lp'), 3)
+
+    def test_ranking_usa_uma_consulta(self):
+        with self.assertNumQueries(1):
+            [d.escola.nome for d in DadosFicticiosEscola.ranking('saepe_2023', 10)]
+
+    def test_posicoes_acompanham_a_reimportacao(self):
+        DadosFicticiosEscola.objects.filter(pk=self.dados['Escola D'].pk).update(proficiencia_lp_2023=300)
+        DadosFicticiosEscola.recalcular_posicoes()
+        self.assertEqual(self.posicoes('posicao_lp')['Escola D'], 1)
+        self.assertEqual(DadosFicticiosEscola.total_ranqueado('lp'), 4)
+
+    def test_api_ranking(self):
+        escola_c = self.dados['Escola C'].escola_id
+        dados = self.client.get(reverse('api_ranking'),
+                                {'metrica': 'lp', 'n': '2', 'escola': escola_c}).json()
+        self.assertEqual(dados['total'], 3)
+        self.assertEqual([(e['escola_nome'], e['posicao']) for e in dados['escolas']],
+                         [('Escola B', 1), ('Escola A', 2)])
+        self.assertEqual(dados['posicoes_escola'], [{'modalidade': 'EFAF', 'valor': 250.0, 'posicao': 2}])
+
+    def test_api_ranking_parametros_invalidos(self):
+        for params in ({'metrica': 'nota'}, {'n': 'dez'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(reverse('api_ranking'), params).status_code, 400)
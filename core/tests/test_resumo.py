@@ -0,0 +1,94 @@
+import datetime
+import io
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from . import CACHE_TESTES
+from ..models import DadosFicticiosEscola, Escola, ResumoDashboard, VisitaTecnica
+
+
+def numeros(resumo):
+    return (resumo.total_escolas, resumo.total_visitas, resumo.relatorios_pendentes, resumo.ultima_data_visita)
+
+
+def criar_dados():
+    a, b = Escola.objects.create(nome='Escola A'), Escola.objects.create(nome='Escola B')
+    for escola, modalidade in ((a, 'EFAF'), (a, 'ENME'), (b, 'EFAF')):
+        DadosFicticiosEscola.objects.create(escola=escola, modalidade=modalidade)
+    VisitaTecnica.objects.create(escola=a, data_visita=datetime.date(2025, 3, 10), tecnico_gre='Ana',
+                                 encaminhamento='resolvido')
+    VisitaTecnica.objects.create(escola=a, data_visita=datetime.date(2025, 2, 1), encaminhamento='')
+    VisitaTecnica.objects.create(escola=b, data_visita=None, encaminhamento=None)
+    return a, b
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class ResumoDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.a, self.b = criar_dados()
+
+    def test_recalcular(self):
+        # Escolas distintas com dados; '' e None contam como relatório pendente
+        self.assertEqual(numeros(ResumoDashboard.recalcular()), (2, 3, 2, datetime.date(2025, 3, 10)))
+        self.assertEqual(ResumoDashboard.objects.count(), 1)
+
+    def test_obter_cria_na_primeira_vez_e_depois_so_le(self):
+        self.assertFalse(ResumoDashboard.objects.exists())
+        self.assertEqual(numeros(ResumoDashboard.obter())[1], 3)
+        with self.assertNumQueries(1):
+            ResumoDashboard.obter()
+
+    def test_registrar_visita_soma_sem_recalcular(self):
+        ResumoDashboard.recalcular()
+        visitas = [
+            VisitaTecnica(escola=self.a, data_visita=datetime.date(2025, 1, 5), encaminhamento=''),
+            VisitaTecnica(escola=self.b, data_visita=datetime.date(2025, 4, 1), encaminhamento='ok'),
+            VisitaTecnica(escola=self.b, data_visita=None, encaminhamento='ok'),
+        ]
+        for visita in visitas:
+            visita.save()
+            with self.assertNumQueries(1):
+                ResumoDashboard.registrar_visita(visita)
+
+        resumo = ResumoDashboard.objects.get(pk=1)
+        # Data mais antiga não recua a última; a mais nova avança
+        self.assertEqual(numeros(resumo), (2, 6, 3, datetime.date(2025, 4, 1)))
+        self.assertEqual(numeros(resumo), numeros(ResumoDashboard.recalcular()))
+
+    def test_registrar_visita_sem_resumo_calcula_do_zero(self):
+        visita = VisitaTecnica.objects.create(escola=self.a, data_visita=datetime.date(2025, 5, 1))
+        ResumoDashboard.registrar_visita(visita)
+        self.assertEqual(numeros(ResumoDashboard.objects.get(pk=1))[1:], (4, 3, datetime.date(2025, 5, 1)))
+
+    def test_comando_corrige_desvio(self):
+        ResumoDashboard.recalcular()
+        ResumoDashboard.objects.filter(pk=1).update(total_visitas=999)
+        call_command('recalcular_resumo', stdout=io.StringIO())
+        self.assertEqual(ResumoDashboard.objects.get(pk=1).total_visitas, 3)
+
+    def test_formulario_de_visita_atualiza_o_resumo(self):
+        ResumoDashboard.recalcular()
+        self.client.force_login(User.objects.create_user('tecnico', password='senha'))
+        resposta = self.client.post(reverse('visitas'), {
+            'escola': self.a.pk, 'data_visita': '2025-06-02', 'tecnico_gre': 'Ana',
+            'servidor_escola': 'Diretora', 'demanda': 'merenda',
+        })
+        self.assertRedirects(resposta, reverse('visitas'), fetch_redirect_response=False)
+        self.assertEqual(numeros(ResumoDashboard.objects.get(pk=1))[1:], (4, 3, datetime.date(2025, 6, 2)))
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class ResumoDashboardAsyncTests(TransactionTestCase):
+    # As contagens de arecalcular() rodam em outras threads, com outras
+    # conexões: os dados precisam estar gravados de verdade
+
+    def test_arecalcular_da_o_mesmo_que_recalcular(self):
+        criar_dados()
+        assincrono = numeros(async_to_sync(ResumoDashboard.arecalcular)())
+        self.assertEqual(assincrono, numeros(ResumoDashboard.recalcular()))
@@ -0,0 +1,106 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .. import roteador
+from ..cache_dados import chave_cache
+from ..models import VisitaTecnica
+from ..roteador import (
+    ALIAS_REPLICA, COOKIE_PRIMARIO, ReplicaMiddleware, RoteadorReplica, alias_leitura, leitura_replica,
+)
+
+
+def view_alias(request):
+    return HttpResponse(alias_leitura())
+
+
+class RoteadorReplicaTests(SimpleTestCase):
+    def setUp(self):
+        configurada = mock.patch.object(roteador, 'replica_configurada', return_value=True)
+        configurada.start()
+        self.addCleanup(configurada.stop)
+        self.fabrica = RequestFactory()
+        self.roteador = RoteadorReplica()
+
+    def alias_da_view(self, request, view=view_alias):
+        return leitura_replica(view)(request).content.decode()
+
+    def test_so_views_marcadas_leem_da_replica(self):
+        self.assertEqual(alias_leitura(), 'default')
+        self.assertEqual(view_alias(self.fabrica.get('/')).content, b'default')
+        self.assertEqual(self.alias_da_view(self.fabrica.get('/')), ALIAS_REPLICA)
+        self.assertEqual(self.alias_da_view(self.fabrica.head('/')), ALIAS_REPLICA)
+        # Depois da view, de volta ao primário
+        self.assertEqual(alias_leitura(), 'default')
+
+    def test_post_e_cookie_ficam_no_primario(self):
+        self.assertEqual(self.alias_da_view(self.fabrica.post('/')), 'default')
+        request = self.fabrica.get('/')
+        request.COOKIES[COOKIE_PRIMARIO] = '1'
+        self.assertEqual(self.alias_da_view(request), 'default')
+
+    def test_escrita_no_meio_da_view_prende_ao_primario(self):
+        def view(request):
+            antes = self.roteador.db_for_read(VisitaTecnica)
+            self.assertEqual(self.roteador.db_for_write(VisitaTecnica), 'default')
+            return HttpResponse(f'{antes} {self.roteador.db_for_read(VisitaTecnica)}')
+
+        middleware = ReplicaMiddleware(lambda request: leitura_replica(view)(request))
+        self.assertEqual(middleware(self.fabrica.get('/')).content, b'replica default')
+        # A requisição seguinte volta a ler da réplica
+        self.assertEqual(middleware(self.fabrica.get('/')).content, b'replica default')
+
+    def test_view_async(self):
+        async def view(request):
+            return HttpResponse(alias_leitura())
+
+        envolvida = leitura_replica(view)
+        self.assertTrue(iscoroutinefunction(envolvida))
+        self.assertEqual(async_to_sync(envolvida)(self.fabrica.get('/')).content.decode(), ALIAS_REPLICA)
+
+    def test_sem_replica_tudo_no_primario(self):
+        with mock.patch.object(roteador, 'replica_configurada', return_value=False):
+            self.assertEqual(self.alias_da_view(self.fabrica.get('/')), 'default')
+            with self.assertRaises(MiddlewareNotUsed):
+                ReplicaMiddleware(view_alias)
+
+    def test_migracoes_so_no_primario(self):
+        self.assertTrue(self.roteador.allow_migrate('default', 'core'))
+        self.assertFalse(self.roteador.allow_migrate(ALIAS_REPLICA, 'core'))
+
+    def test_cache_separa_o_que_veio_da_replica(self):
+        def view(request):
+            return HttpResponse(chave_cache('teste', versao='1'))
+
+        self.assertEqual(self.alias_da_view(self.fabrica.get('/'), view), 'saepe:1:replica:teste')
+        self.assertEqual(chave_cache('teste', versao='1'), 'saepe:1:default:teste')
+
+
+@override_settings(REPLICA_ATRASO_MAXIMO=15)
+class ReplicaMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        configurada = mock.patch.object(roteador, 'replica_configurada', return_value=True)
+        configurada.start()
+        self.addCleanup(configurada.stop)
+        self.fabrica = RequestFactory()
+
+    def test_post_marca_o_cliente(self):
+        middleware = ReplicaMiddleware(lambda request: HttpResponse())
+        cookie = middleware(self.fabrica.post('/')).cookies[COOKIE_PRIMARIO]
+        self.assertEqual((cookie['max-age'], cookie['httponly']), (15, True))
+        for metodo in ('get', 'head', 'options'):
+            with self.subTest(metodo=metodo):
+                resposta = middleware(getattr(self.fabrica, metodo)('/'))
+                self.assertNotIn(COOKIE_PRIMARIO, resposta.cookies)
+
+    def test_async(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        resposta = async_to_sync(middleware)(self.fabrica.post('/'))
+        self.assertIn(COOKIE_PRIMARIO, resposta.cookies)
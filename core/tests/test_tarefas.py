@@ -0,0 +1,165 @@
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from . import CACHE_TESTES
+from .. import tarefas
+from ..models import Escola, Tarefa, VisitaTecnica
+
+
+@override_settings(CACHES=CACHE_TESTES, TAREFAS_ESPERA_RETENTATIVA=0)
+class FilaTarefasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.executadas = []
+
+        @tarefas.tipo_tarefa('teste', 'Tarefa de teste')
+        def executar(tarefa, andamento, falhar=False):
+            self.executadas.append(tarefa.pk)
+            if falhar:
+                raise RuntimeError('falhou')
+            andamento(50, 'metade')
+            return {'ok': True}
+
+        self.addCleanup(tarefas.TIPOS.pop, 'teste')
+
+    def test_pega_a_mais_antiga_e_nao_repete(self):
+        primeira, segunda = tarefas.enfileirar('teste'), tarefas.enfileirar('teste')
+        self.assertEqual(tarefas.executar_proxima('host:1').pk, primeira.pk)
+        self.assertEqual(tarefas.executar_proxima('host:1').pk, segunda.pk)
+        self.assertIsNone(tarefas.executar_proxima('host:1'))
+        self.assertEqual(self.executadas, [primeira.pk, segunda.pk])
+        primeira.refresh_from_db()
+        self.assertEqual((primeira.status, primeira.resultado, primeira.tentativas), (Tarefa.CONCLUIDA, {'ok': True}, 1))
+
+    def test_tarefa_de_outro_worker_nao_e_pega(self):
+        tarefa = tarefas.enfileirar('teste')
+        Tarefa.objects.filter(pk=tarefa.pk).update(status=Tarefa.EXECUTANDO, worker='outro:1')
+        self.assertIsNone(tarefas.executar_proxima('host:1'))
+        self.assertEqual(self.executadas, [])
+
+    def test_falha_volta_para_a_fila_ate_esgotar_as_tentativas(self):
+        tarefa = tarefas.enfileirar('teste', {'falhar': True}, max_tentativas=2)
+        tarefas.executar_proxima('host:1')
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.status, tarefa.tentativas), (Tarefa.PENDENTE, 1))
+        tarefas.executar_proxima('host:1')
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.status, tarefa.tentativas), (Tarefa.FALHOU, 2))
+        self.assertIn('RuntimeError', tarefa.erro)
+
+    def test_cancelada_na_fila_nao_executa(self):
+        tarefa = tarefas.enfileirar('teste')
+        self.assertTrue(tarefas.cancelar(tarefa))
+        self.assertIsNone(tarefas.executar_proxima('host:1'))
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, Tarefa.CANCELADA)
+        self.assertFalse(tarefas.cancelar(tarefa))
+
+    def test_erro_de_entrada_falha_sem_tentar_de_novo(self):
+        tarefa = tarefas.enfileirar('exportar', {'formato': 'pdf'})
+        tarefas.executar_proxima('host:1')
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.status, tarefa.tentativas), (Tarefa.FALHOU, 1))
+        self.assertEqual(tarefa.mensagem, 'Formato inválido: pdf')
+
+    def test_cancelada_durante_a_execucao_guarda_onde_parou(self):
+        @tarefas.tipo_tarefa('teste_longa', 'Tarefa longa')
+        def executar(tarefa, andamento):
+            andamento(40, 'quase metade')
+            tarefas.cancelar(tarefa)
+            andamento(60, 'não chega aqui')
+
+        self.addCleanup(tarefas.TIPOS.pop, 'teste_longa')
+        tarefa = tarefas.enfileirar('teste_longa')
+        tarefas.executar_proxima('host:1')
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.status, tarefa.progresso), (Tarefa.CANCELADA, 40))
+
+    def test_andamento_de_uma_etapa(self):
+        tarefa = tarefas.enfileirar('teste')
+        Tarefa.objects.filter(pk=tarefa.pk).update(status=Tarefa.EXECUTANDO)
+        tarefa.refresh_from_db()
+        tarefas.Andamento(tarefa).parte(50, 100)(50, 'segunda etapa')
+        self.assertEqual(tarefas.estado(tarefa)['progresso'], 75)
+        self.assertEqual(tarefas.estado(tarefa)['mensagem'], 'segunda etapa')
+
+    def test_recupera_orfas_so_desta_maquina(self):
+        host = tarefas.socket.gethostname()
+        orfa, viva, outra_maquina = (tarefas.enfileirar('teste') for _ in range(3))
+        for tarefa, worker in ((orfa, f'{host}:111'), (viva, f'{host}:222'), (outra_maquina, 'outra:111')):
+            Tarefa.objects.filter(pk=tarefa.pk).update(status=Tarefa.EXECUTANDO, worker=worker, tentativas=1)
+
+        with mock.patch.object(tarefas, '_processo_vivo', side_effect=lambda pid: pid == 222):
+            self.assertEqual(tarefas.recuperar_orfas(), 1)
+        status = dict(Tarefa.objects.values_list('pk', 'status'))
+        self.assertEqual((status[orfa.pk], status[viva.pk], status[outra_maquina.pk]),
+                         (Tarefa.PENDENTE, Tarefa.EXECUTANDO, Tarefa.EXECUTANDO))
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class TarefasArquivosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = Path(pasta.name)
+        sobrepor = override_settings(TAREFAS_ARQUIVOS_DIR=self.pasta)
+        sobrepor.enable()
+        self.addCleanup(sobrepor.disable)
+        self.usuario = User.objects.create_user('tecnico', password='senha')
+        self.client.force_login(self.usuario)
+
+    def test_exportar_e_baixar(self):
+        VisitaTecnica.objects.create(escola=Escola.objects.create(nome='Escola A'), demanda='merenda')
+        tarefa = tarefas.enfileirar('exportar', {'tabela': 'visitas'}, usuario=self.usuario)
+        tarefas.executar_proxima('host:1')
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.status, tarefa.resultado['linhas']), (Tarefa.CONCLUIDA, 1))
+
+        resposta = self.client.get(reverse('baixar_arquivo_tarefa', args=[tarefa.pk]))
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn(tarefa.resultado['nome_arquivo'], resposta['Content-Disposition'])
+        self.assertIn('merenda', b''.join(resposta.streaming_content).decode('utf-8-sig'))
+
+    def test_envios_apagados_quando_termina(self):
+        @tarefas.tipo_tarefa('teste_envios', 'Tarefa com planilhas')
+        def executar(tarefa, andamento, caminhos):
+            raise (RuntimeError if tarefa.tentativas == 1 else tarefas.ErroTarefa)('planilha inválida')
+
+        self.addCleanup(tarefas.TIPOS.pop, 'teste_envios')
+        pasta = tarefas.salvar_envios([])
+        tarefas.enfileirar('teste_envios', {'caminhos': [str(pasta)]})
+        with self.settings(TAREFAS_ESPERA_RETENTATIVA=0):
+            tarefas.executar_proxima('host:1')
+            # Vai tentar de novo: as planilhas continuam lá
+            self.assertTrue(pasta.is_dir())
+            tarefas.executar_proxima('host:1')
+        self.assertFalse(pasta.exists())
+
+    def test_apagar_envios_nao_sai_da_pasta_de_envios(self):
+        fora = self.pasta / 'fora'
+        fora.mkdir()
+        tarefas.apagar_envios(Tarefa(parametros={'caminhos': [str(fora), os.path.join(fora, '..')]}))
+        self.assertTrue(fora.is_dir())
+
+    def test_api_de_status_e_cancelamento(self):
+        tarefa = tarefas.enfileirar('exportar', usuario=self.usuario)
+        dados = self.client.get(reverse('api_tarefa', args=[tarefa.pk])).json()
+        self.assertEqual((dados['status'], dados['finalizada']), (Tarefa.PENDENTE, False))
+
+        dados = self.client.post(reverse('api_cancelar_tarefa', args=[tarefa.pk])).json()
+        self.assertEqual(dados['status'], Tarefa.CANCELADA)
+        resposta = self.client.post(reverse('api_cancelar_tarefa', args=[tarefa.pk]))
+        self.assertEqual(resposta.status_code, 409)
+
+    def test_tarefa_de_outro_usuario_nao_aparece(self):
+        outro = User.objects.create_user('outro', password='senha')
+        tarefa = tarefas.enfileirar('exportar', usuario=outro)
+        self.assertEqual(self.client.get(reverse('api_tarefa', args=[tarefa.pk])).status_code, 404)
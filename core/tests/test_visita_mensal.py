@@ -0,0 +1,99 @@
+import datetime
+
+from django.test import TestCase
+
+from ..models import Escola, VisitaMensal, VisitaTecnica
+from ..views import calcular_visitas_por_mes
+
+
+class VisitaMensalTests(TestCase):
+    def setUp(self):
+        self.escola = Escola.objects.create(nome='Escola A')
+        self.marco = datetime.date(2025, 3, 1)
+
+    def linha(self, mes, tecnico='Ana'):
+        return VisitaMensal.objects.filter(mes=mes, escola=self.escola, tecnico_gre=tecnico).first()
+
+    def test_insere_soma_e_apaga_quando_zera(self):
+        chave = (self.marco, self.escola.pk, 'Ana')
+        VisitaMensal.aplicar_diferencas({chave: (2, 1)})
+        self.assertEqual((self.linha(self.marco).total, self.linha(self.marco).pendentes), (2, 1))
+
+        VisitaMensal.aplicar_diferencas({chave: (3, 0)})
+        self.assertEqual((self.linha(self.marco).total, self.linha(self.marco).pendentes), (5, 1))
+
+        VisitaMensal.aplicar_diferencas({chave: (-5, -1)})
+        self.assertIsNone(self.linha(self.marco))
+
+    def test_visitas_sem_data_tem_a_sua_linha(self):
+        chave = (None, self.escola.pk, '')
+        VisitaMensal.aplicar_diferencas({chave: (1, 1)})
+        VisitaMensal.aplicar_diferencas({chave: (1, 0)})
+        self.assertEqual(VisitaMensal.objects.filter(mes__isnull=True).count(), 1)
+        self.assertEqual(self.linha(None, '').total, 2)
+
+    def test_diferenca_nula_nao_cria_linha(self):
+        VisitaMensal.aplicar_diferencas({(self.marco, self.escola.pk, 'Ana'): (0, 0)})
+        self.assertFalse(VisitaMensal.objects.exists())
+
+    def test_chave_criada_por_outra_escrita_recebe_a_soma(self):
+        # Outra escrita criou as linhas depois da leitura de aplicar_diferencas
+        VisitaMensal.objects.create(mes=self.marco, escola=self.escola, tecnico_gre='Ana', total=4, pendentes=2)
+        VisitaMensal.objects.create(mes=None, escola=self.escola, tecnico_gre='Ana', total=1, pendentes=0)
+        abril = datetime.date(2025, 4, 1)
+        VisitaMensal._inserir_ou_somar([
+            VisitaMensal(mes=self.marco, escola=self.escola, tecnico_gre='Ana', total=1, pendentes=1),
+            VisitaMensal(mes=None, escola=self.escola, tecnico_gre='Ana', total=2, pendentes=1),
+            VisitaMensal(mes=abril, escola=self.escola, tecnico_gre='Ana', total=1, pendentes=0),
+        ], batch_size=500)
+        self.assertEqual((self.linha(self.marco).total, self.linha(self.marco).pendentes), (5, 3))
+        self.assertEqual((self.linha(None).total, self.linha(None).pendentes), (3, 1))
+        self.assertEqual(self.linha(abril).total, 1)
+
+    def test_registrar_visita_do_formulario(self):
+        visita = VisitaTecnica.objects.create(escola=self.escola, data_visita=datetime.date(2025, 3, 20),
+                                              tecnico_gre='Ana', encaminhamento='')
+        VisitaMensal.registrar_visita(visita)
+        self.assertEqual((self.linha(self.marco).total, self.linha(self.marco).pendentes), (1, 1))
+
+    def test_recalcular_agrupa_por_mes_escola_e_tecnico(self):
+        visita = VisitaTecnica.objects.create
+        visita(escola=self.escola, data_visita=datetime.date(2025, 3, 2), tecnico_gre='Ana', encaminhamento='ok')
+        visita(escola=self.escola, data_visita=datetime.date(2025, 3, 30), tecnico_gre='Ana', encaminhamento=None)
+        visita(escola=self.escola, data_visita=datetime.date(2025, 5, 1), tecnico_gre=None, encaminhamento='')
+        visita(escola=self.escola, data_visita=None, tecnico_gre='Ana', encaminhamento='ok')
+        VisitaMensal.recalcular()
+        self.assertEqual(
+            sorted(VisitaMensal.objects.values_list('mes', 'tecnico_gre', 'total', 'pendentes'), key=str),
+            sorted([(self.marco, 'Ana', 2, 1), (datetime.date(2025, 5, 1), '', 1, 1), (None, 'Ana', 1, 0)], key=str),
+        )
+
+
+class VisitasPorMesTests(TestCase):
+    def setUp(self):
+        self.a = Escola.objects.create(nome='Escola A')
+        self.b = Escola.objects.create(nome='Escola B')
+        VisitaMensal.aplicar_diferencas({
+            (datetime.date(2025, 1, 1), self.a.pk, 'Ana'): (2, 1),
+            (datetime.date(2025, 1, 1), self.b.pk, 'Bruno'): (1, 0),
+            (datetime.date(2025, 3, 1), self.a.pk, 'Bruno'): (4, 2),
+            (None, self.a.pk, 'Ana'): (5, 5),
+        })
+
+    def test_serie_completa_os_meses_sem_visita(self):
+        grafico = calcular_visitas_por_mes()
+        self.assertEqual(grafico['labels'], ['01/2025', '02/2025', '03/2025'])
+        visitas, pendentes = grafico['datasets']
+        self.assertEqual((visitas['data'], pendentes['data']), ([3, 0, 4], [1, 0, 2]))
+
+    def test_filtros_de_periodo_e_escola(self):
+        grafico = calcular_visitas_por_mes(datetime.date(2025, 2, 1), datetime.date(2025, 4, 1), self.a.pk)
+        self.assertEqual(grafico['labels'], ['02/2025', '03/2025', '04/2025'])
+        self.assertEqual(grafico['datasets'][0]['data'], [0, 4, 0])
+        self.assertEqual(calcular_visitas_por_mes(escola_id=999999), {})
+
+    def test_por_tecnico_soma_os_meses(self):
+        self.assertEqual([(l['tecnico_gre'], l['total']) for l in VisitaMensal.por_tecnico()],
+                         [('Ana', 7), ('Bruno', 5)])
+        self.assertEqual([(l['tecnico_gre'], l['total']) for l in VisitaMensal.por_tecnico(escola_id=self.b.pk)],
+                         [('Bruno', 1)])
@@ -0,0 +1,83 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import CACHE_TESTES
+from ..models import Escola, VisitaTecnica
+from ..views import VISITAS_POR_PAGINA, resumo_ultimas_visitas
+
+
+class ResumoUltimasVisitasTests(TestCase):
+    def setUp(self):
+        self.a = Escola.objects.create(nome='Escola A')
+        self.b = Escola.objects.create(nome='Escola B')
+        self.c = Escola.objects.create(nome='Escola C')
+        visita = VisitaTecnica.objects.create
+        visita(escola=self.a, data_visita=datetime.date(2025, 3, 1), tecnico_gre='Ana')
+        # Duas visitas no mesmo dia: vale a de maior id
+        visita(escola=self.a, data_visita=datetime.date(2025, 3, 10), tecnico_gre='Ana')
+        self.ultima_a = visita(escola=self.a, data_visita=datetime.date(2025, 3, 10), tecnico_gre='Bruno')
+        # Visita sem data não passa à frente das que têm data
+        visita(escola=self.b, data_visita=None, tecnico_gre='Carla')
+        self.ultima_b = visita(escola=self.b, data_visita=datetime.date(2024, 1, 5), tecnico_gre='Bruno')
+        # Escola só com visita sem data também aparece
+        self.ultima_c = visita(escola=self.c, data_visita=None, tecnico_gre='Ana')
+
+    def test_uma_linha_por_escola_com_a_visita_mais_recente(self):
+        self.assertEqual(
+            [(v.escola.nome, v.pk) for v in resumo_ultimas_visitas()],
+            [('Escola A', self.ultima_a.pk), ('Escola B', self.ultima_b.pk), ('Escola C', self.ultima_c.pk)],
+        )
+
+    def test_uma_consulta_so(self):
+        with self.assertNumQueries(1):
+            [v.escola.nome for v in resumo_ultimas_visitas()]
+
+    def test_ordenacoes(self):
+        por_data = [v.escola.nome for v in resumo_ultimas_visitas('-data')]
+        self.assertEqual(por_data[:2], ['Escola A', 'Escola B'])
+        por_tecnico = [(v.tecnico_gre, v.escola.nome) for v in resumo_ultimas_visitas('tecnico')]
+        self.assertEqual(por_tecnico, [('Ana', 'Escola C'), ('Bruno', 'Escola A'), ('Bruno', 'Escola B')])
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class PaginaVisitasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('tecnico', password='senha'))
+
+    def criar_escolas(self, quantidade, inicio=0):
+        for i in range(inicio, inicio + quantidade):
+            escola = Escola.objects.create(nome=f'Escola {i:04d}')
+            VisitaTecnica.objects.create(escola=escola, data_visita=datetime.date(2025, 1, 1) + datetime.timedelta(i))
+
+    def consultas_da_pagina(self, **params):
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get(reverse('visitas'), params)
+        self.assertEqual(resposta.status_code, 200)
+        return resposta, len(consultas)
+
+    def test_paginada(self):
+        self.criar_escolas(VISITAS_POR_PAGINA + 3)
+        resposta, _ = self.consultas_da_pagina(page=2)
+        self.assertEqual([v.escola.nome for v in resposta.context['resumo_visitas']],
+                         [f'Escola {i:04d}' for i in range(VISITAS_POR_PAGINA, VISITAS_POR_PAGINA + 3)])
+
+    def test_consultas_nao_crescem_com_o_numero_de_escolas(self):
+        self.criar_escolas(3)
+        self.consultas_da_pagina()  # aquece as listas do formulário
+        _, poucas = self.consultas_da_pagina()
+        self.criar_escolas(60, inicio=3)
+        self.consultas_da_pagina()
+        _, muitas = self.consultas_da_pagina()
+        self.assertEqual(poucas, muitas)
+
+    def test_ordem_desconhecida_volta_para_escola(self):
+        self.criar_escolas(2)
+        resposta, _ = self.consultas_da_pagina(ordem='; DROP TABLE')
+        self.assertEqual(resposta.context['ordem'], 'escola')
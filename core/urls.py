@@ -1,19 +1,49 @@
 # Em SAEPE/urls.py
 
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
 from core import views 
 
+# Sob ASGI os dashboards usam as versões async (ver settings.DASHBOARDS_ASSINCRONOS)
+if settings.DASHBOARDS_ASSINCRONOS:
+    main_dashboard = views.main_dashboard_async_view
+    analise_dashboard = views.analise_dashboard_async_view
+else:
+    main_dashboard = views.main_dashboard_view
+    analise_dashboard = views.analise_dashboard_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     
     # --- Suas URLs ---
-    path('', views.main_dashboard_view, name='main_dashboard'), 
+    path('', main_dashboard, name='main_dashboard'), 
     path('login/', views.login_view, name='login'),
     path('registro/', views.registro_view, name='registro'),
     path('logout/', views.logout_view, name='logout'),
     path('relatorios/', views.relatorios_view, name='relatorios'),
-    path('dashboard-analise/', views.analise_dashboard_view, name='analise_dashboard'),
+    path('dashboard-analise/', analise_dashboard, name='analise_dashboard'),
     path('visitas/', views.visitas_view, name='visitas'), 
-        path('escola/<str:escola_nome>/', views.perfil_escola_view, name='perfil_escola'),
+    path('visitas/busca/', views.busca_visitas_view, name='busca_visitas'),
+    path('exportar/visitas/', views.exportar_visitas_view, name='exportar_visitas'),
+    path('exportar/dados-escolas/', views.exportar_dados_escolas_view, name='exportar_dados_escolas'),
+        path('escola/<int:escola_id>/', views.perfil_escola_view, name='perfil_escola'),
+    path('escola/<int:escola_id>/visitas/', views.historico_visitas_view, name='historico_visitas'),
+
+    # --- APIs JSON do dashboard de análise ---
+    path('api/graficos/desempenho/', views.api_grafico_desempenho, name='api_grafico_desempenho'),
+    path('api/graficos/visitas-por-tecnico/', views.api_grafico_visitas, name='api_grafico_visitas'),
+    path('api/graficos/visitas-por-mes/', views.api_visitas_por_mes, name='api_visitas_por_mes'),
+    path('api/tabelas/', views.api_tabelas, name='api_tabelas'),
+    path('api/ranking/', views.api_ranking, name='api_ranking'),
+    path('api/indicadores/', views.api_indicadores, name='api_indicadores'),
+
+    # --- Tarefas em segundo plano (executadas pelo manage.py run_worker) ---
+    path('tarefas/', views.tarefas_view, name='tarefas'),
+    path('tarefas/<int:tarefa_id>/arquivo/', views.baixar_arquivo_tarefa, name='baixar_arquivo_tarefa'),
+    path('api/tarefas/<int:tarefa_id>/', views.api_tarefa, name='api_tarefa'),
+    path('api/tarefas/<int:tarefa_id>/cancelar/', views.api_cancelar_tarefa, name='api_cancelar_tarefa'),
+
+    # --- Métricas por view para o Prometheus (só staff ou token) ---
+    path('metrics', views.metricas_view, name='metricas'),
 ]
\ No newline at end of file
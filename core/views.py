@@ -1,23 +1,36 @@
 # core/views.py
 
-import pandas as pd
-import json
+import datetime
+import hashlib
 import os 
+from asgiref.sync import sync_to_async
 from django.conf import settings 
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.contrib import messages
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET, require_POST
 from django.urls import reverse
-from django.utils.html import format_html
-from django.db.models import Max, Count
-from django.db import IntegrityError 
+from functools import wraps
+from django.contrib import messages
+from django.core.paginator import Paginator
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from django.db import IntegrityError, transaction
 
 
-from .models import Escola, Ocorrencia, Relatorio, Visita, DadosFicticiosEscola, VisitaTecnica
-from .forms import VisitaForm, EscolaSelectForm, VisitaTecnicaForm
+from .models import (Escola, Ocorrencia, Relatorio, Visita, DadosFicticiosEscola, VisitaTecnica, VisitaMensal,
+                     ResumoDashboard, Tarefa)
+from .forms import VisitaForm, EscolaSelectForm, VisitaTecnicaForm, FiltroExportacaoForm, NovaTarefaForm
+from .busca import buscar_visitas
+from .exportacao import (COLUNAS_DADOS_ESCOLAS, COLUNAS_VISITAS, dados_escolas_filtrados,
+                         resposta_exportacao, visitas_filtradas)
+from .roteador import leitura_replica
+from .assincrono import consultas_paralelas
+from .cache_dados import aobter_ou_calcular, obter_ou_calcular, invalidar_dados, versao_dados, momento_versao
 
 
 # ==============================================================================
@@ -28,6 +41,9 @@ from .forms import VisitaForm, EscolaSelectForm, VisitaTecnicaForm
 # Em produção, você deve remover a chamada dessa função e carregar os dados uma única vez.
 def carregar_dados_csv_para_modelos():
     """Tenta carregar os dados dos arquivos CSV para os modelos, se ainda não existirem."""
+    # Importado aqui dentro: o pandas pesa dezenas de MB e não deve ser
+    # carregado por todo processo do servidor só por causa desta função
+    import pandas as pd
     
     # 1. Carregar DadosFicticiosEscola (Acompanhamento)
     caminho_escolas_csv = os.path.join(settings.BASE_DIR, 'Acompanhamento_Escolas_2025_Ficticio.xlsx - Sheet1.csv')
@@ -42,9 +58,10 @@ def carregar_dados_csv_para_modelos():
                 'matricula_efaf_2024'
             ]
             
+            ids_escolas = Escola.resolver_ids(df_escolas['escola'])
             for index, row in df_escolas.iterrows():
                 DadosFicticiosEscola.objects.create(
-                    escola=row['escola'],
+                    escola_id=ids_escolas[row['escola']],
                     modalidade=row['modalidade'],
                     alunos_previstos_2023=row['alunos_previstos_2023'],
                     percentual_peso=row['percentual_peso'],
@@ -54,6 +71,7 @@ def carregar_dados_csv_para_modelos():
                     proficiencia_mt_2023=row['proficiencia_mt_2023'],
                     matricula_efaf_2024=row['matricula_efaf_2024']
                 )
+            DadosFicticiosEscola.recalcular_posicoes()
             print("Dados de Acompanhamento de Escolas carregados.")
         except Exception as e:
             print(f"Erro ao carregar dados de Acompanhamento: {e}")
@@ -64,10 +82,11 @@ def carregar_dados_csv_para_modelos():
         print("Tentando carregar dados de Visitas Tecnicas...")
         try:
             df_visitas = pd.read_csv(caminho_visitas_csv)
+            ids_escolas = Escola.resolver_ids(df_visitas['Escola'])
             
             for index, row in df_visitas.iterrows():
                 VisitaTecnica.objects.create(
-                    escola=row['Escola'],
+                    escola_id=ids_escolas[row['Escola']],
                     data_visita=pd.to_datetime(row['Data da Visita'], errors='coerce').date(),
                     tecnico_gre=row['Técnico/Analista - GRE'],
                     servidor_escola=row['Servidor da Escola'],
@@ -75,6 +94,7 @@ def carregar_dados_csv_para_modelos():
                     encaminhamento=row['Encaminhamento'],
                     observacao=row['Observação']
                 )
+            VisitaMensal.recalcular()
             print("Dados de Visitas Técnicas carregados.")
         except Exception as e:
             print(f"Erro ao carregar dados de Visitas Técnicas: {e}")
@@ -139,10 +159,6 @@ def logout_view(request):
     return redirect('login')
 
 
-@login_required(login_url='login')
-def main_dashboard_view(request):
-    return render(request, 'main_dashboard.html')
-
 @login_required(login_url='login')
 def relatorios_view(request):
     if request.method == 'POST':
@@ -152,7 +168,41 @@ def relatorios_view(request):
         return render(request, 'relatorios.html', context)
 
 
+# Valor do parâmetro ?ordem= -> ordenação da consulta
+ORDENACOES_RESUMO_VISITAS = {
+    'escola': ['escola__nome'],
+    '-escola': ['-escola__nome'],
+    'data': ['data_visita', 'escola__nome'],
+    '-data': ['-data_visita', 'escola__nome'],
+    'tecnico': ['tecnico_gre', 'escola__nome'],
+    '-tecnico': ['-tecnico_gre', 'escola__nome'],
+}
+VISITAS_POR_PAGINA = 25
+
+
+def resumo_ultimas_visitas(ordem='escola'):
+    """
+    Última visita de cada escola, calculada toda no banco.
+
+    O ROW_NUMBER() numera as visitas de cada escola da mais recente para a mais
+    antiga (empate na data: maior id), e só a primeira de cada uma é mantida.
+    """
+    return (
+        VisitaTecnica.objects
+        .select_related('escola')
+        .only('escola__nome', 'data_visita', 'tecnico_gre')
+        .annotate(posicao=Window(
+            RowNumber(),
+            partition_by=[F('escola_id')],
+            order_by=[F('data_visita').desc(nulls_last=True), F('id').desc()],
+        ))
+        .filter(posicao=1)
+        .order_by(*ORDENACOES_RESUMO_VISITAS[ordem])
+    )
+
+
 @login_required(login_url='login')
+@leitura_replica
 def visitas_view(request):
 
     # --- Lógica de POST (Processa o formulário do popup) ---
@@ -160,7 +210,11 @@ def visitas_view(request):
         form = VisitaTecnicaForm(request.POST)
         if form.is_valid():
             try:
-                form.save()
+                with transaction.atomic():
+                    visita = form.save()
+                    ResumoDashboard.registrar_visita(visita)
+                    VisitaMensal.registrar_visita(visita)
+                invalidar_dados()
                 messages.success(request, 'Visita registada com sucesso!')
                 return redirect('visitas')
             except IntegrityError as e:
@@ -176,36 +230,23 @@ def visitas_view(request):
 
     # --- Lógica de GET (Mostra o resumo das últimas visitas) ---
 
-    # 1. Encontra a data da última visita para cada escola
-    ultimas_visitas_por_escola = VisitaTecnica.objects.values(
-        'escola' 
-    ).annotate(
-        ultima_data=Max('data_visita') 
-    ) 
+    # 1. Última visita de cada escola numa única consulta (paginada e ordenável)
+    ordem = request.GET.get('ordem', 'escola')
+    if ordem not in ORDENACOES_RESUMO_VISITAS:
+        ordem = 'escola'
 
-    # 2. Busca os detalhes completos da última visita de cada escola
-    lista_resumo_visitas = []
-    for item in ultimas_visitas_por_escola:
-        try:
-            # Encontra a visita mais recente (maior ID) na última data para evitar duplicatas
-            ultima_visita_obj = VisitaTecnica.objects.filter(
-                escola=item['escola'],
-                data_visita=item['ultima_data']
-            ).latest('id') 
-            lista_resumo_visitas.append(ultima_visita_obj)
-        except VisitaTecnica.DoesNotExist:
-            continue
-            
-    # 3. Ordena a LISTA de objetos pelo atributo 'escola' (alfabeticamente)
-    lista_resumo_visitas.sort(key=lambda visita: visita.escola)
+    paginator = Paginator(resumo_ultimas_visitas(ordem), VISITAS_POR_PAGINA)
+    page_obj = paginator.get_page(request.GET.get('page'))
 
-    # 4. Cria uma instância VAZIA do formulário para o popup
+    # 2. Cria uma instância VAZIA do formulário para o popup
     form_modal = VisitaTecnicaForm()
 
-    # 5. Monta o contexto para o template
+    # 3. Monta o contexto para o template
     context = {
         'form_modal': form_modal,           
-        'resumo_visitas': lista_resumo_visitas,
+        'resumo_visitas': page_obj,
+        'page_obj': page_obj,
+        'ordem': ordem,
     }
 
     return render(request, 'visitas.html', context)
@@ -214,223 +255,733 @@ def visitas_view(request):
 
 
 @login_required(login_url='login')
-def analise_dashboard_view(request):
-    
-    
-    form = EscolaSelectForm(request.GET or None) 
-    escola_nome_filtro = None
-    titulo_sufixo = " - Visão Geral"
-    
-    if form.is_valid():
-        escola_nome_filtro = form.cleaned_data.get('escola')
-        if escola_nome_filtro:
-            titulo_sufixo = f" - {escola_nome_filtro}"
-        else:
-            escola_nome_filtro = None
-            titulo_sufixo = " - Visão Geral"
-            
-    erro = None
-    dados_grafico_json = '{}' 
-    dados_grafico_visitas_json = '{}' 
-    tabela_1_html = "<p>Nenhum dado encontrado.</p>"
-    tabela_2_html = "<p>Nenhum dado encontrado.</p>"
-    
+@require_GET
+def busca_visitas_view(request):
+    """Busca de texto em demanda, encaminhamento e observação (JSON, paginado por relevância)."""
     try:
-        # --- 1. Lógica para Gráfico de Barras e Tabelas (Desempenho) ---
-        base_query = DadosFicticiosEscola.objects.all()
+        pagina = int(request.GET.get('pagina', 1))
+    except ValueError:
+        pagina = 1
 
-        if escola_nome_filtro:
-            base_query = base_query.filter(escola=escola_nome_filtro)
+    resultado = buscar_visitas(request.GET.get('q', ''), pagina)
+    for item in resultado.resultados:
+        item['url_perfil'] = reverse('perfil_escola', args=[item['escola_id']])
+    return JsonResponse(resultado.como_dict())
 
-        # Dados para Tabela e Barras
-        dados_tabelas = list(base_query.values(
-            'escola', 'saepe_2022', 'saepe_2023', 
-            'proficiencia_lp_2023', 'proficiencia_mt_2023'
-        ))
 
-        # Geração do JSON do Gráfico de Barras
-        if dados_tabelas:
-            # Se for uma única escola, mostra as métricas dela
-            if escola_nome_filtro:
-                escola_info = dados_tabelas[0]
-                dados_grafico = {
-                    'labels': ['SAEPE 2022', 'SAEPE 2023', 'LP 2023', 'MT 2023'],
-                    'datasets': [{
-                        'label': escola_info['escola'],
-                        'data': [
-                            escola_info['saepe_2022'], 
-                            escola_info['saepe_2023'], 
-                            escola_info['proficiencia_lp_2023'], 
-                            escola_info['proficiencia_mt_2023']
-                        ],
-                        'backgroundColor': 'rgba(75, 192, 192, 0.7)',
-                        'borderColor': 'rgba(75, 192, 192, 1)',
-                        'borderWidth': 1
-                    }]
-                }
-            # Se for Visão Geral, mostra um comparativo (ex: Top 5 Proficiência)
-            else:
-                top_escolas = sorted(dados_tabelas, key=lambda x: x['proficiencia_lp_2023'], reverse=True)[:5]
-                labels = [e['escola'] for e in top_escolas]
-                data_lp = [e['proficiencia_lp_2023'] for e in top_escolas]
-                data_mt = [e['proficiencia_mt_2023'] for e in top_escolas]
-                
-                dados_grafico = {
-                    'labels': labels,
-                    'datasets': [
-                        {'label': 'Proficiência LP 2023', 'data': data_lp, 'backgroundColor': 'rgba(54, 162, 235, 0.7)'},
-                        {'label': 'Proficiência MT 2023', 'data': data_mt, 'backgroundColor': 'rgba(255, 99, 132, 0.7)'}
-                    ]
-                }
-
-            dados_grafico_json = json.dumps(dados_grafico)
-            
-            # Geração das Tabelas HTML
-            for item in dados_tabelas:
-                try:
-                    url_perfil = reverse('perfil_escola', args=[item['escola']])
-                    item['escola_link'] = format_html('<a href="{}">{}</a>', url_perfil, item['escola'])
-                except Exception as link_error:
-                    item['escola_link'] = item['escola'] 
-                    print(f"Erro ao gerar link para {item['escola']}: {link_error}")
-
-            df_tabelas = pd.DataFrame(dados_tabelas)
-            
-            tabela_1_html = df_tabelas[['escola_link', 'saepe_2022', 'saepe_2023']].rename(
-                columns={'escola_link': 'Escola', 'saepe_2022': 'SAEPE 2022', 'saepe_2023': 'SAEPE 2023'}
-            ).to_html(classes='table table-striped table-hover', index=False, escape=False)
-            
-            tabela_2_html = df_tabelas[['escola_link', 'proficiencia_lp_2023', 'proficiencia_mt_2023']].rename(
-                columns={'escola_link': 'Escola', 'proficiencia_lp_2023': 'Proficiência LP 2023', 'proficiencia_mt_2023': 'Proficiência MT 2023'}
-            ).to_html(classes='table table-striped table-hover', index=False, escape=False)
-        else:
-            # Caso não haja dados de escola
-            dados_grafico_json = '{}'
+# ==============================================================================
+# EXPORTAÇÃO (CSV / XLSX)
+# ==============================================================================
 
-        # --- 2. Lógica para Gráfico de Rosca (Visitas por Técnico) ---
-        visitas_por_tecnico = VisitaTecnica.objects.values('tecnico_gre').annotate(total=Count('id')).order_by('-total')
-        
-        labels_visitas = [item['tecnico_gre'] for item in visitas_por_tecnico]
-        data_visitas = [item['total'] for item in visitas_por_tecnico]
-
-        cores_fundo = [
-            'rgba(255, 99, 132, 0.7)', 
-            'rgba(54, 162, 235, 0.7)',  
-            'rgba(255, 206, 86, 0.7)',  
-            'rgba(75, 192, 192, 0.7)',  
-            'rgba(153, 102, 255, 0.7)',
-            'rgba(255, 159, 64, 0.7)', 
-            'rgba(199, 199, 199, 0.7)',
-        ]
-        
-        dados_grafico_visitas = {
-            'labels': labels_visitas,
-            'datasets': [{
-                'label': 'Número de Visitas',
-                'data': data_visitas,
-                'backgroundColor': cores_fundo[:len(labels_visitas)],
-                'borderColor': [c.replace('0.7', '1') for c in cores_fundo[:len(labels_visitas)]],
-                'borderWidth': 1
-            }]
+def _filtros_exportacao(request):
+    form = FiltroExportacaoForm(request.GET)
+    if not form.is_valid():
+        erros = '; '.join(f"{campo}: {', '.join(lista)}" for campo, lista in form.errors.items())
+        return None, JsonResponse({'erro': f'Filtros inválidos: {erros}'}, status=400)
+    return form.cleaned_data, None
+
+
+@login_required(login_url='login')
+@require_GET
+def exportar_visitas_view(request):
+    """?formato=csv|xlsx&escola=<id>&tecnico=<nome>&data_inicio=AAAA-MM-DD&data_fim=AAAA-MM-DD"""
+    filtros, erro = _filtros_exportacao(request)
+    if erro:
+        return erro
+    visitas = visitas_filtradas(filtros['escola'], filtros['tecnico'], filtros['data_inicio'], filtros['data_fim'])
+    return resposta_exportacao(visitas, COLUNAS_VISITAS, filtros['formato'], 'visitas_tecnicas')
+
+
+@login_required(login_url='login')
+@require_GET
+def exportar_dados_escolas_view(request):
+    """?formato=csv|xlsx&escola=<id>"""
+    filtros, erro = _filtros_exportacao(request)
+    if erro:
+        return erro
+    dados = dados_escolas_filtrados(filtros['escola'])
+    return resposta_exportacao(dados, COLUNAS_DADOS_ESCOLAS, filtros['formato'], 'dados_escolas')
+
+
+TOP_ESCOLAS_GRAFICO = 5
+
+
+def calcular_desempenho(escola_id_filtro, metrica=DadosFicticiosEscola.METRICA_PADRAO):
+    """Gráfico de barras (SAEPE e proficiência) e linhas das tabelas do dashboard de análise."""
+    # --- 1. Lógica para Gráfico de Barras e Tabelas (Desempenho) ---
+    dados_tabelas = list(_consulta_tabelas_desempenho(escola_id_filtro))
+    # Visão Geral: Top 5 da métrica escolhida (ver recalcular_posicoes)
+    top_escolas = [] if escola_id_filtro else DadosFicticiosEscola.ranking(metrica, TOP_ESCOLAS_GRAFICO)
+    return _montar_desempenho(escola_id_filtro, metrica, dados_tabelas, top_escolas)
+
+
+def _consulta_tabelas_desempenho(escola_id_filtro):
+    base_query = DadosFicticiosEscola.objects.all()
+
+    if escola_id_filtro:
+        base_query = base_query.filter(escola_id=escola_id_filtro)
+
+    # Dados para Tabela e Barras
+    return base_query.values(
+        'escola_id', 'escola__nome', 'saepe_2022', 'saepe_2023', 
+        'proficiencia_lp_2023', 'proficiencia_mt_2023'
+    )
+
+
+def _montar_desempenho(escola_id_filtro, metrica, dados_tabelas, top_escolas):
+    """Monta o gráfico e as linhas das tabelas com o que já veio do banco."""
+    grafico = {}
+
+    # Geração do Gráfico de Barras
+    # Se for uma única escola, mostra as métricas dela
+    if escola_id_filtro:
+        if dados_tabelas:
+            escola_info = dados_tabelas[0]
+            grafico = {
+                'labels': ['SAEPE 2022', 'SAEPE 2023', 'LP 2023', 'MT 2023'],
+                'datasets': [{
+                    'label': escola_info['escola__nome'],
+                    'data': [
+                        escola_info['saepe_2022'], 
+                        escola_info['saepe_2023'], 
+                        escola_info['proficiencia_lp_2023'], 
+                        escola_info['proficiencia_mt_2023']
+                    ],
+                    'backgroundColor': 'rgba(75, 192, 192, 0.7)',
+                    'borderColor': 'rgba(75, 192, 192, 1)',
+                    'borderWidth': 1
+                }]
+            }
+    # Se for Visão Geral, mostra o Top 5 da métrica escolhida. A ordenação é
+    # feita no banco pela posição pré-calculada (ver recalcular_posicoes)
+    else:
+        campo_valor, _, rotulo = DadosFicticiosEscola.METRICAS[metrica]
+        if top_escolas:
+            grafico = {
+                'labels': [e.escola.nome for e in top_escolas],
+                'datasets': [
+                    {'label': rotulo, 'data': [getattr(e, campo_valor) for e in top_escolas],
+                     'backgroundColor': 'rgba(54, 162, 235, 0.7)'},
+                ]
+            }
+
+    # Linhas das tabelas (o HTML é montado pelo template ou pelo JavaScript)
+    linhas_tabela = [
+        {
+            'escola_id': item['escola_id'],
+            'escola_nome': item['escola__nome'],
+            'url_perfil': reverse('perfil_escola', args=[item['escola_id']]),
+            'saepe_2022': item['saepe_2022'],
+            'saepe_2023': item['saepe_2023'],
+            'proficiencia_lp_2023': item['proficiencia_lp_2023'],
+            'proficiencia_mt_2023': item['proficiencia_mt_2023'],
         }
-        dados_grafico_visitas_json = json.dumps(dados_grafico_visitas)
+        for item in dados_tabelas
+    ]
+
+    return {'grafico': grafico, 'linhas_tabela': linhas_tabela}
+
+
+def calcular_grafico_visitas(inicio=None, fim=None, escola_id=None):
+    """Gráfico de rosca com o número de visitas de cada técnico (no período, se dado)."""
+    # --- 2. Lógica para Gráfico de Rosca (Visitas por Técnico) ---
+    # Lido do agregado mensal: o custo não cresce com o número de visitas
+    visitas_por_tecnico = VisitaMensal.por_tecnico(inicio, fim, escola_id)
+
+    labels_visitas = [item['tecnico_gre'] or 'Não informado' for item in visitas_por_tecnico]
+    data_visitas = [item['total'] for item in visitas_por_tecnico]
+
+    cores_fundo = [
+        'rgba(255, 99, 132, 0.7)', 
+        'rgba(54, 162, 235, 0.7)',  
+        'rgba(255, 206, 86, 0.7)',  
+        'rgba(75, 192, 192, 0.7)',  
+        'rgba(153, 102, 255, 0.7)',
+        'rgba(255, 159, 64, 0.7)', 
+        'rgba(199, 199, 199, 0.7)',
+    ]
+
+    return {
+        'labels': labels_visitas,
+        'datasets': [{
+            'label': 'Número de Visitas',
+            'data': data_visitas,
+            'backgroundColor': cores_fundo[:len(labels_visitas)],
+            'borderColor': [c.replace('0.7', '1') for c in cores_fundo[:len(labels_visitas)]],
+            'borderWidth': 1
+        }]
+    }
+
+
+# Os gráficos e tabelas só mudam quando há importação ou visita nova,
+# então ficam em cache por escola filtrada + métrica + versão dos dados
+def dados_desempenho(escola_id_filtro, metrica=DadosFicticiosEscola.METRICA_PADRAO):
+    return obter_ou_calcular(
+        ('desempenho', escola_id_filtro or 'todas', metrica),
+        lambda: calcular_desempenho(escola_id_filtro, metrica),
+    )
+
+
+def calcular_visitas_por_mes(inicio=None, fim=None, escola_id=None):
+    """Gráfico de linhas: visitas e relatórios pendentes por mês (meses sem visita = 0)."""
+    por_mes = {item['mes']: item for item in VisitaMensal.por_mes(inicio, fim, escola_id)}
+    if not por_mes:
+        return {}
+
+    meses = []
+    mes, ultimo = inicio or min(por_mes), fim or max(por_mes)
+    while mes <= ultimo:
+        meses.append(mes)
+        mes = (mes + datetime.timedelta(days=32)).replace(day=1)
+
+    return {
+        'labels': [f'{mes:%m/%Y}' for mes in meses],
+        'datasets': [
+            {'label': 'Visitas', 'data': [por_mes.get(mes, {}).get('total', 0) for mes in meses],
+             'borderColor': 'rgba(54, 162, 235, 1)', 'backgroundColor': 'rgba(54, 162, 235, 0.2)',
+             'fill': True, 'tension': 0.2},
+            {'label': 'Relatórios pendentes', 'data': [por_mes.get(mes, {}).get('pendentes', 0) for mes in meses],
+             'borderColor': 'rgba(255, 99, 132, 1)', 'backgroundColor': 'rgba(255, 99, 132, 0.2)',
+             'tension': 0.2},
+        ],
+    }
+
+
+def dados_grafico_visitas(inicio=None, fim=None, escola_id=None):
+    return obter_ou_calcular(
+        ('grafico_visitas', inicio or '', fim or '', escola_id or 'todas'),
+        lambda: calcular_grafico_visitas(inicio, fim, escola_id),
+    )
+
 
+def dados_visitas_por_mes(inicio=None, fim=None, escola_id=None):
+    return obter_ou_calcular(
+        ('visitas_por_mes', inicio or '', fim or '', escola_id or 'todas'),
+        lambda: calcular_visitas_por_mes(inicio, fim, escola_id),
+    )
 
+
+@login_required(login_url='login')
+@leitura_replica
+def analise_dashboard_view(request):
+    form = EscolaSelectForm(request.GET or None)
+    escola_id_filtro, metrica, titulo_sufixo = _filtro_analise(form)
+
+    # Os gráficos são buscados pelo navegador nas APIs JSON (api_*);
+    # aqui só vão as tabelas, para a página já abrir preenchida
+    erro = None
+    linhas_tabela = []
+    try:
+        linhas_tabela = dados_desempenho(escola_id_filtro, metrica)['linhas_tabela']
     except Exception as e:
         erro = f"Ocorreu um erro ao consultar os dados: {e}"
-        # Reseta todos os JSONs em caso de erro
-        dados_grafico_json = '{}'
-        dados_grafico_visitas_json = '{}'
-        tabela_1_html = f"<p>Erro ao carregar dados: {e}</p>"
-        tabela_2_html = f"<p>Erro ao carregar dados: {e}</p>"
 
-    context = {
+    context = _contexto_analise(form, titulo_sufixo, erro, escola_id_filtro, linhas_tabela)
+    return render(request, 'analise_dashboard.html', context)
+
+
+def _filtro_analise(form):
+    """(escola_id_filtro, metrica, titulo_sufixo) escolhidos no formulário."""
+    escola_id_filtro = None
+    metrica = DadosFicticiosEscola.METRICA_PADRAO
+    titulo_sufixo = " - Visão Geral"
+    
+    if form.is_valid():
+        metrica = form.cleaned_data['metrica']
+        escola_id_filtro = form.cleaned_data.get('escola')
+        if escola_id_filtro:
+            # O nome já está nas opções do formulário, não precisa de outra consulta
+            escola_nome = {str(valor): nome for valor, nome in form.fields['escola'].choices}.get(escola_id_filtro, '')
+            titulo_sufixo = f" - {escola_nome}"
+        else:
+            escola_id_filtro = None
+            titulo_sufixo = " - Visão Geral"
+    return escola_id_filtro, metrica, titulo_sufixo
+
+
+def _contexto_analise(form, titulo_sufixo, erro, escola_id_filtro, linhas_tabela):
+    return {
         'form': form, 
         'titulo_sufixo': titulo_sufixo,
         'erro': erro,
-        'dados_grafico_json': dados_grafico_json,
-        'dados_grafico_visitas_json': dados_grafico_visitas_json,
-        'analise_escola': tabela_1_html, 
-        'media_ideb': tabela_2_html,    
+        'escola_id_filtro': escola_id_filtro or '',
+        'linhas_tabela': linhas_tabela,
     }
-    
-    return render(request, 'analise_dashboard.html', context)
+
+
+# ==============================================================================
+# APIs JSON DO DASHBOARD DE ANÁLISE (com ETag / Last-Modified)
+# ==============================================================================
+
+def _escola_id_param(request):
+    escola = request.GET.get('escola', '')
+    if not escola:
+        return None
+    if not escola.isdigit():
+        raise ValueError(f"Parâmetro 'escola' inválido: {escola}")
+    return int(escola)
+
+
+def _metrica_param(request):
+    metrica = request.GET.get('metrica') or DadosFicticiosEscola.METRICA_PADRAO
+    if metrica not in DadosFicticiosEscola.METRICAS:
+        raise ValueError(f"Métrica inválida: {metrica}")
+    return metrica
+
+
+def _mes_param(request, nome):
+    """'AAAA-MM' (como o <input type="month">) -> dia 1 do mês, ou None."""
+    valor = request.GET.get(nome, '')
+    if not valor:
+        return None
+    try:
+        return datetime.datetime.strptime(valor, '%Y-%m').date()
+    except ValueError:
+        raise ValueError(f"Parâmetro '{nome}' inválido (use AAAA-MM): {valor}")
+
+
+def _periodo_param(request):
+    inicio, fim = _mes_param(request, 'inicio'), _mes_param(request, 'fim')
+    if inicio and fim and inicio > fim:
+        raise ValueError("O mês inicial é posterior ao mês final.")
+    return inicio, fim
+
+
+def _n_param(request):
+    try:
+        return min(max(int(request.GET.get('n', TOP_ESCOLAS_GRAFICO)), 1), 100)
+    except ValueError:
+        raise ValueError(f"Parâmetro 'n' inválido: {request.GET.get('n')}")
+
+
+def _filtros_normalizados(request):
+    """Os parâmetros que as APIs leem, já validados e na forma canônica (ValueError se algum for inválido)."""
+    inicio, fim = _periodo_param(request)
+    return {
+        'escola': _escola_id_param(request),
+        'metrica': _metrica_param(request),
+        'inicio': inicio,
+        'fim': fim,
+        'ordem': 'piores' if request.GET.get('ordem') == 'piores' else 'melhores',
+        'n': _n_param(request),
+    }
+
+
+# O ETag e o Last-Modified saem da versão dos dados: enquanto nada for
+# importado ou registado, o navegador recebe 304 Not Modified sem corpo.
+# Os filtros entram já normalizados e resumidos num hash: parâmetros
+# desconhecidos ou escritos de outra forma não geram ETags diferentes, e o
+# que o cliente mandou não vai parar no cabeçalho.
+def _etag_dados(request, *args, **kwargs):
+    try:
+        filtros = _filtros_normalizados(request)
+    except ValueError:
+        return None  # a view responde 400, sem ETag
+    resumo = hashlib.sha1(repr(sorted(filtros.items())).encode()).hexdigest()[:16]
+    return f'{versao_dados()}-{resumo}'
+
+
+def _ultima_alteracao(request, *args, **kwargs):
+    return momento_versao()
+
+
+def api_dados_analise(view):
+    """Login, cabeçalhos condicionais e tratamento de erro comuns às APIs do dashboard."""
+    @login_required(login_url='login')
+    @cache_control(private=True, no_cache=True)
+    @condition(etag_func=_etag_dados, last_modified_func=_ultima_alteracao)
+    @wraps(view)
+    def _view(request, *args, **kwargs):
+        try:
+            return JsonResponse(view(request, *args, **kwargs))
+        except ValueError as e:
+            return JsonResponse({'erro': str(e)}, status=400)
+        except Exception as e:
+            return JsonResponse({'erro': f'Ocorreu um erro ao consultar os dados: {e}'}, status=500)
+    return _view
+
+
+@require_GET
+@api_dados_analise
+def api_grafico_desempenho(request):
+    escola_id = _escola_id_param(request)
+    dados = dados_desempenho(escola_id, _metrica_param(request))
+    linhas = dados['linhas_tabela']
+    return {
+        'escola_nome': linhas[0]['escola_nome'] if escola_id and linhas else None,
+        'grafico': dados['grafico'],
+    }
+
+
+@require_GET
+@api_dados_analise
+def api_grafico_visitas(request):
+    inicio, fim = _periodo_param(request)
+    return {'grafico': dados_grafico_visitas(inicio, fim, _escola_id_param(request))}
+
+
+@require_GET
+@api_dados_analise
+def api_visitas_por_mes(request):
+    """Série mensal de visitas (?inicio=AAAA-MM&fim=AAAA-MM&escola=), lida do agregado mensal."""
+    inicio, fim = _periodo_param(request)
+    return {'grafico': dados_visitas_por_mes(inicio, fim, _escola_id_param(request))}
+
+
+@require_GET
+@api_dados_analise
+def api_tabelas(request):
+    return {'linhas': dados_desempenho(_escola_id_param(request))['linhas_tabela']}
+
+
+@require_GET
+@api_dados_analise
+def api_ranking(request):
+    """
+    Top (ordem=melhores) ou último (ordem=piores) N pela métrica e, com
+    ?escola=, a posição dessa escola. Tudo lido das posições pré-calculadas.
+    """
+    metrica = _metrica_param(request)
+    escola_id = _escola_id_param(request)
+    melhores = request.GET.get('ordem', 'melhores') != 'piores'
+    n = _n_param(request)
+
+    campo_valor, campo_posicao, rotulo = DadosFicticiosEscola.METRICAS[metrica]
+    resposta = {
+        'metrica': metrica,
+        'rotulo': rotulo,
+        'total': DadosFicticiosEscola.total_ranqueado(metrica),
+        'escolas': [
+            {
+                'escola_id': dado.escola_id,
+                'escola_nome': dado.escola.nome,
+                'modalidade': dado.modalidade,
+                'valor': getattr(dado, campo_valor),
+                'posicao': getattr(dado, campo_posicao),
+            }
+            for dado in DadosFicticiosEscola.ranking(metrica, n, melhores)
+        ],
+    }
+    if escola_id:
+        resposta['posicoes_escola'] = list(
+            DadosFicticiosEscola.objects.filter(escola_id=escola_id)
+                                        .values('modalidade', valor=F(campo_valor), posicao=F(campo_posicao))
+        )
+    return resposta
+
+
+@require_GET
+@api_dados_analise
+def api_indicadores(request):
+    """Crescimento do SAEPE, percentis, z-scores e médias ponderadas (NumPy)."""
+    from .indicadores import indicadores_escola, indicadores_rede
+
+    escola_id = _escola_id_param(request)
+    resposta = {'rede': indicadores_rede()}
+    if escola_id:
+        resposta['escola'] = indicadores_escola(escola_id)
+    return resposta
+
+
+# Histórico de visitas do perfil: paginação por chave (keyset) em (data_visita, id).
+# Em vez de OFFSET, cada página continua a partir da última visita da anterior,
+# então o custo é o mesmo na primeira página e na centésima.
+VISITAS_HISTORICO_POR_PAGINA = 20
+COLUNAS_HISTORICO = ['id', 'data_visita', 'tecnico_gre', 'servidor_escola', 'demanda', 'encaminhamento', 'observacao']
+
+
+def _cursor_historico(visita):
+    """'AAAA-MM-DD_id' (ou '_id' quando a visita não tem data)."""
+    data = visita['data_visita'].isoformat() if visita['data_visita'] else ''
+    return f"{data}_{visita['id']}"
+
+
+def _ler_cursor_historico(cursor):
+    data, _, visita_id = cursor.partition('_')
+    try:
+        return (datetime.date.fromisoformat(data) if data else None), int(visita_id)
+    except ValueError:
+        raise ValueError(f"Cursor inválido: {cursor}")
+
+
+def historico_visitas(escola_id, depois=None, limite=VISITAS_HISTORICO_POR_PAGINA):
+    """
+    Uma página do histórico (mais recentes primeiro, visitas sem data no fim).
+
+    Devolve (visitas, cursor da próxima página ou None).
+    """
+    visitas = VisitaTecnica.objects.filter(escola_id=escola_id)
+    colunas_ordem = ('-data_visita', '-id')
+    data, visita_id = _ler_cursor_historico(depois) if depois else (datetime.date.max, None)
+
+    # Uma linha a mais só para saber se existe próxima página
+    pagina = []
+    if data is not None:
+        # "data <= cursor" vem primeiro para o banco posicionar direto no índice
+        # (escola, -data_visita, -id) em vez de percorrer tudo desde o início
+        com_data = visitas.filter(data_visita__lte=data)
+        if visita_id is not None:
+            com_data = com_data.filter(Q(data_visita__lt=data) | Q(id__lt=visita_id))
+        pagina = list(com_data.order_by(*colunas_ordem).values(*COLUNAS_HISTORICO)[:limite + 1])
+        visita_id = None
+
+    # Visitas sem data ficam no fim, das mais novas para as mais antigas
+    if len(pagina) <= limite:
+        sem_data = visitas.filter(data_visita__isnull=True)
+        if visita_id is not None:
+            sem_data = sem_data.filter(id__lt=visita_id)
+        pagina += list(sem_data.order_by('-id').values(*COLUNAS_HISTORICO)[:limite + 1 - len(pagina)])
+
+    proximo = _cursor_historico(pagina[limite - 1]) if len(pagina) > limite else None
+    return pagina[:limite], proximo
 
 
 @login_required(login_url='login')
-def perfil_escola_view(request, escola_nome):
+@leitura_replica
+def perfil_escola_view(request, escola_id):
     try:
-        escola_nome_tratado = escola_nome.strip() 
-        
-        escola_info = get_object_or_404(DadosFicticiosEscola, escola=escola_nome_tratado)
-        
-        visitas_historico = VisitaTecnica.objects.filter(
-            escola=escola_nome_tratado
-        ).order_by('-data_visita') 
+        # Uma linha por modalidade (anos iniciais, finais, médio...) da mesma escola
+        dados_modalidades = list(
+            DadosFicticiosEscola.objects.select_related('escola')
+                                        .filter(escola_id=escola_id)
+                                        .order_by('modalidade')
+        )
+        if not dados_modalidades:
+            messages.error(request, f"Escola #{escola_id} não encontrada nos dados fictícios.")
+            return redirect('analise_dashboard')
+
+        visitas_historico, proximo_cursor = historico_visitas(escola_id)
+
+        # Posição da escola na rede (z-score e percentil de LP/MT, crescimento do SAEPE)
+        from .indicadores import indicadores_escola
+        indicadores = indicadores_escola(escola_id)
 
         context = {
-            'escola_info': escola_info,
+            'escola': dados_modalidades[0].escola,
+            'dados_modalidades': dados_modalidades,
             'visitas_historico': visitas_historico,
+            'proximo_cursor': proximo_cursor,
+            'indicadores': indicadores,
         }
         
         return render(request, 'perfil_escola.html', context)
 
-    except DadosFicticiosEscola.DoesNotExist:
-         messages.error(request, f"Escola '{escola_nome}' não encontrada nos dados fictícios.")
-         return redirect('analise_dashboard') 
     except Exception as e:
          messages.error(request, f"Ocorreu um erro ao carregar o perfil da escola: {e}")
          return redirect('analise_dashboard')
+
+
+@login_required(login_url='login')
+@require_GET
+def historico_visitas_view(request, escola_id):
+    """Próxima página do histórico de visitas do perfil ("Carregar mais")."""
+    try:
+        visitas, proximo = historico_visitas(escola_id, depois=request.GET.get('depois'))
+    except ValueError as e:
+        return JsonResponse({'erro': str(e)}, status=400)
+
+    for visita in visitas:
+        visita['data_visita'] = visita['data_visita'].strftime('%d/%m/%Y') if visita['data_visita'] else ''
+    return JsonResponse({'visitas': visitas, 'proximo': proximo})
     
 
 @login_required(login_url='login')
+@leitura_replica
 def main_dashboard_view(request):
-    
-    total_escolas = DadosFicticiosEscola.objects.values('escola').distinct().count()
-    total_visitas = VisitaTecnica.objects.count()
-    relatorios_pendentes = VisitaTecnica.objects.exclude(encaminhamento__gt='').count()
-    ultima_visita_obj = VisitaTecnica.objects.aggregate(Max('data_visita'))
-    ultima_data_visita = ultima_visita_obj.get('data_visita__max')
+    try:
+        # Os quatro números vêm prontos da tabela de resumo (uma linha só)
+        resumo = ResumoDashboard.obter()
+    except Exception as e:
+        # Em caso de erro (ex: banco de dados vazio/desconectado), define valores padrão
+        print(f"Erro ao carregar métricas: {e}")
+        resumo = None
+
+    return render(request, 'main_dashboard.html', _contexto_main_dashboard(resumo))
+
+
+def _contexto_main_dashboard(resumo):
+    # Total de escolas, visitas concluídas, relatórios pendentes
+    # (encaminhamento vazio ou nulo) e a data da última visita.
+    if resumo is None:
+        return {
+            'total_escolas': 0,
+            'total_visitas': 0,
+            'relatorios_pendentes': 0,
+            'ultima_data_visita': None, # ou "N/A" se preferir passar uma string
+        }
+    return {
+        'total_escolas': resumo.total_escolas,
+        'total_visitas': resumo.total_visitas,
+        'relatorios_pendentes': resumo.relatorios_pendentes,
+        'ultima_data_visita': resumo.ultima_data_visita, # Pode ser None se não houver visitas
+    }
+
+
+# ==============================================================================
+# TAREFAS EM SEGUNDO PLANO (importações, recálculos, relatórios)
+# ==============================================================================
+
+# As views só enfileiram e mostram o andamento; quem executa é o
+# `manage.py run_worker` (core/tarefas.py).
+TAREFAS_POR_PAGINA = 20
+TIPOS_IMPORTACAO = ('importar_visitas', 'importar_ficticio')
+
+
+def _tarefas_visiveis(usuario):
+    tarefas = Tarefa.objects.select_related('criada_por')
+    return tarefas if usuario.is_staff else tarefas.filter(criada_por=usuario)
+
+
+@login_required(login_url='login')
+def tarefas_view(request):
+    from . import tarefas as fila
+
+    if request.method == 'POST':
+        form = NovaTarefaForm(request.POST, usuario=request.user)
+        planilhas = request.FILES.getlist('planilhas')
+        if form.is_valid() and form.cleaned_data['tipo'] in TIPOS_IMPORTACAO and not planilhas:
+            form.add_error(None, 'Envie ao menos uma planilha .xlsx para importar.')
+        if form.is_valid():
+            parametros = form.parametros()
+            if form.cleaned_data['tipo'] in TIPOS_IMPORTACAO:
+                parametros['caminhos'] = [str(fila.salvar_envios(planilhas))]
+            tarefa = fila.enfileirar(form.cleaned_data['tipo'], parametros, usuario=request.user)
+            messages.success(request, f'Tarefa #{tarefa.pk} na fila. Acompanhe o andamento abaixo.')
+            return redirect('tarefas')
+        messages.error(request, 'Não foi possível criar a tarefa: ' + '; '.join(
+            erro for erros in form.errors.values() for erro in erros))
+    else:
+        form = NovaTarefaForm(usuario=request.user)
+
+    pagina = Paginator(_tarefas_visiveis(request.user), TAREFAS_POR_PAGINA).get_page(request.GET.get('page'))
     context = {
-        'total_escolas': total_escolas,
-        'total_visitas': total_visitas,
-        'relatorios_pendentes': relatorios_pendentes,
-        'ultima_data_visita': ultima_data_visita, 
+        'form': form,
+        'page_obj': pagina,
+        'tarefas': [(tarefa, fila.estado(tarefa)) for tarefa in pagina],
+        'tipos_importacao': list(TIPOS_IMPORTACAO),
     }
+    return render(request, 'tarefas.html', context)
+
 
-    return render(request, 'main_dashboard.html', context)
+def _tarefa_do_usuario(request, tarefa_id):
+    tarefa = _tarefas_visiveis(request.user).filter(pk=tarefa_id).first()
+    if tarefa is None:
+        raise Http404('Tarefa não encontrada.')
+    return tarefa
 
 
 @login_required(login_url='login')
-def main_dashboard_view(request):
-    try:
-        # 1. Total de Escolas (contando escolas distintas nos DadosFicticiosEscola)
-        total_escolas = DadosFicticiosEscola.objects.values('escola').distinct().count()
+@require_GET
+def api_tarefa(request, tarefa_id):
+    """Status da tarefa para a tela consultar periodicamente (andamento ao vivo enquanto roda)."""
+    from .tarefas import estado
+    return JsonResponse(estado(_tarefa_do_usuario(request, tarefa_id)))
+
+
+@login_required(login_url='login')
+@require_POST
+def api_cancelar_tarefa(request, tarefa_id):
+    from .tarefas import cancelar, estado
+
+    tarefa = _tarefa_do_usuario(request, tarefa_id)
+    if not cancelar(tarefa):
+        return JsonResponse({'erro': 'A tarefa já terminou.', **estado(tarefa)}, status=409)
+    tarefa.refresh_from_db()
+    return JsonResponse(estado(tarefa))
+
+
+@login_required(login_url='login')
+@require_GET
+def baixar_arquivo_tarefa(request, tarefa_id):
+    """Relatório gerado por uma tarefa 'exportar' ou o CSV de linhas rejeitadas de uma importação."""
+    from .tarefas import pasta_arquivos
+
+    tarefa = _tarefa_do_usuario(request, tarefa_id)
+    resultado = tarefa.resultado or {}
+    if request.GET.get('arquivo') == 'rejeitados':
+        nome, nome_download = resultado.get('rejeitados'), resultado.get('nome_rejeitados')
+    else:
+        nome, nome_download = resultado.get('arquivo'), resultado.get('nome_arquivo')
+    caminho = pasta_arquivos() / nome if nome else None
+    if caminho is None or not caminho.is_file():
+        raise Http404('Arquivo não encontrado.')
+    return FileResponse(open(caminho, 'rb'), as_attachment=True, filename=nome_download or nome)
+
+
+# ==============================================================================
+# MÉTRICAS (Prometheus)
+# ==============================================================================
+
+@require_GET
+def metricas_view(request):
+    """Métricas do processo em texto do Prometheus (core/metricas.py); só staff ou o token METRICAS_TOKEN."""
+    from .metricas import registro
+
+    token = getattr(settings, 'METRICAS_TOKEN', None)
+    autorizado = request.user.is_authenticated and request.user.is_staff
+    if not autorizado and token:
+        autorizado = request.headers.get('Authorization') == f'Bearer {token}'
+    if not autorizado:
+        return HttpResponseForbidden('Acesso restrito.')
+    return HttpResponse(registro.texto_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# ==============================================================================
+# DASHBOARDS ASSÍNCRONOS (servidor ASGI)
+# ==============================================================================
+
+# Mesmas páginas das views acima, com o ORM async: o event loop fica livre para
+# outras requisições enquanto o banco responde, e as consultas independentes
+# de uma mesma página rodam ao mesmo tempo, cada uma na sua conexão
+# (consultas_paralelas em core/assincrono.py; um asyncio.gather do ORM async
+# ainda as executaria uma depois da outra). As URLs só usam estas versões com
+# settings.DASHBOARDS_ASSINCRONOS ligado (o asgi.py liga); sob WSGI cada view
+# async pagaria um event loop por requisição.
+# Comparação de latência: python manage.py comparar_wsgi_asgi
 
-        # 2. Visitas Concluídas (total de registros em VisitaTecnica)
-        total_visitas = VisitaTecnica.objects.count()
+async def acalcular_desempenho(escola_id_filtro, metrica=DadosFicticiosEscola.METRICA_PADRAO):
+    """calcular_desempenho() com as linhas das tabelas e o Top 5 consultados ao mesmo tempo."""
+    dados_tabelas, top_escolas = await consultas_paralelas(
+        lambda: list(_consulta_tabelas_desempenho(escola_id_filtro)),
+        lambda: [] if escola_id_filtro else list(DadosFicticiosEscola.ranking(metrica, TOP_ESCOLAS_GRAFICO)),
+    )
+    return _montar_desempenho(escola_id_filtro, metrica, dados_tabelas, top_escolas)
 
-        # 3. Relatórios Pendentes (Visitas onde 'encaminhamento' está vazio ou nulo)
-        # O campo 'encaminhamento' tem 'null=True, blank=True' no models.py
-        relatorios_pendentes = VisitaTecnica.objects.filter(encaminhamento__in=['', None]).count()
 
-        # 4. Última Visita (data máxima de visita)
-        ultima_visita_obj = VisitaTecnica.objects.aggregate(max_date=Max('data_visita'))
-        ultima_data_visita = ultima_visita_obj.get('max_date') # Pode ser None se não houver visitas
+async def adados_desempenho(escola_id_filtro, metrica=DadosFicticiosEscola.METRICA_PADRAO):
+    # Mesma chave de dados_desempenho: as duas versões aproveitam o cache uma da outra
+    return await aobter_ou_calcular(
+        ('desempenho', escola_id_filtro or 'todas', metrica),
+        lambda: acalcular_desempenho(escola_id_filtro, metrica),
+    )
 
+
+@login_required(login_url='login')
+@leitura_replica
+async def main_dashboard_async_view(request):
+    try:
+        resumo = await ResumoDashboard.aobter()
     except Exception as e:
-        # Em caso de erro (ex: banco de dados vazio/desconectado), define valores padrão
         print(f"Erro ao carregar métricas: {e}")
-        total_escolas = 0
-        total_visitas = 0
-        relatorios_pendentes = 0
-        ultima_data_visita = None # ou "N/A" se preferir passar uma string
+        resumo = None
 
-    context = {
-        'total_escolas': total_escolas,
-        'total_visitas': total_visitas,
-        'relatorios_pendentes': relatorios_pendentes,
-        'ultima_data_visita': ultima_data_visita,
-    }
+    # O template lê a sessão/usuário (context processors), que são síncronos
+    return await sync_to_async(render)(request, 'main_dashboard.html', _contexto_main_dashboard(resumo))
+
+
+@login_required(login_url='login')
+@leitura_replica
+async def analise_dashboard_async_view(request):
+    form = EscolaSelectForm(request.GET or None)
+    # As opções de escola vêm de core/escolhas.py (síncrono, com cache no processo)
+    escola_id_filtro, metrica, titulo_sufixo = await sync_to_async(_filtro_analise)(form)
+
+    erro = None
+    linhas_tabela = []
+    try:
+        linhas_tabela = (await adados_desempenho(escola_id_filtro, metrica))['linhas_tabela']
+    except Exception as e:
+        erro = f"Ocorreu um erro ao consultar os dados: {e}"
 
-    return render(request, 'main_dashboard.html', context)
\ No newline at end of file
+    context = _contexto_analise(form, titulo_sufixo, erro, escola_id_filtro, linhas_tabela)
+    return await sync_to_async(render)(request, 'analise_dashboard.html', context)
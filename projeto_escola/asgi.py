@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'projeto_escola.settings')
+# Servidor ASGI: os dashboards usam as views async (settings.DASHBOARDS_ASSINCRONOS)
+os.environ.setdefault('SAEPE_DASHBOARDS_ASSINCRONOS', '1')
 
 application = get_asgi_application()
@@ -0,0 +1,106 @@
+# projeto_escola/bancos.py
+
+# Perfis de conexão usados em settings.DATABASES.
+#
+# SQLite (padrão): cada conexão nova roda os PRAGMAs abaixo (OPTIONS
+# 'init_command', Django 5.1+):
+#   journal_mode=WAL     leitores não esperam o escritor (os dashboards seguem
+#                        respondendo durante uma importação) e vice-versa
+#   synchronous=NORMAL   com WAL continua íntegro após queda; só perde as
+#                        últimas transações se a máquina (não o processo) cair
+#   cache_size/mmap_size páginas em memória e leitura mapeada do arquivo
+#   temp_store=MEMORY    ordenações e tabelas temporárias fora do disco
+# 'transaction_mode': 'IMMEDIATE' pega o lock de escrita no BEGIN: duas
+# gravações ao mesmo tempo (formulário de visitas) fazem fila em vez de uma
+# delas falhar com "database is locked" ao tentar promover o lock no meio da
+# transação. 'timeout' é quanto cada uma espera na fila.
+#
+# MySQL (SAEPE_BANCO=mysql): backend do mysql-connector-python, já no
+# requirements.txt. Com SAEPE_MYSQL_POOL > 0 as conexões vêm do pool do
+# próprio conector; o Django "fecha" a conexão no fim da requisição
+# (CONN_MAX_AGE=0) e ela volta para o pool em vez de ser encerrada.
+# Sem pool, as conexões são persistentes por thread (CONN_MAX_AGE).
+#
+# Réplica de leitura (SAEPE_REPLICA=1, core/roteador.py): no MySQL, o host de
+# SAEPE_MYSQL_REPLICA_HOST; no SQLite, db_replica.sqlite3 aberto só para
+# leitura (query_only) e sem BEGIN IMMEDIATE, copiado do primário por
+# `manage.py atualizar_replica`.
+
+import os
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,        # KiB (negativo): ~64 MB por conexão
+    'mmap_size': 256 * 1024 ** 2,
+    'temp_store': 'MEMORY',
+}
+
+# Segundos que uma conexão persistente fica aberta entre requisições
+CONN_MAX_AGE = int(os.environ.get('SAEPE_CONN_MAX_AGE', 600))
+
+
+def sqlite(nome, pragmas=None, timeout=20, transaction_mode='IMMEDIATE'):
+    pragmas = {**SQLITE_PRAGMAS, **(pragmas or {})}
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': nome,
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {pragma}={valor}' for pragma, valor in pragmas.items()),
+            'transaction_mode': transaction_mode,
+            'timeout': timeout,
+        },
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        # Testa a conexão persistente antes de reutilizá-la numa nova requisição
+        'CONN_HEALTH_CHECKS': True,
+    }
+
+
+def _nome_pool(alias):
+    nome = os.environ.get('SAEPE_MYSQL_POOL_NOME', 'saepe')
+    return nome if alias == 'default' else f'{nome}_{alias}'
+
+
+def mysql(host=None, alias='default'):
+    pool = int(os.environ.get('SAEPE_MYSQL_POOL', 0))
+    opcoes = {
+        'charset': 'utf8mb4',
+        'autocommit': True,
+        'sql_mode': 'STRICT_TRANS_TABLES',
+    }
+    if pool:
+        opcoes.update({
+            # Os pools do conector são globais no processo e achados pelo nome:
+            # cada alias precisa do seu, senão a réplica pega conexões do primário
+            'pool_name': _nome_pool(alias),
+            'pool_size': pool,
+            'pool_reset_session': True,
+        })
+    return {
+        'ENGINE': 'mysql.connector.django',
+        'NAME': os.environ.get('SAEPE_MYSQL_BANCO', 'saepe'),
+        'USER': os.environ.get('SAEPE_MYSQL_USUARIO', 'saepe'),
+        'PASSWORD': os.environ.get('SAEPE_MYSQL_SENHA', ''),
+        'HOST': host or os.environ.get('SAEPE_MYSQL_HOST', '127.0.0.1'),
+        'PORT': os.environ.get('SAEPE_MYSQL_PORTA', '3306'),
+        'OPTIONS': opcoes,
+        'CONN_MAX_AGE': 0 if pool else CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': not pool,
+    }
+
+
+def banco_padrao(base_dir):
+    """DATABASES['default'] conforme SAEPE_BANCO ('sqlite', o padrão, ou 'mysql')."""
+    perfil = os.environ.get('SAEPE_BANCO', 'sqlite')
+    if perfil == 'mysql':
+        return mysql()
+    if perfil != 'sqlite':
+        raise ValueError(f"SAEPE_BANCO desconhecido: {perfil!r} (use 'sqlite' ou 'mysql')")
+    return sqlite(base_dir / 'db.sqlite3')
+
+
+def banco_replica(base_dir):
+    """DATABASES['replica'] no mesmo perfil (SAEPE_BANCO) do primário."""
+    if os.environ.get('SAEPE_BANCO', 'sqlite') == 'mysql':
+        return mysql(host=os.environ['SAEPE_MYSQL_REPLICA_HOST'], alias='replica')
+    return sqlite(base_dir / 'db_replica.sqlite3', pragmas={'query_only': 'ON'}, transaction_mode=None)
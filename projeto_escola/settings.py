@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
+from projeto_escola import bancos
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -41,13 +45,21 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primeiro da lista para medir a requisição inteira (core/metricas.py)
+    'core.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Só fica ativo com a réplica configurada (SAEPE_REPLICA=1)
+    'core.roteador.ReplicaMiddleware',
+    # Lê a versão dos dados do cache uma vez por requisição (core/cache_dados.py)
+    'core.cache_dados.VersaoDadosMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Por último: roda a view sob cProfile com ?perfilar=1 (core/perfilamento.py)
+    'core.perfilamento.PerfilamentoMiddleware',
 ]
 
 ROOT_URLCONF = 'projeto_escola.urls'
@@ -73,13 +85,74 @@ WSGI_APPLICATION = 'projeto_escola.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Perfis em projeto_escola/bancos.py: SQLite com WAL e conexões persistentes
+# (padrão) ou MySQL com pool (SAEPE_BANCO=mysql e SAEPE_MYSQL_*).
+
 DATABASES = {
+    'default': bancos.banco_padrao(BASE_DIR),
+}
+
+# Réplica de leitura para os dashboards (core/roteador.py). Com SAEPE_REPLICA=1
+# as views marcadas com @leitura_replica leem de 'replica'; escritas e quem
+# fez um POST nos últimos REPLICA_ATRASO_MAXIMO segundos ficam no primário.
+# Localmente: `python manage.py atualizar_replica [--intervalo 30]`.
+if os.environ.get('SAEPE_REPLICA') == '1':
+    DATABASES['replica'] = bancos.banco_replica(BASE_DIR)
+    DATABASE_ROUTERS = ['core.roteador.RoteadorReplica']
+
+REPLICA_ATRASO_MAXIMO = 30
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Baseado em arquivos para ser compartilhado entre os processos do servidor
+# e os comandos de importação (que invalidam os dados em cache).
+# Também funciona com 'django.core.cache.backends.locmem.LocMemCache'.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': Path(tempfile.gettempdir()) / 'projeto_saepe_cache',
     }
 }
 
+# Tempo máximo (segundos) que um resultado calculado fica em cache
+CACHE_DADOS_TIMEOUT = 600
+
+# Planilhas já lidas pelos comandos de importação, guardadas em .npz pelo hash
+# do conteúdo (core/cache_planilhas.py). Reimportar a mesma planilha não passa
+# de novo pelo openpyxl. None desliga o cache.
+CACHE_PLANILHAS_DIR = Path(tempfile.gettempdir()) / 'projeto_saepe_planilhas'
+
+# Dashboards (página inicial e análise) nas versões async de core/views.py.
+# O asgi.py liga por padrão; sob WSGI (runserver, gunicorn) ficam as síncronas.
+DASHBOARDS_ASSINCRONOS = os.environ.get('SAEPE_DASHBOARDS_ASSINCRONOS') == '1'
+# Threads (e conexões extras) que elas usam para rodar as consultas
+# independentes de uma página ao mesmo tempo (core/assincrono.py).
+CONSULTAS_PARALELAS_THREADS = 4
+
+# Métricas por view em /metrics (core/metricas.py). O middleware custa um
+# perf_counter() por consulta SQL; METRICAS_ATIVAS = False o desliga.
+# A mesma consulta repetida METRICAS_LIMITE_REPETICAO vezes numa requisição
+# conta como N+1 (e gera um aviso no log, uma vez por view).
+# Sem login de staff, /metrics aceita 'Authorization: Bearer <METRICAS_TOKEN>'.
+METRICAS_ATIVAS = True
+METRICAS_LIMITE_REPETICAO = 10
+METRICAS_TOKEN = os.environ.get('SAEPE_METRICAS_TOKEN') or None
+
+# Perfis de requisições (?perfilar=1, só staff), vistos em /admin/perfis/.
+# Guarda os PERFIS_MAXIMO mais recentes; os mais antigos são apagados.
+PERFIS_DIR = Path(tempfile.gettempdir()) / 'projeto_saepe_perfis'
+PERFIS_MAXIMO = 50
+
+# Tarefas em segundo plano (core/tarefas.py), executadas por `manage.py run_worker`.
+# Planilhas enviadas, CSVs de rejeitados e relatórios gerados ficam nesta pasta.
+# Uma tarefa que falha volta para a fila após TAREFAS_ESPERA_RETENTATIVA
+# segundos (dobrando a cada tentativa). O andamento passa pelo cache, que
+# precisa ser compartilhado entre o servidor e o worker (FileBasedCache acima).
+TAREFAS_ARQUIVOS_DIR = BASE_DIR / 'arquivos_tarefas'
+TAREFAS_ESPERA_RETENTATIVA = 30
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
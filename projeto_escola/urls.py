@@ -3,7 +3,14 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from core.admin import baixar_perfil_view, perfil_view, perfis_view
+
 urlpatterns = [
+    # Perfis de requisições (core/perfilamento.py), antes do admin para não caírem no catch-all dele
+    path('admin/perfis/', admin.site.admin_view(perfis_view), name='admin_perfis'),
+    path('admin/perfis/<str:identificador>/', admin.site.admin_view(perfil_view), name='admin_perfil'),
+    path('admin/perfis/<str:identificador>/baixar/', admin.site.admin_view(baixar_perfil_view),
+         name='admin_baixar_perfil'),
     path('admin/', admin.site.urls),
     path('', include('core.urls')), # Adicione esta linha
 ]
\ No newline at end of file